@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Compare the throughput of the ways of serving the API under concurrent connections.
+
+- runserver: the development server with DEBUG on, what Docker Compose used to run
+- production: gunicorn with gunicorn.conf.py and DEBUG off, what Docker Compose runs
+- wsgi: wsgi.py (sync views) served by gunicorn with --workers workers of --threads threads
+- asgi: asgi.py (async views) served by uvicorn with --workers workers
+
+Each server is loaded with a fixed number of keep-alive connections sending requests back to
+back, and requests/sec and latency percentiles are reported. The response cache is turned off so
+every request reaches the database.
+
+--seed replaces the data of the configured database with generate_market_data. Like bench_suite.py
+it refuses to run against the deployment settings unless --yes-destroy is given.
+
+Usage:
+    python benchmarks/bench_asgi.py --concurrency 1,16,64 --duration 10
+    python benchmarks/bench_asgi.py --servers runserver,production
+    DJANGO_SETTINGS_MODULE=financial.test_settings python benchmarks/bench_asgi.py --seed 100000
+"""
+
+import os
+import sys
+import time
+import shlex
+import socket
+import asyncio
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent / "financial"
+# Settings of the deployment, whose database is only wiped with --yes-destroy
+DEPLOYMENT_SETTINGS = ("financial.settings", "financial.api_settings")
+# Trading days of history generated per symbol
+SEED_DAYS_PER_SYMBOL = 5000
+# Command and environment of each server
+SERVERS = {
+    "runserver": ("python manage.py runserver {port} --noreload", {"DEBUG": "ON"}),
+    "production": (
+        "gunicorn financial.wsgi:application --bind 127.0.0.1:{port}",
+        {"DEBUG": "OFF", "GUNICORN_ACCESS_LOG": "OFF"},
+    ),
+    "wsgi": (
+        "gunicorn financial.wsgi:application --workers {workers} --threads {threads} "
+        "--bind 127.0.0.1:{port}",
+        {"DEBUG": "OFF", "GUNICORN_ACCESS_LOG": "OFF"},
+    ),
+    "asgi": (
+        "uvicorn financial.asgi:application --workers {workers} --port {port} "
+        "--no-access-log",
+        {"DEBUG": "OFF"},
+    ),
+}
+
+
+def is_scratch_settings():
+    """
+    Tell whether DJANGO_SETTINGS_MODULE was set to settings other than those of the deployment.
+    """
+    return os.environ.get("DJANGO_SETTINGS_MODULE") not in (None, *DEPLOYMENT_SETTINGS)
+
+
+def check_seed_allowed(scratch, destroy):
+    """
+    Exit unless the configured database may be wiped by seeding, Django must be set up.
+
+    :param scratch: bool, is_scratch_settings() before DJANGO_SETTINGS_MODULE was defaulted
+    :param destroy: bool, --yes-destroy was given
+    """
+    if scratch or destroy:
+        return
+    from django.db import connection
+
+    database = connection.settings_dict
+    sys.exit(
+        f"--seed would wipe the {database['NAME']} database on "
+        f"{database['HOST'] or 'localhost'} of {os.environ['DJANGO_SETTINGS_MODULE']}. "
+        "Set DJANGO_SETTINGS_MODULE to the settings of a scratch database, "
+        "or pass --yes-destroy"
+    )
+
+
+def seed(rows, destroy=False):
+    """
+    Migrate the configured database and replace its data with about the given number of rows.
+
+    generate_market_data rebuilds the rollup and bumps the data versions, so neither the
+    statistics nor cached responses of the old rows are served afterwards.
+
+    :param destroy: bool, wipe the database of the deployment settings too
+    """
+    sys.path.insert(0, str(PROJECT_DIR))
+    scratch = is_scratch_settings()
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "financial.settings")
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    check_seed_allowed(scratch, destroy)
+    from core.management.commands.generate_market_data import TRADING_DAYS_PER_YEAR
+
+    call_command("migrate", verbosity=0)
+    symbols = max(1, round(rows / SEED_DAYS_PER_SYMBOL))
+    call_command(
+        "generate_market_data",
+        symbols=symbols,
+        years=rows / symbols / TRADING_DAYS_PER_YEAR,
+        flush=True,
+    )
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(command, environment, port):
+    env = dict(os.environ, API_CACHE="off", **environment)
+    env.setdefault("DJANGO_SETTINGS_MODULE", "financial.settings")
+    process = subprocess.Popen(
+        shlex.split(command),
+        cwd=PROJECT_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"server did not start: {command}")
+
+
+async def connection(port, path, stop_at, latencies, errors):
+    """
+    Send GET requests over one keep-alive connection until stop_at.
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    request = f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode()
+    try:
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            writer.write(request)
+            status = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            if b" 200 " not in status:
+                errors.append(status)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+
+async def load(port, path, concurrency, duration):
+    latencies, errors = [], []
+    stop_at = time.monotonic() + duration
+    await asyncio.gather(
+        *(
+            connection(port, path, stop_at, latencies, errors)
+            for _ in range(concurrency)
+        )
+    )
+    return latencies, errors
+
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--path", default="/api/financial_data?symbol=SYM00000&limit=20"
+    )
+    parser.add_argument("--servers", default=",".join(SERVERS))
+    parser.add_argument("--concurrency", default="1,16,64")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--threads", type=int, default=16, help="WSGI threads per worker"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="rows to load first, 0 to keep the data"
+    )
+    parser.add_argument(
+        "--yes-destroy",
+        action="store_true",
+        help="let --seed wipe the database of the deployment settings",
+    )
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.seed, destroy=args.yes_destroy)
+
+    print(
+        f"{'server':<10} {'conns':>6} {'req/s':>9} {'p50':>9} {'p99':>9} {'errors':>7}"
+    )
+    for name in args.servers.split(","):
+        command, environment = SERVERS[name]
+        port = free_port()
+        process = start_server(
+            command.format(workers=args.workers, threads=args.threads, port=port),
+            environment,
+            port,
+        )
+        try:
+            for concurrency in (int(c) for c in args.concurrency.split(",")):
+                latencies, errors = asyncio.run(
+                    load(port, args.path, concurrency, args.duration)
+                )
+                print(
+                    f"{name:<10} {concurrency:>6} {len(latencies) / args.duration:>9.0f} "
+                    f"{percentile(latencies, 50) * 1000:>7.1f}ms "
+                    f"{percentile(latencies, 99) * 1000:>7.1f}ms {len(errors):>7}"
+                )
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
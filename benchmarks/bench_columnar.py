@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Compare payload size and client decode time of the export formats.
+
+Every format of /api/financial_data/export is fetched for the same rows. The client decode time
+is the time to turn the payload into one array per column, which is what the analytics
+notebooks do first. A throwaway test database is created with the configured settings (sqlite
+in memory with the default financial.test_settings).
+
+Usage:
+    python benchmarks/bench_columnar.py --rows 100000
+"""
+
+import io
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "financial"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "financial.test_settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from bench_serializer import seed  # noqa: E402
+from core.renderers import COLUMN_DTYPES, np, pa, pq  # noqa: E402
+
+
+def decode_ndjson(content):
+    rows = [json.loads(line) for line in content.splitlines()]
+    return {
+        name: np.array([row[name] for row in rows], dtype=dtype)
+        for name, dtype in COLUMN_DTYPES.items()
+    }
+
+
+def decode_csv(content):
+    reader = csv.reader(io.StringIO(content.decode()))
+    fields = next(reader)
+    values = dict(zip(fields, zip(*reader)))
+    return {
+        name: np.array(values[name], dtype=dtype)
+        for name, dtype in COLUMN_DTYPES.items()
+    }
+
+
+def decode_arrow(content):
+    table = pa.ipc.open_stream(content).read_all()
+    return {name: table.column(name).to_numpy() for name in table.column_names}
+
+
+def decode_parquet(content):
+    table = pq.read_table(pa.BufferReader(content))
+    return {name: table.column(name).to_numpy() for name in table.column_names}
+
+
+def decode_npz(content):
+    with np.load(io.BytesIO(content)) as arrays:
+        return {name: arrays[name] for name in arrays.files}
+
+
+DECODERS = {
+    "ndjson": decode_ndjson,
+    "csv": decode_csv,
+    "arrow": decode_arrow,
+    "parquet": decode_parquet,
+    "npz": decode_npz,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        seed(args.rows)
+        client = Client()
+        print(f"{'format':<8} {'bytes':>12} {'server':>10} {'decode':>10}")
+        for name, decode in DECODERS.items():
+            if name in ("arrow", "parquet") and pa is None:
+                print(f"{name:<8} skipped, pyarrow is not installed")
+                continue
+
+            started = time.perf_counter()
+            response = client.get("/api/financial_data/export", {"format": name})
+            content = b"".join(response.streaming_content)
+            server = time.perf_counter() - started
+
+            started = time.perf_counter()
+            decode(content)
+            decoded = time.perf_counter() - started
+            print(
+                f"{name:<8} {len(content):>12} {server * 1000:>8.0f}ms {decoded * 1000:>8.1f}ms"
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
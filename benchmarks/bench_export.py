@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Show that /api/financial_data/export streams in constant memory.
+
+The export is consumed chunk by chunk for growing table sizes, and the peak Python memory
+allocated while streaming is reported with the throughput. A throwaway test database is created
+with the configured settings (sqlite in memory with the default financial.test_settings).
+
+Usage:
+    python benchmarks/bench_export.py --rows 10000,100000,500000 --format csv
+"""
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "financial"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "financial.test_settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from bench_serializer import seed  # noqa: E402
+from core.models import FinancialDataModel  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", default="10000,100000,500000")
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        client = Client()
+        print(
+            f"{'rows':>10} {'bytes':>12} {'seconds':>8} {'rows/sec':>10} {'peak memory':>12}"
+        )
+        for rows in (int(n) for n in args.rows.split(",")):
+            FinancialDataModel.objects.all().delete()
+            seed(rows)
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            response = client.get("/api/financial_data/export", {"format": args.format})
+            size = sum(len(chunk) for chunk in response.streaming_content)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print(
+                f"{rows:>10} {size:>12} {elapsed:>8.2f} {rows / elapsed:>10.0f} "
+                f"{peak / 2**20:>10.1f}MB"
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Show how the financial_data indexes change the query plans of the API at scale.
+
+A scratch table is seeded without secondary indexes, the API queries are explained and timed,
+then the indexes from schema.sql are added and the same queries are explained and timed again.
+
+Usage:
+    python benchmarks/bench_indexes.py --rows 10000000
+"""
+
+import time
+import argparse
+import statistics
+import mysql.connector
+
+from bench_insert import TABLE_NAME, generate_records, reset_table
+from get_raw_data import DB_NAME, USER, PASSWORD, HOST, bulk_insert_financial_data
+
+DAYS_PER_SYMBOL = 5000
+START_DATE = "2005-01-01"
+END_DATE = "2005-12-31"
+
+PREDICATE = "WHERE symbol = %s AND date >= %s AND date <= %s"
+QUERIES = {
+    "financial_data page": f"SELECT id, symbol, date, open_price, close_price, volume FROM {TABLE_NAME} {PREDICATE} LIMIT 5",
+    "financial_data count": f"SELECT COUNT(*) FROM {TABLE_NAME} {PREDICATE}",
+    "statistics": f"SELECT AVG(open_price), AVG(close_price), SUM(volume) FROM {TABLE_NAME} {PREDICATE}",
+}
+INDEXES = {
+    "financial_data_symbol_date_uniq": "UNIQUE KEY financial_data_symbol_date_uniq (symbol, date)",
+    "financial_data_date_idx": "INDEX financial_data_date_idx (date)",
+    "financial_data_covering_idx": "INDEX financial_data_covering_idx (symbol, date, open_price, close_price, volume)",
+}
+
+
+def seed(conn, rows):
+    """
+    Fill the scratch table with rows spread over DAYS_PER_SYMBOL days per symbol.
+
+    :param conn: mysql.connector connection object
+    :param rows: int, total number of rows to insert
+    :return: list of str, seeded symbols
+    """
+    symbols = []
+    for n in range(0, rows, DAYS_PER_SYMBOL):
+        symbol = f"SYM{len(symbols):05d}"
+        records = generate_records(min(DAYS_PER_SYMBOL, rows - n), symbol)
+        bulk_insert_financial_data(
+            conn, records, TABLE_NAME, batch_size=5000, load_data=False
+        )
+        symbols.append(symbol)
+    return symbols
+
+
+def report(conn, label, params, repeat):
+    """
+    Print the EXPLAIN plan and the median latency of every API query.
+
+    :param conn: mysql.connector connection object
+    :param label: str, name of the measured table state
+    :param params: tuple, symbol, start date and end date bound to the queries
+    :param repeat: int, number of timed executions per query
+    :return: None
+    """
+    cursor = conn.cursor(dictionary=True)
+    print(f"\n== {label}")
+    print(f"{'query':<22} {'type':<7} {'key':<32} {'rows':>10} {'median':>10}  extra")
+    for name, sql in QUERIES.items():
+        cursor.execute(f"EXPLAIN {sql}", params)
+        plan = cursor.fetchall()[0]
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            timings.append(time.perf_counter() - started)
+        print(
+            f"{name:<22} {plan['type'] or '':<7} {plan['key'] or '-':<32} "
+            f"{plan['rows']:>10} {statistics.median(timings) * 1000:>8.2f}ms  {plan['Extra'] or ''}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = mysql.connector.connect(
+        user=USER, password=PASSWORD, host=HOST, database=DB_NAME
+    )
+    try:
+        reset_table(conn)
+        cursor = conn.cursor()
+        for name in INDEXES:
+            cursor.execute(f"ALTER TABLE {TABLE_NAME} DROP INDEX {name}")
+        started = time.perf_counter()
+        symbols = seed(conn, args.rows)
+        print(f"Seeded {args.rows} rows in {time.perf_counter() - started:.1f}s")
+        cursor.execute(f"ANALYZE TABLE {TABLE_NAME}")
+        cursor.fetchall()
+
+        params = (symbols[len(symbols) // 2], START_DATE, END_DATE)
+        report(conn, "without indexes", params, args.repeat)
+
+        started = time.perf_counter()
+        cursor.execute(
+            f"ALTER TABLE {TABLE_NAME} "
+            + ", ".join(f"ADD {d}" for d in INDEXES.values())
+        )
+        print(f"\nBuilt indexes in {time.perf_counter() - started:.1f}s")
+        cursor.execute(f"ANALYZE TABLE {TABLE_NAME}")
+        cursor.fetchall()
+
+        report(conn, "with indexes", params, args.repeat)
+    finally:
+        conn.cursor().execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Compare write throughput of row-at-a-time upserts and the batched upsert paths of get_raw_data.py.
+
+Every mode upserts the same synthetic records into a scratch table and reports rows/sec. Only the
+upserts are timed, the rollup and watermarks that get_raw_data.py writes after them are left alone.
+The scratch table is created from schema.sql and dropped at the end of the run.
+
+Usage:
+    python benchmarks/bench_insert.py --rows 5000 --batch-sizes 100,1000,5000 --load-data
+"""
+
+import sys
+import time
+import argparse
+import mysql.connector
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from get_raw_data import (  # noqa: E402
+    SCHEMA_FILE,
+    DB_NAME,
+    USER,
+    PASSWORD,
+    HOST,
+    UPSERT_SQL,
+    bulk_insert_financial_data,
+)
+
+TABLE_NAME = "bench_financial_data"
+
+
+def insert_row_at_a_time(conn, records, table_name=TABLE_NAME):
+    """
+    Upsert records with one statement per record, the baseline of the batched paths.
+
+    :param conn: mysql.connector connection object
+    :param records: list of dict, each dict contains financial data for a single day
+    :param table_name: str, table to upsert the records into
+    :return: None
+    """
+    cursor = conn.cursor()
+    sql = UPSERT_SQL.format(table_name, "VALUES (%s, %s, %s, %s, %s)")
+    for record in records:
+        cursor.execute(
+            sql,
+            (
+                record["symbol"],
+                record["date"],
+                record["open_price"],
+                record["close_price"],
+                record["volume"],
+            ),
+        )
+    conn.commit()
+
+
+def generate_records(rows, symbol="BENCH"):
+    """
+    Generate synthetic daily records for a single symbol.
+
+    :param rows: int, number of records to generate
+    :param symbol: str, stock symbol of the records
+    :return: list of dict, each dict contains financial data for a single day
+    """
+    first_day = date(2000, 1, 1)
+    return [
+        {
+            "symbol": symbol,
+            "date": (first_day + timedelta(days=i)).isoformat(),
+            "open_price": f"{100 + i % 50}.25",
+            "close_price": f"{101 + i % 50}.75",
+            "volume": 1000000 + i,
+        }
+        for i in range(rows)
+    ]
+
+
+def reset_table(conn):
+    """
+    Drop and re-create the scratch table from schema.sql.
+
+    :param conn: mysql.connector connection object
+    :return: None
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
+    with open(SCHEMA_FILE, "r") as f:
+        schema = f.read().replace(
+            "CREATE TABLE IF NOT EXISTS financial_data ",
+            f"CREATE TABLE {TABLE_NAME} ",
+        )
+    for _ in cursor.execute(schema, multi=True):
+        pass
+    conn.commit()
+
+
+def measure(conn, label, write, records):
+    """
+    Time a single write of all records into an empty scratch table and print rows/sec.
+
+    :param conn: mysql.connector connection object
+    :param label: str, name of the measured mode
+    :param write: callable, takes (conn, records) and writes them
+    :param records: list of dict, records to write
+    :return: float, rows per second
+    """
+    reset_table(conn)
+    started = time.perf_counter()
+    write(conn, records)
+    elapsed = time.perf_counter() - started
+    rows_per_second = len(records) / elapsed
+    print(f"{label:<28} {elapsed:>9.3f}s {rows_per_second:>12.0f} rows/s")
+    return rows_per_second
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch-sizes", default="100,1000,5000")
+    parser.add_argument("--load-data", action="store_true")
+    args = parser.parse_args()
+
+    records = generate_records(args.rows)
+    conn = mysql.connector.connect(
+        user=USER,
+        password=PASSWORD,
+        host=HOST,
+        database=DB_NAME,
+        allow_local_infile=args.load_data,
+    )
+    try:
+        print(f"{'mode':<28} {'elapsed':>10} {'throughput':>17}")
+        measure(
+            conn,
+            "row-at-a-time",
+            insert_row_at_a_time,
+            records,
+        )
+        for batch_size in map(int, args.batch_sizes.split(",")):
+            measure(
+                conn,
+                f"multi-row VALUES ({batch_size})",
+                lambda c, r: bulk_insert_financial_data(
+                    c, r, TABLE_NAME, batch_size=batch_size, load_data=False
+                ),
+                records,
+            )
+        if args.load_data:
+            measure(
+                conn,
+                "LOAD DATA LOCAL INFILE",
+                lambda c, r: bulk_insert_financial_data(
+                    c, r, TABLE_NAME, load_data=True
+                ),
+                records,
+            )
+    finally:
+        conn.cursor().execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Compare serialization throughput of the ModelSerializer path and the fast row encoder path.
+
+The reference path is what /api/financial_data did before: model instances serialized field by
+field by a plain ModelSerializer and rendered by JSONRenderer. The fast path reads values_list()
+tuples through FinancialDataSerializer's row encoder and renders with FastJSONRenderer. Both
+produce the same bytes, which is checked before timing. A throwaway test database is created
+with the configured settings (sqlite in memory with the default financial.test_settings).
+
+Usage:
+    python benchmarks/bench_serializer.py --rows 100000 --repeat 5
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "financial"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "financial.test_settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from rest_framework import serializers  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from core.models import FinancialDataModel  # noqa: E402
+from core.renderers import FastJSONRenderer, orjson  # noqa: E402
+from core.serializers import FinancialDataSerializer  # noqa: E402
+
+
+class ModelFinancialDataSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FinancialDataModel
+        fields = FinancialDataSerializer.Meta.fields
+
+
+def seed(rows):
+    start = date(2000, 1, 1)
+    FinancialDataModel.objects.bulk_create(
+        (
+            FinancialDataModel(
+                symbol=f"SYM{n // 5000:03d}",
+                date=start + timedelta(days=n % 5000),
+                open_price=Decimal(100 + n % 50) + Decimal("0.25"),
+                close_price=Decimal(101 + n % 50) + Decimal("0.75"),
+                volume=1000000 + n,
+            )
+            for n in range(rows)
+        ),
+        batch_size=5000,
+    )
+
+
+def reference_path(queryset):
+    return JSONRenderer().render(
+        ModelFinancialDataSerializer(list(queryset), many=True).data
+    )
+
+
+def fast_path(queryset):
+    return FastJSONRenderer().render(FinancialDataSerializer(queryset, many=True).data)
+
+
+def measure(path, queryset, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        path(queryset)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        seed(args.rows)
+        queryset = FinancialDataModel.objects.order_by("id")
+        if reference_path(queryset) != fast_path(queryset):
+            sys.exit("The fast path output differs from the ModelSerializer output")
+
+        print(f"orjson: {'installed' if orjson is not None else 'not installed'}")
+        print(f"{'path':<18} {'median':>10} {'rows/sec':>12}")
+        baseline = None
+        for name, path in (("ModelSerializer", reference_path), ("fast", fast_path)):
+            elapsed = measure(path, queryset, args.repeat)
+            baseline = baseline or elapsed
+            print(
+                f"{name:<18} {elapsed * 1000:>8.1f}ms {args.rows / elapsed:>12.0f}"
+                f"  x{baseline / elapsed:.1f}"
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Compare worker startup time and per-request latency of the full and the API-only settings.
+
+Each profile runs in a fresh process, like a newly forked worker: the time to set up Django and
+build the WSGI handler, the time of the first request (which imports the URLconf and the views)
+and then the latency of requests sent straight to the WSGI application, so only Django's own
+overhead is measured. The database is sqlite in memory and the response cache is turned off.
+
+Usage:
+    python benchmarks/bench_settings.py --requests 2000 --repeat 5
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+from wsgiref.util import setup_testing_defaults
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent / "financial"
+PROFILES = {"full": "financial.settings", "api": "financial.api_settings"}
+
+
+def request(application, path):
+    """
+    Send a GET request to a WSGI application and read the whole response.
+    """
+    path, _, query = path.partition("?")
+    environ = {"PATH_INFO": path, "QUERY_STRING": query, "HTTP_HOST": "localhost"}
+    setup_testing_defaults(environ)
+    environ["wsgi.input"] = io.BytesIO()
+    result = application(environ, lambda status, headers, exc_info=None: None)
+    try:
+        return b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+
+
+def measure(args):
+    """
+    Measure one profile in this process, the settings module comes from the environment.
+    """
+    started = time.perf_counter()
+    sys.path.insert(0, str(PROJECT_DIR))
+    from django.conf import settings
+
+    settings.DATABASES = {"default": {"ENGINE": "django.db.backends.sqlite3"}}
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    startup = time.perf_counter() - started
+
+    from django.db import connection
+
+    connection.creation.create_test_db(verbosity=0)
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from bench_serializer import seed
+
+    seed(args.rows)
+
+    started = time.perf_counter()
+    request(application, args.path)
+    first = time.perf_counter() - started
+
+    latencies = []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        request(application, args.path)
+        latencies.append(time.perf_counter() - started)
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        json.dumps(
+            {
+                "startup": startup,
+                "first": first,
+                "p50": quantiles[49],
+                "p99": quantiles[98],
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--path", default="/api/financial_data?symbol=SYM000&limit=20")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5, help="processes per profile")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        return measure(args)
+
+    print(
+        f"{'profile':<8} {'startup':>9} {'first':>9} {'p50':>9} {'p99':>9} {'req/s':>8}"
+    )
+    for name, module in PROFILES.items():
+        env = dict(
+            os.environ, DJANGO_SETTINGS_MODULE=module, DEBUG="OFF", API_CACHE="off"
+        )
+        runs = [
+            json.loads(
+                subprocess.run(
+                    [sys.executable, __file__, "--measure", *sys.argv[1:]],
+                    env=env,
+                    check=True,
+                    capture_output=True,
+                ).stdout
+            )
+            for _ in range(args.repeat)
+        ]
+        result = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(
+            f"{name:<8} {result['startup'] * 1000:>7.1f}ms {result['first'] * 1000:>7.1f}ms "
+            f"{result['p50'] * 1000:>7.2f}ms {result['p99'] * 1000:>7.2f}ms "
+            f"{1 / result['p50']:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark suite of the API and the ingestion, with machine-readable results.
+
+- seed: replaces the data of the configured database with about --seed synthetic rows of
+  --symbols symbols, generated by the generate_market_data management command. It refuses to
+  run against the deployment settings, pick a scratch database with DJANGO_SETTINGS_MODULE or
+  confirm with --yes-destroy.
+- api: starts a deployment from bench_asgi.py (or targets --url) and drives /api/financial_data
+  and /api/statistics from --concurrency keep-alive connections for --duration seconds with a
+  weighted mix of queries over random symbols, pages and date ranges. Latency percentiles and
+  throughput are reported per scenario and in total. The response cache is turned off.
+- ingest: times get_financial_data() parsing a full-history AlphaVantage payload, and
+  row-at-a-time upserts and bulk_insert_financial_data() upserting into a scratch copy of
+  financial_data when the MySQL server of get_raw_data.py is reachable.
+
+Results are written as JSON to --output and --compare prints the change from an earlier results
+file, so a change can be checked for latency regressions. Queries are drawn from --random-seed,
+runs with the same arguments send the same requests.
+
+Usage:
+    python benchmarks/bench_suite.py --seed 1000000 --yes-destroy --output baseline.json
+    python benchmarks/bench_suite.py --output results.json --compare baseline.json
+    DJANGO_SETTINGS_MODULE=financial.test_settings python benchmarks/bench_suite.py --seed 100000
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import urlencode, urlsplit
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR / "financial"))
+sys.path.insert(0, str(BASE_DIR))
+
+from bench_asgi import (  # noqa: E402
+    SERVERS,
+    check_seed_allowed,
+    free_port,
+    is_scratch_settings,
+    start_server,
+)
+
+# Seeding wipes the database, which is only allowed without confirmation for settings chosen here
+SCRATCH_SETTINGS = is_scratch_settings()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "financial.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Max, Min  # noqa: E402
+
+from bench_insert import insert_row_at_a_time  # noqa: E402
+from core.management.commands.generate_market_data import (  # noqa: E402
+    TRADING_DAYS_PER_YEAR,
+)
+from core.models import FinancialDataIngestModel, FinancialDataModel  # noqa: E402
+
+# Scenario name, weight in the mix
+SCENARIOS = {
+    "financial_data_page": 40,
+    "financial_data_range": 20,
+    "financial_data_symbols": 10,
+    "statistics": 20,
+    "statistics_symbols": 10,
+}
+
+
+def seed(rows, symbols, random_seed, destroy=False):
+    """
+    Replace the data of the configured database with about the given number of synthetic rows.
+
+    :param destroy: bool, wipe the database of the deployment settings too
+    """
+    check_seed_allowed(SCRATCH_SETTINGS, destroy)
+    call_command("migrate", verbosity=0)
+    years = rows / symbols / TRADING_DAYS_PER_YEAR
+    call_command(
+        "generate_market_data",
+        symbols=symbols,
+        years=years,
+        seed=random_seed,
+        flush=True,
+    )
+
+
+def get_requests(count, rng):
+    """
+    Draw a mix of API requests over the symbols and dates in the database.
+
+    :return: list of tuple, (scenario name, path)
+    """
+    symbols = list(
+        FinancialDataIngestModel.objects.order_by("symbol").values_list(
+            "symbol", flat=True
+        )
+    )
+    dates = FinancialDataModel.objects.aggregate(Min("date"), Max("date"))
+    if not symbols or dates["date__min"] is None:
+        sys.exit("The database is empty, run with --seed first")
+    first, span = dates["date__min"], (dates["date__max"] - dates["date__min"]).days
+
+    def date_range(max_days):
+        start = first + timedelta(days=rng.randrange(span + 1))
+        end = min(
+            start + timedelta(days=rng.randrange(1, max_days)), dates["date__max"]
+        )
+        return {"start_date": start.isoformat(), "end_date": end.isoformat()}
+
+    def some_symbols():
+        return ",".join(rng.sample(symbols, min(5, len(symbols))))
+
+    builders = {
+        "financial_data_page": lambda: (
+            "/api/financial_data",
+            {
+                "symbol": rng.choice(symbols),
+                "limit": rng.choice((5, 20, 100)),
+                "page": rng.randint(1, 5),
+            },
+        ),
+        "financial_data_range": lambda: (
+            "/api/financial_data",
+            {"symbol": rng.choice(symbols), "limit": 100, **date_range(180)},
+        ),
+        "financial_data_symbols": lambda: (
+            "/api/financial_data",
+            {"symbol": some_symbols(), "limit": 50, **date_range(30)},
+        ),
+        "statistics": lambda: (
+            "/api/statistics",
+            {"symbol": rng.choice(symbols), **date_range(3650)},
+        ),
+        "statistics_symbols": lambda: (
+            "/api/statistics",
+            {"symbol": some_symbols(), **date_range(3650)},
+        ),
+    }
+    names = rng.choices(list(SCENARIOS), weights=list(SCENARIOS.values()), k=count)
+    requests = []
+    for name in names:
+        path, params = builders[name]()
+        requests.append((name, f"{path}?{urlencode(params)}"))
+    return requests
+
+
+async def read_response(reader):
+    """
+    Read one HTTP/1.1 response off a keep-alive connection.
+
+    The body is delimited by Content-Length, by chunked transfer encoding or, when the response has
+    neither, by the end of the connection.
+
+    :return: tuple, (bytes status line, bool whether the connection can be reused), or None if the
+        server closed the connection before the response was complete
+    """
+    try:
+        status = await reader.readline()
+        if not status:
+            return None
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if not line:
+                return None
+            if line == b"\r\n":
+                break
+            header, _, value = line.decode("latin-1").partition(":")
+            headers[header.strip().lower()] = value.strip().lower()
+        keep_alive = headers.get("connection") != "close"
+        if "chunked" in headers.get("transfer-encoding", ""):
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    break
+                await reader.readexactly(size + 2)
+            # The trailer section ends with an empty line
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return None
+                if line == b"\r\n":
+                    break
+        elif "content-length" in headers:
+            await reader.readexactly(int(headers["content-length"]))
+        elif status.split()[1:2] not in ([b"204"], [b"304"]):
+            await reader.read()
+            keep_alive = False
+    except (asyncio.IncompleteReadError, ValueError):
+        return None
+    return status, keep_alive
+
+
+async def connection_load(host, port, requests, stop_at, results):
+    """
+    Send the requests over one keep-alive connection until stop_at.
+
+    When the server closes the connection, it is opened again and the unanswered request is sent
+    again, as HTTP clients do for idempotent requests. If a new connection is closed before it
+    answers, the request counts as an error and this connection stops instead of spinning.
+
+    :param requests: iterator of (scenario, path), shared by all connections
+    :param results: dict mapping scenario to a dict of latencies and errors, or None to warm up
+    """
+    writer = None
+    request = None
+    try:
+        while time.monotonic() < stop_at:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+                answered = False
+            name, path = request = request or next(requests)
+            result = None
+            if results is not None:
+                result = results.setdefault(name, {"latencies": [], "errors": 0})
+            started = time.perf_counter()
+            try:
+                writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+                response = await read_response(reader)
+            except ConnectionError:
+                response = None
+            if response is None:
+                writer.close()
+                writer = None
+                if answered:
+                    continue
+                if result is not None:
+                    result["errors"] += 1
+                break
+            status, keep_alive = response
+            answered, request = True, None
+            if result is not None:
+                result["latencies"].append(time.perf_counter() - started)
+                if b" 200 " not in status:
+                    result["errors"] += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def load(host, port, requests, concurrency, duration, results):
+    stop_at = time.monotonic() + duration
+    await asyncio.gather(
+        *(
+            connection_load(host, port, requests, stop_at, results)
+            for _ in range(concurrency)
+        )
+    )
+
+
+def summarize(latencies, errors, duration):
+    if not latencies:
+        return {"requests": 0, "errors": errors}
+    quantiles = (
+        statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    )
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / duration,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+    }
+
+
+def run_api(args, rng):
+    requests = get_requests(args.requests, rng)
+    process = None
+    if args.url:
+        address = urlsplit(args.url)
+        host, port = address.hostname, address.port or 80
+    else:
+        command, environment = SERVERS[args.server]
+        host, port = "127.0.0.1", free_port()
+        process = start_server(
+            command.format(workers=args.workers, threads=args.threads, port=port),
+            environment,
+            port,
+        )
+    try:
+        cycle = iter(requests * (1 + 10**6 // len(requests)))
+        if args.warmup:
+            asyncio.run(
+                load(host, port, cycle, args.concurrency, args.warmup, results=None)
+            )
+        results = {}
+        asyncio.run(load(host, port, cycle, args.concurrency, args.duration, results))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    scenarios = {
+        name: summarize(result["latencies"], result["errors"], args.duration)
+        for name, result in sorted(results.items())
+    }
+    total = summarize(
+        [t for result in results.values() for t in result["latencies"]],
+        sum(result["errors"] for result in results.values()),
+        args.duration,
+    )
+    return {"total": total, "scenarios": scenarios}
+
+
+class _PayloadResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+def time_call(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def run_ingest(args):
+    import mysql.connector
+    import get_raw_data
+
+    # A full-history payload of about 20 years of trading days
+    today = date.today()
+    days = [
+        today - timedelta(days=n) for n in range(7300) if (today.weekday() - n) % 7 < 5
+    ]
+    payload = {
+        "Time Series (Daily)": {
+            day.isoformat(): {
+                "1. open": "123.45",
+                "4. close": "124.56",
+                "6. volume": "7890123",
+            }
+            for day in days
+        }
+    }
+    with patch.object(
+        get_raw_data.requests, "get", return_value=_PayloadResponse(payload)
+    ):
+        since = days[-1] - timedelta(days=1)
+        records = get_raw_data.get_financial_data("BENCH", since=since)
+        seconds = time_call(
+            lambda: get_raw_data.get_financial_data("BENCH", since=since), args.repeat
+        )
+    results = {
+        "get_financial_data": {
+            "records": len(records),
+            "seconds": seconds,
+            "records_per_second": len(records) / seconds,
+        }
+    }
+
+    records = records[: args.ingest_rows]
+    try:
+        conn = mysql.connector.connect(
+            user=get_raw_data.USER,
+            password=get_raw_data.PASSWORD,
+            host=get_raw_data.HOST,
+            database=get_raw_data.DB_NAME,
+        )
+    except mysql.connector.Error as e:
+        reason = f"MySQL is not reachable: {e}"
+        results["insert_row_at_a_time"] = {"skipped": reason}
+        results["bulk_insert_financial_data"] = {"skipped": reason}
+        return results
+
+    table = "bench_financial_data"
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} LIKE financial_data")
+        for name, function in (
+            ("insert_row_at_a_time", insert_row_at_a_time),
+            ("bulk_insert_financial_data", get_raw_data.bulk_insert_financial_data),
+        ):
+            timings = []
+            for _ in range(args.repeat):
+                cursor.execute(f"TRUNCATE TABLE {table}")
+                started = time.perf_counter()
+                function(conn, records, table_name=table)
+                timings.append(time.perf_counter() - started)
+            seconds = statistics.median(timings)
+            results[name] = {
+                "records": len(records),
+                "seconds": seconds,
+                "records_per_second": len(records) / seconds,
+            }
+    finally:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.close()
+    return results
+
+
+def get_metadata(args):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "settings": os.environ["DJANGO_SETTINGS_MODULE"],
+        "database": connection.vendor,
+        "rows": FinancialDataModel.objects.count(),
+        "server": args.url or args.server,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "random_seed": args.random_seed,
+    }
+
+
+def print_results(results, baseline=None):
+    def change(new, old):
+        if old is None or new is None or not old:
+            return ""
+        return f" ({(new - old) / old * 100:+.0f}%)"
+
+    api = results.get("api")
+    if api:
+        old_api = (baseline or {}).get("api", {})
+        print(
+            f"{'scenario':<24} {'requests':>8} {'req/s':>14} {'p50':>16} {'p95':>16} "
+            f"{'p99':>16} {'errors':>6}"
+        )
+        rows = [("total", api["total"], old_api.get("total", {}))] + [
+            (name, result, old_api.get("scenarios", {}).get(name, {}))
+            for name, result in api["scenarios"].items()
+        ]
+        for name, result, old in rows:
+            if not result.get("requests"):
+                continue
+            cells = [
+                f"{result['throughput']:.0f}"
+                + change(result["throughput"], old.get("throughput"))
+            ]
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                cells.append(f"{result[key]:.1f}ms" + change(result[key], old.get(key)))
+            print(
+                f"{name:<24} {result['requests']:>8} {cells[0]:>14} {cells[1]:>16} "
+                f"{cells[2]:>16} {cells[3]:>16} {result['errors']:>6}"
+            )
+
+    ingest = results.get("ingest")
+    if ingest:
+        old_ingest = (baseline or {}).get("ingest", {})
+        for name, result in ingest.items():
+            if "skipped" in result:
+                print(f"{name:<28} skipped, {result['skipped']}")
+                continue
+            rate = result["records_per_second"]
+            print(
+                f"{name:<28} {result['records']:>8} records {rate:>10.0f} records/s"
+                + change(rate, old_ingest.get(name, {}).get("records_per_second"))
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--seed", type=int, default=0, help="rows to load first, 0 to keep the data"
+    )
+    parser.add_argument(
+        "--symbols", type=int, default=0, help="symbols seeded, about 10 years each"
+    )
+    parser.add_argument(
+        "--yes-destroy",
+        action="store_true",
+        help="let --seed wipe the database of the deployment settings",
+    )
+    parser.add_argument("--server", choices=SERVERS, default="production")
+    parser.add_argument("--url", help="benchmark a running server instead")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument(
+        "--requests", type=int, default=10000, help="distinct requests drawn"
+    )
+    parser.add_argument("--ingest-rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--random-seed", type=int, default=0)
+    parser.add_argument(
+        "--skip", choices=("api", "ingest"), action="append", default=[]
+    )
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="results JSON file of an earlier run")
+    args = parser.parse_args()
+
+    if args.seed:
+        symbols = args.symbols or max(1, args.seed // (10 * TRADING_DAYS_PER_YEAR))
+        seed(args.seed, symbols, args.random_seed, destroy=args.yes_destroy)
+
+    results = {"meta": get_metadata(args)}
+    if "api" not in args.skip:
+        results["api"] = run_api(args, random.Random(args.random_seed))
+    if "ingest" not in args.skip:
+        results["ingest"] = run_ingest(args)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,38 @@
 from django.contrib import admin
-from .models import FinancialDataModel
+from django.db.models import F
+from django.utils import timezone
 
-admin.site.register(FinancialDataModel)
+from .models import FinancialDataModel, FinancialDataIngestModel
+
+
+@admin.register(FinancialDataModel)
+class FinancialDataAdmin(admin.ModelAdmin):
+    """
+    Rows edited here bypass get_raw_data.py, so the data version of their symbols is bumped like an
+    ingest would. Cached responses of the symbols are no longer served and their statistics are
+    computed with the aggregate query until the next ingest rebuilds the rollup.
+    """
+
+    def save_model(self, request, obj, form, change):
+        symbols = {obj.symbol}
+        if change and "symbol" in form.changed_data:
+            symbols.add(form.initial["symbol"])
+        super().save_model(request, obj, form, change)
+        self.bump_data_versions(symbols)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.bump_data_versions({obj.symbol})
+
+    def delete_queryset(self, request, queryset):
+        symbols = set(queryset.values_list("symbol", flat=True))
+        super().delete_queryset(request, queryset)
+        self.bump_data_versions(symbols)
+
+    def bump_data_versions(self, symbols):
+        FinancialDataIngestModel.objects.filter(symbol__in=symbols).update(
+            version=F("version") + 1, updated_at=timezone.now()
+        )
+
+
+admin.site.register(FinancialDataIngestModel)
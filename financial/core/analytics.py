@@ -0,0 +1,159 @@
+import numpy as np
+
+# Relative weight below which the blocked EMA starts a new block, it bounds the growth of the
+# rescaled values, and with it the rounding error, to about 1e-12 relative
+EMA_BLOCK_WEIGHT = 1e-4
+
+
+def daily_returns(close):
+    """
+    Compute the simple daily returns of a close price series, or of every column of a matrix.
+
+    :param close: numpy.ndarray, close prices in date order
+    :return: numpy.ndarray, same shape as close, NaN for the first day
+    """
+    returns = np.full(close.shape, np.nan)
+    returns[1:] = close[1:] / close[:-1] - 1
+    return returns
+
+
+def simple_moving_average(values, window):
+    """
+    Compute the simple moving average over a window from a cumulative sum.
+
+    :param values: numpy.ndarray, series in date order
+    :param window: int, number of values averaged
+    :return: numpy.ndarray, same length as values, NaN until the window is full
+    """
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        cumsum = np.cumsum(np.concatenate(([0.0], values)))
+        result[window - 1 :] = (cumsum[window:] - cumsum[:-window]) / window
+    return result
+
+
+def exponential_moving_average(values, span):
+    """
+    Compute the exponential moving average with alpha = 2 / (span + 1), seeded with the first value.
+
+    The recurrence ema[t] = alpha * x[t] + (1 - alpha) * ema[t - 1] is solved in blocks: inside a
+    block every value is rescaled by (1 - alpha) ** -k so the recurrence becomes a cumulative sum.
+    Blocks end before the rescaling grows past 1 / EMA_BLOCK_WEIGHT, which keeps the result
+    accurate for any series length.
+
+    :param values: numpy.ndarray, series in date order
+    :param span: int, span of the average
+    :return: numpy.ndarray, same length as values
+    """
+    result = np.empty(len(values))
+    if not len(values):
+        return result
+    alpha = 2 / (span + 1)
+    decay = 1 - alpha
+    block = max(1, int(np.log(EMA_BLOCK_WEIGHT) / np.log(decay))) if decay else 1
+    powers = decay ** np.arange(block + 1)
+
+    state = values[0]
+    for start in range(0, len(values), block):
+        chunk = values[start : start + block]
+        n = len(chunk)
+        scaled = np.cumsum(chunk / powers[:n])
+        result[start : start + n] = (
+            powers[1 : n + 1] * state + alpha * powers[:n] * scaled
+        )
+        state = result[start + n - 1]
+    return result
+
+
+def rolling_volatility(returns, window):
+    """
+    Compute the rolling sample standard deviation of daily returns.
+
+    :param returns: numpy.ndarray, daily returns, NaN for the first day
+    :param window: int, number of returns in each window
+    :return: numpy.ndarray, same length as returns, NaN until the window holds window returns
+    """
+    result = np.full(len(returns), np.nan)
+    if len(returns) > window:
+        windows = np.lib.stride_tricks.sliding_window_view(returns[1:], window)
+        result[window:] = windows.std(axis=1, ddof=1)
+    return result
+
+
+def max_drawdown(close):
+    """
+    Find the largest drop from a running peak of a close price series.
+
+    :param close: numpy.ndarray, close prices in date order
+    :return: tuple, (drawdown as a negative fraction, index of the peak, index of the trough),
+        (0.0, None, None) when prices never fall below an earlier peak
+    """
+    if not len(close):
+        return 0.0, None, None
+    peaks = np.maximum.accumulate(close)
+    drawdowns = close / peaks - 1
+    trough = int(np.argmin(drawdowns))
+    if drawdowns[trough] == 0:
+        return 0.0, None, None
+    peak = int(np.argmax(close[: trough + 1]))
+    return float(drawdowns[trough]), peak, trough
+
+
+def price_matrix(rows, symbols):
+    """
+    Align the prices of many symbols by date into a matrix.
+
+    :param rows: iterable of tuple, (date, symbol, price) rows in any order
+    :param symbols: list of str, symbols of the columns
+    :return: numpy.ndarray of shape (dates, symbols) in date order, NaN where a symbol has no
+        price on a date
+    """
+    rows = list(rows)
+    dates, names, prices = zip(*rows) if rows else ((), (), ())
+    dates, date_index = np.unique(
+        np.array(dates, dtype="datetime64[D]"), return_inverse=True
+    )
+    columns = {symbol: i for i, symbol in enumerate(symbols)}
+    matrix = np.full((len(dates), len(symbols)), np.nan)
+    matrix[date_index, [columns[name] for name in names]] = np.array(
+        prices, dtype=np.float64
+    )
+    return matrix
+
+
+def correlation_matrix(returns, min_observations):
+    """
+    Compute the Pearson correlation of every pair of columns over the rows where both are known.
+
+    Pairwise-complete sums are computed for all pairs at once with matrix products of the
+    values and of the masks of known values, so the cost is a few (symbols x dates) by
+    (dates x symbols) products instead of a loop over pairs.
+
+    :param returns: numpy.ndarray of shape (dates, symbols), NaN where a value is unknown
+    :param min_observations: int, fewest common observations a pair needs
+    :return: numpy.ndarray of shape (symbols, symbols), NaN for pairs with too few common
+        observations or a constant series
+    """
+    known = ~np.isnan(returns)
+    mask = known.astype(np.float64)
+    values = np.where(known, returns, 0.0)
+
+    # count[i, j] rows where both are known, sums[i, j] sum of column i over those rows
+    count = mask.T @ mask
+    sums = values.T @ mask
+    squares = (values**2).T @ mask
+    products = values.T @ values
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = products - sums * sums.T / count
+        variance = squares - sums**2 / count
+        correlation = covariance / np.sqrt(variance * variance.T)
+    correlation[(count < min_observations) | ~np.isfinite(correlation)] = np.nan
+    return np.clip(correlation, -1.0, 1.0)
+
+
+def to_list(values):
+    """
+    Convert a series to a JSON friendly list, NaN becomes None.
+    """
+    return [None if value != value else value for value in values.tolist()]
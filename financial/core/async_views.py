@@ -0,0 +1,159 @@
+"""
+Async versions of FinancialDataAPIView and StatisticsAPIView for the ASGI deployment.
+
+They read the database with Django's async ORM API, so a worker keeps serving other requests
+while a query is in flight. Modes without an async implementation (keyset pages, statistics of
+many symbols) run the sync view code with sync_to_async. Responses, cache entries and ETags are
+the same as the sync views', rendered as JSON only.
+"""
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.db.models import Avg, Sum
+from django.http import HttpResponse, HttpResponseNotAllowed
+from rest_framework import status
+from rest_framework.request import Request
+
+from .cache import (
+    API_CACHE_ALIAS,
+    add_validators,
+    aget_request_data_version,
+    get_not_modified_response,
+    get_response_cache_key,
+    get_response_validators,
+)
+from .metrics import observe_cache
+from .middleware import timed
+from .renderers import FastJSONRenderer
+from .views import FinancialDataAPIView, StatisticsAPIView, get_rollup_difference
+
+
+def async_api_view(prefix, get_error_data, validate=None):
+    """
+    Turn an async function computing response data into a view.
+
+    The view answers conditional GETs and caches data like conditional_response and
+    cache_response do for the sync views, with the same keys and ETags.
+
+    :param prefix: str, cache key prefix shared with the sync view
+    :param get_error_data: function taking the exception and returning the data of a 400 response
+    :param validate: function taking the request and raising on invalid query parameters, shared
+        with the sync view, or None
+    """
+    renderer = FastJSONRenderer()
+
+    def decorator(get_data):
+        @wraps(get_data)
+        async def view(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return HttpResponseNotAllowed(["GET", "HEAD"])
+            request = Request(request)
+
+            # The version is read asynchronously, the validators then find it on the request
+            await aget_request_data_version(request)
+            etag, last_modified = get_response_validators(
+                prefix, request, renderer.media_type
+            )
+            response = get_not_modified_response(
+                request, etag, last_modified, validate
+            )
+            if response is not None:
+                return response
+            response = await get_response(request, get_data)
+            return add_validators(request, response, etag, last_modified)
+
+        async def get_response(request, get_data):
+            cache = caches[API_CACHE_ALIAS]
+            use_cache = not isinstance(cache, DummyCache)
+            key = get_response_cache_key(prefix, request)
+            data = await cache.aget(key) if use_cache else None
+            if use_cache:
+                observe_cache(API_CACHE_ALIAS, data is not None)
+            if data is not None:
+                return render(data, status.HTTP_200_OK)
+
+            try:
+                data = await get_data(request)
+            except Exception as e:
+                return render(get_error_data(e), status.HTTP_400_BAD_REQUEST)
+            if use_cache:
+                await cache.aset(key, data)
+            return render(data, status.HTTP_200_OK)
+
+        def render(data, status_code):
+            return HttpResponse(
+                renderer.render(data),
+                status=status_code,
+                content_type=renderer.media_type,
+            )
+
+        return view
+
+    return decorator
+
+
+@async_api_view(
+    "financial_data",
+    lambda e: {"data": [], "pagination": {}, "info": {"error": str(e)}},
+    FinancialDataAPIView().validate_params,
+)
+async def financial_data(request):
+    view = FinancialDataAPIView()
+
+    # Pages in the snapshot are read without a query, the data version is already looked up
+    data = view.get_snapshot_data(request)
+    if data is not None:
+        return data
+
+    # Keyset pages have no async implementation
+    if "cursor" in request.query_params:
+        return await sync_to_async(view.get_data)(request)
+
+    # Get the queryset based on the filters provided in the request
+    queryset, serializer_class = view.get_filtered_queryset(request)
+
+    # Paginate the results
+    paginator = view.pagination_class()
+    paginator.page_size = request.query_params.get("limit", 5)
+    result_page = await paginator.apaginate_queryset(queryset, request)
+    # Daily rows and bars both have list serializers that read the page with the async ORM
+    with timed("serialize"):
+        data = await serializer_class(result_page, many=True).adata()
+
+    # Construct the response data
+    return view.get_page_data(request, data, paginator)
+
+
+@async_api_view(
+    "statistics",
+    lambda e: {"data": {}, "info": {"error": str(e)}},
+    StatisticsAPIView().get_params,
+)
+async def statistics(request):
+    view = StatisticsAPIView()
+    start_date, end_date, symbols = view.get_params(request)
+    data = view.get_snapshot_data(request, start_date, end_date, symbols)
+    if data is not None:
+        return data
+
+    # Statistics of many symbols have no async implementation
+    if len(symbols) > 1:
+        statistics = await sync_to_async(view.get_statistics_by_symbol)(
+            symbols, start_date, end_date
+        )
+        return view.get_many_data(start_date, end_date, statistics)
+
+    # Calculate the statistics from the rollup, or with a single aggregate query
+    symbol = symbols[0]
+    end_totals, start_totals = view.get_rollup_querysets(symbol, start_date, end_date)
+    end = await end_totals.afirst()
+    if end is None:
+        statistics = await view.get_aggregate_queryset(
+            symbol, start_date, end_date
+        ).aaggregate(Avg("open_price"), Avg("close_price"), Sum("volume"))
+    else:
+        statistics = get_rollup_difference(end, await start_totals.afirst())
+    return view.get_single_data(start_date, end_date, symbol, statistics)
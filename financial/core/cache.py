@@ -0,0 +1,233 @@
+import datetime
+import hashlib
+from functools import wraps
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.db.models import Max, Sum
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .metrics import observe_cache
+from .models import FinancialDataIngestModel
+from .routers import pin_if_recently_ingested
+
+API_CACHE_ALIAS = "api"
+
+
+def get_request_symbols(request):
+    """
+    Return the symbols a request asks for, or None if it is not restricted to any symbol.
+    """
+    symbol = request.query_params.get("symbol")
+    if not symbol:
+        return None
+    return sorted({s for s in symbol.split(",") if s})
+
+
+def get_data_version(symbols=None):
+    """
+    Return the data version and last ingest time of the given symbols, or of all symbols.
+
+    Every ingest of a symbol bumps its version, so the sum over the symbols changes whenever any of
+    their data changes.
+
+    :param symbols: list of str, symbols to read the version of, None for all symbols
+    :return: tuple, (int version, datetime of the last ingest or None)
+    """
+    result = get_ingest_queryset(symbols).aggregate(Sum("version"), Max("updated_at"))
+    return result["version__sum"] or 0, result["updated_at__max"]
+
+
+def get_ingest_queryset(symbols=None):
+    queryset = FinancialDataIngestModel.objects.all()
+    if symbols is not None:
+        queryset = queryset.filter(symbol__in=symbols)
+    return queryset
+
+
+def get_request_data_version(request):
+    """
+    Return get_data_version() for the symbols of the request, looked up once per request.
+
+    The request reads from the primary database from then on if the symbols were just ingested.
+    """
+    if not hasattr(request, "_data_version"):
+        request._data_version = get_data_version(get_request_symbols(request))
+        pin_if_recently_ingested(request._data_version[1])
+    return request._data_version
+
+
+async def aget_request_data_version(request):
+    """
+    Async counterpart of get_request_data_version().
+    """
+    if not hasattr(request, "_data_version"):
+        queryset = get_ingest_queryset(get_request_symbols(request))
+        result = await queryset.aaggregate(Sum("version"), Max("updated_at"))
+        request._data_version = result["version__sum"] or 0, result["updated_at__max"]
+        pin_if_recently_ingested(request._data_version[1])
+    return request._data_version
+
+
+def get_response_cache_key(prefix, request):
+    """
+    Build a cache key from the canonicalized query parameters and the data version of the request.
+
+    The symbol list is canonicalized as a set, responses only differ in the order of the symbol
+    keys, which JSON objects do not define.
+    """
+    params = request.query_params
+    if hasattr(params, "lists"):
+        items = sorted((key, sorted(values)) for key, values in params.lists())
+    else:
+        items = sorted((key, [value]) for key, value in params.items())
+    items = [
+        (key, get_request_symbols(request)) if key == "symbol" else (key, values)
+        for key, values in items
+    ]
+    digest = hashlib.sha1(repr(items).encode()).hexdigest()
+    version, _ = get_request_data_version(request)
+    return f"{prefix}:{version}:{digest}"
+
+
+def cache_response(prefix):
+    """
+    Cache the data of successful responses of a view method in the "api" cache.
+
+    Keys include the data version of the requested symbols, so an ingest makes the old entries
+    unreachable instead of serving them; they are evicted by the backend's TTL and culling.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            cache = caches[API_CACHE_ALIAS]
+            if isinstance(cache, DummyCache):
+                return method(self, request, *args, **kwargs)
+
+            key = get_response_cache_key(prefix, request)
+            data = cache.get(key)
+            observe_cache(API_CACHE_ALIAS, data is not None)
+            if data is not None:
+                return Response(data)
+
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def get_response_etag(prefix, request, media_type):
+    """
+    Build the unquoted strong ETag of a response from its cache key and media type.
+    """
+    key = f"{get_response_cache_key(prefix, request)}:{media_type}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def get_response_validators(prefix, request, media_type):
+    """
+    Return the quoted strong ETag of a response and its Last-Modified timestamp, or None.
+    """
+    etag = quote_etag(get_response_etag(prefix, request, media_type))
+    _, updated_at = get_request_data_version(request)
+    if not updated_at:
+        return etag, None
+    if not timezone.is_aware(updated_at):
+        updated_at = timezone.make_aware(updated_at, datetime.timezone.utc)
+    return etag, int(updated_at.timestamp())
+
+
+def get_not_modified_response(request, etag, last_modified, validate=None):
+    """
+    Answer 304 Not Modified before the view runs when the preconditions of the request say so.
+
+    Only successful responses carry an ETag and the ETag stands for the parameters and the data
+    version, so a request whose If-None-Match lists it would get 200 with the same data again.
+    If-Modified-Since and If-None-Match: * are only answered here when validate accepts the query
+    parameters, an invalid request gets 400 and never 304. Otherwise they are checked by
+    add_validators() once the view answered.
+
+    :param validate: function taking the request and raising on invalid query parameters without
+        reading any rows, or None
+    :return: HttpResponse, or None when the view has to run
+    """
+    if not is_valid_request(request, validate):
+        etags = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        if etag not in [e[2:] if e.startswith("W/") else e for e in etags]:
+            return None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def is_valid_request(request, validate):
+    if validate is None:
+        return False
+    try:
+        validate(request)
+    except Exception:
+        return False
+    return True
+
+
+def add_validators(request, response, etag, last_modified):
+    """
+    Add the validators to a successful response, or answer 304 Not Modified instead when the
+    preconditions of the request say so. Error responses get no validators and are never 304.
+    """
+    if response.status_code != status.HTTP_200_OK:
+        return response
+    set_validators(response, etag, last_modified)
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified, response=response
+    )
+
+
+def set_validators(response, etag, last_modified):
+    if last_modified and not response.has_header("Last-Modified"):
+        response.headers["Last-Modified"] = http_date(last_modified)
+    response.headers.setdefault("ETag", etag)
+
+
+def conditional_response(prefix, validate=None):
+    """
+    Answer conditional GETs of a view method with 304 Not Modified.
+
+    The strong ETag is derived from the same canonical parameters and data version as the cache
+    key, and Last-Modified is the last ingest time of the requested symbols. A matching
+    If-None-Match, or any precondition once validate accepted the parameters, is answered without
+    running the view, see get_not_modified_response().
+
+    :param validate: str, name of the view method validating the query parameters, or None
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            # Representations negotiated from the same parameters (JSON, HTML, CSV) differ
+            media_type = getattr(request, "accepted_media_type", "")
+            etag, last_modified = get_response_validators(prefix, request, media_type)
+            response = get_not_modified_response(
+                request,
+                etag,
+                last_modified,
+                getattr(self, validate) if validate else None,
+            )
+            if response is not None:
+                return response
+            response = method(self, request, *args, **kwargs)
+            return add_validators(request, response, etag, last_modified)
+
+        return wrapper
+
+    return decorator
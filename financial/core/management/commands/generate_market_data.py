@@ -0,0 +1,222 @@
+"""
+Generate synthetic price histories at production scale, for load tests and benchmarks.
+
+    python manage.py generate_market_data --symbols 2000 --years 20 --seed 1
+
+Every symbol gets a random walk of close prices over consecutive business days, opens that gap
+from the previous close and log-normal volumes. The history of a symbol only depends on the seed
+and its number, so the same arguments always generate the same rows. Rows are inserted with
+executemany() in large batches, which mysqlclient sends as multi-row INSERT statements, the rollup
+rows of the symbols are rebuilt and their ingest versions bumped so the API serves them like
+ingested data.
+"""
+
+import time
+from datetime import date
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F, Min
+from django.utils import timezone
+
+from core.models import (
+    FinancialDataIngestModel,
+    FinancialDataModel,
+    FinancialDataRollupModel,
+)
+
+TRADING_DAYS_PER_YEAR = 252
+# Symbols whose old rows are deleted, and whose rollup is rebuilt, in one statement
+SYMBOLS_PER_STATEMENT = 500
+
+INSERT_SQL = (
+    "INSERT INTO financial_data (symbol, date, open_price, close_price, volume) "
+    "VALUES (%s, %s, %s, %s, %s)"
+)
+ROLLUP_SQL = """
+    INSERT INTO financial_data_rollup
+        (symbol, date, cum_open_price, cum_close_price, cum_volume, cum_count)
+    SELECT symbol, date, SUM(open_price) OVER w, SUM(close_price) OVER w, SUM(volume) OVER w,
+        COUNT(*) OVER w
+    FROM financial_data
+    WHERE symbol IN ({symbols})
+    WINDOW w AS (PARTITION BY symbol ORDER BY date)
+"""
+
+
+def generate_history(seed, number, days):
+    """
+    Generate the price history of one synthetic symbol.
+
+    :param seed: int, seed of the whole data set
+    :param number: int, number of the symbol
+    :param days: int, number of trading days
+    :return: tuple of numpy.ndarray, (open_price, close_price, volume) rounded to cents
+    """
+    rng = np.random.default_rng([seed, number])
+    start = rng.uniform(10, 500)
+    drift, volatility = rng.normal(0.0003, 0.0002), rng.uniform(0.01, 0.03)
+    close = start * np.exp(np.cumsum(rng.normal(drift, volatility, days)))
+    previous = np.concatenate(([start], close[:-1]))
+    open_price = previous * (1 + rng.normal(0, volatility / 4, days))
+    volume = rng.lognormal(rng.uniform(12, 17), 0.5, days).astype(np.int64)
+    # Prices of a cent or more, so the two-place decimals stay positive
+    return (
+        np.maximum(np.round(open_price, 2), 0.01),
+        np.maximum(np.round(close, 2), 0.01),
+        volume,
+    )
+
+
+def generate_rows(symbols, days, start_date, seed, prefix):
+    """
+    Yield (symbol, date, open_price, close_price, volume) rows, symbol by symbol in date order.
+    """
+    dates = np.busday_offset(start_date, np.arange(days), roll="forward")
+    dates = [str(d) for d in dates]
+    for number in range(symbols):
+        open_price, close_price, volume = generate_history(seed, number, days)
+        yield from zip(
+            [symbol_name(prefix, number)] * days,
+            dates,
+            [f"{p:.2f}" for p in open_price.tolist()],
+            [f"{p:.2f}" for p in close_price.tolist()],
+            volume.tolist(),
+        )
+
+
+def symbol_name(prefix, number):
+    return f"{prefix}{number:05d}"
+
+
+class Command(BaseCommand):
+    help = "Generate deterministic random-walk price histories into financial_data."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--symbols", type=int, default=100)
+        parser.add_argument("--years", type=float, default=10)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--start-date", type=date.fromisoformat, default=date(2000, 1, 3)
+        )
+        parser.add_argument("--prefix", default="SYM", help="symbol name prefix")
+        parser.add_argument("--batch-size", type=int, default=20000)
+        parser.add_argument(
+            "--flush",
+            action="store_true",
+            help="delete the rows of all symbols first, not only the generated ones",
+        )
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        symbols, prefix = options["symbols"], options["prefix"]
+        days = int(round(options["years"] * TRADING_DAYS_PER_YEAR))
+        if symbols < 1 or days < 1:
+            raise CommandError("--symbols and --years must give at least one row")
+        if len(symbol_name(prefix, symbols - 1)) > 20:
+            raise CommandError("Symbol names are limited to 20 characters")
+        connection = connections[options["database"]]
+        names = [symbol_name(prefix, n) for n in range(symbols)]
+
+        started = time.perf_counter()
+        self.clear(connection, names, options["flush"])
+
+        batch, rows = [], 0
+        for row in generate_rows(
+            symbols, days, options["start_date"], options["seed"], prefix
+        ):
+            batch.append(row)
+            if len(batch) == options["batch_size"]:
+                rows += self.insert(connection, batch)
+                batch = []
+        if batch:
+            rows += self.insert(connection, batch)
+
+        last_date = np.busday_offset(
+            options["start_date"], days - 1, roll="forward"
+        ).item()
+        self.finish(connection, names, last_date)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Generated {rows} rows of {symbols} symbols in {elapsed:.1f}s "
+            f"({rows / elapsed * 60:,.0f} rows/min)"
+        )
+
+    def clear(self, connection, names, flush):
+        """
+        Delete the rows and rollup rows of the generated symbols, or of all symbols with flush.
+
+        Ingest rows are kept, data versions must only grow or responses cached for old rows
+        would be served again. A flush bumps the version of every symbol it wipes and moves its
+        watermark back to its first stored day, so the next ingest fetches its history again.
+        """
+        alias = connection.alias
+        if flush:
+            ingest = FinancialDataIngestModel.objects.using(alias)
+            first_dates = dict(
+                FinancialDataModel.objects.using(alias)
+                .values("symbol")
+                .annotate(Min("date"))
+                .values_list("symbol", "date__min")
+            )
+            tables = [
+                model._meta.db_table
+                for model in (FinancialDataModel, FinancialDataRollupModel)
+            ]
+            connection.ops.execute_sql_flush(
+                connection.ops.sql_flush(no_style(), tables)
+            )
+            with transaction.atomic(using=alias):
+                ingest.update(version=F("version") + 1, updated_at=timezone.now())
+                rewound = []
+                for row in ingest.only("symbol", "last_date"):
+                    if row.symbol in first_dates:
+                        row.last_date = first_dates[row.symbol]
+                        rewound.append(row)
+                ingest.bulk_update(
+                    rewound, ["last_date"], batch_size=SYMBOLS_PER_STATEMENT
+                )
+            return
+        for i in range(0, len(names), SYMBOLS_PER_STATEMENT):
+            chunk = names[i : i + SYMBOLS_PER_STATEMENT]
+            with transaction.atomic(using=alias):
+                for model in (FinancialDataModel, FinancialDataRollupModel):
+                    model.objects.using(alias).filter(symbol__in=chunk).delete()
+
+    def insert(self, connection, batch):
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.executemany(INSERT_SQL, batch)
+        return len(batch)
+
+    def finish(self, connection, names, last_date):
+        """
+        Build the rollup rows of the generated symbols and bump their data versions.
+        """
+        alias = connection.alias
+        ingest = FinancialDataIngestModel.objects.using(alias)
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            for i in range(0, len(names), SYMBOLS_PER_STATEMENT):
+                chunk = names[i : i + SYMBOLS_PER_STATEMENT]
+                cursor.execute(
+                    ROLLUP_SQL.format(symbols=", ".join(["%s"] * len(chunk))), chunk
+                )
+                # Upsert version + 1, so responses cached for the old rows are never served again
+                ingest.bulk_create(
+                    [
+                        FinancialDataIngestModel(
+                            symbol=symbol, last_date=last_date, version=0
+                        )
+                        for symbol in chunk
+                    ],
+                    ignore_conflicts=True,
+                )
+                # The rollup was rebuilt at the new version. MySQL assigns from left to right, so
+                # rollup_version is set before version is bumped
+                ingest.filter(symbol__in=chunk).update(
+                    last_date=last_date,
+                    rollup_version=F("version") + 1,
+                    version=F("version") + 1,
+                    updated_at=timezone.now(),
+                )
@@ -0,0 +1,137 @@
+"""
+Prometheus metrics of the web tier, served at /metrics in the Prometheus text format.
+
+Pre-forked workers each count their own requests. With PROMETHEUS_MULTIPROC_DIR set, which
+gunicorn.conf.py does, prometheus_client keeps the values of every process in memory-mapped files
+in that directory and /metrics adds up the files of all workers, whichever worker answers the
+scrape. Without it the values are those of the answering process only, which is right for
+runserver and a single uvicorn process.
+"""
+
+import os
+import time
+
+from django.db.backends.signals import connection_created
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    multiprocess,
+)
+
+# Latencies of the API range from a cached response to a multi-symbol aggregate over years
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+QUERY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1,
+    5,
+)
+
+REQUESTS = Counter(
+    "financial_http_requests",
+    "HTTP requests by route, method and status code.",
+    ["route", "method", "status"],
+)
+REQUEST_DURATION = Histogram(
+    "financial_http_request_duration_seconds",
+    "Time to answer HTTP requests by route.",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "financial_http_requests_in_progress",
+    "HTTP requests being answered.",
+    multiprocess_mode="livesum",
+)
+EXCEPTIONS = Counter(
+    "financial_http_exceptions",
+    "Exceptions raised by views and not handled by them, by route and type.",
+    ["route", "exception"],
+)
+QUERY_DURATION = Histogram(
+    "financial_db_query_duration_seconds",
+    "Time of the SQL queries by database alias.",
+    ["database"],
+    buckets=QUERY_BUCKETS,
+)
+CONNECTIONS = Counter(
+    "financial_db_connections",
+    "Database connections opened by database alias.",
+    ["database"],
+)
+CACHE_REQUESTS = Counter(
+    "financial_cache_requests",
+    "Lookups of the response cache and the snapshot, by result (hit or miss).",
+    ["cache", "result"],
+)
+
+
+def observe_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def observe_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper timing every query of a connection.
+    """
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        QUERY_DURATION.labels(context["connection"].alias).observe(
+            time.perf_counter() - started
+        )
+
+
+def instrument_connection(sender, connection, **kwargs):
+    """
+    Count a new database connection and time its queries.
+
+    The wrapper stays installed for the life of the connection object, in whatever thread it runs,
+    so queries cost no per-request setup. The object is reused when Django reconnects.
+    """
+    CONNECTIONS.labels(connection.alias).inc()
+    if observe_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(observe_query)
+
+
+def connect_signals():
+    connection_created.connect(
+        instrument_connection, dispatch_uid="core.metrics.instrument_connection"
+    )
+
+
+def get_registry():
+    """
+    Return the registry to export, aggregating the files of all processes in multiprocess mode.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
@@ -0,0 +1,234 @@
+"""
+Per-request timings of the web tier, reported in a Server-Timing header and a log line, and the
+request metrics of /metrics.
+
+ServerTimingMiddleware times a sample of the requests (settings.SERVER_TIMING_SAMPLE_RATE):
+
+- db: number and total time of the SQL queries, counted by an execute wrapper on every database
+  connection, so pagination counts and data version lookups are included;
+- serialize: time spent turning rows into response data, less the queries reading the rows;
+- render: time spent encoding the response data to JSON;
+- view: time from calling the view to the response, less render, so including serialize and db;
+- total: time of the whole request.
+
+Views and renderers mark their steps with timed(), which does nothing outside a sampled request.
+Requests that are not sampled only cost a random number.
+"""
+
+import json
+import time
+import random
+import logging
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger("core.timing")
+
+# Timings of the current request, or of the task under ASGI, None when it is not sampled
+_current = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """
+    Durations of the steps of one request, in seconds.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.queries = 0
+        self.steps = {"db": 0.0}
+
+    def add(self, name, duration):
+        self.steps[name] = self.steps.get(name, 0.0) + duration
+
+    def __call__(self, execute, sql, params, many, context):
+        # Database execute wrapper
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.steps["db"] += time.perf_counter() - started
+            self.queries += 1
+
+    def wrap_queries(self):
+        """
+        Count the queries of the connections of this thread until the returned stack is closed.
+
+        connection.execute_wrapper() pops the last wrapper on exit, which is observe_query when
+        the connection was opened during the request, so the wrapper is removed by identity.
+        """
+        stack = ExitStack()
+        for connection in connections.all():
+            connection.execute_wrappers.append(self)
+            stack.callback(connection.execute_wrappers.remove, self)
+        return stack
+
+
+@contextmanager
+def timed(name):
+    """
+    Add the time spent in the block, less its queries, to the named step of the current request.
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started, db = time.perf_counter(), timings.steps["db"]
+    try:
+        yield
+    finally:
+        queries = timings.steps["db"] - db
+        timings.add(name, time.perf_counter() - started - queries)
+
+
+class ServerTimingMiddleware:
+    """
+    Report the timings of a sample of the requests, see the module docstring.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.is_sampled():
+            return self.get_response(request)
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            with timings.wrap_queries():
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        if not self.is_sampled():
+            return await self.get_response(request)
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        # Connections belong to threads, the request runs its queries in its sync thread
+        queries = await sync_to_async(timings.wrap_queries)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(queries.close)()
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = _current.get()
+        if timings is not None:
+            timings.view_started = time.perf_counter()
+
+    def is_sampled(self):
+        rate = settings.SERVER_TIMING_SAMPLE_RATE
+        return rate >= 1 or random.random() < rate
+
+    def finish(self, request, response, timings):
+        """
+        Add the Server-Timing header to the response and log the timings.
+        """
+        steps = timings.steps
+        finished = time.perf_counter()
+        # DRF responses are rendered after the view returned, async views render inside the view
+        if timings.view_started is not None:
+            steps["view"] = finished - timings.view_started - steps.get("render", 0.0)
+        steps["total"] = finished - timings.started
+
+        entries = [f'db;dur={steps["db"] * 1000:.2f};desc="{timings.queries} queries"']
+        entries += [
+            f"{name};dur={duration * 1000:.2f}"
+            for name, duration in steps.items()
+            if name != "db"
+        ]
+        response["Server-Timing"] = ", ".join(entries)
+
+        if not logger.isEnabledFor(logging.INFO):
+            return response
+        logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.get_full_path(),
+                    "status": response.status_code,
+                    "queries": timings.queries,
+                    **{
+                        f"{name}_ms": round(duration * 1000, 3)
+                        for name, duration in steps.items()
+                    },
+                }
+            )
+        )
+        return response
+
+
+def get_route(request):
+    """
+    Return the URL pattern a request matched, which keeps the metric labels few.
+    """
+    match = getattr(request, "resolver_match", None)
+    return "/" + match.route if match is not None else "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Count every request and its latency by route and status code for /metrics.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        metrics.REQUESTS_IN_PROGRESS.inc()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.REQUESTS_IN_PROGRESS.dec()
+        self.observe(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        metrics.REQUESTS_IN_PROGRESS.inc()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.REQUESTS_IN_PROGRESS.dec()
+        self.observe(request, response, started)
+        return response
+
+    def process_exception(self, request, exception):
+        metrics.EXCEPTIONS.labels(get_route(request), type(exception).__name__).inc()
+
+    def observe(self, request, response, started):
+        route = get_route(request)
+        metrics.REQUEST_DURATION.labels(route, request.method).observe(
+            time.perf_counter() - started
+        )
+        metrics.REQUESTS.labels(route, request.method, response.status_code).inc()
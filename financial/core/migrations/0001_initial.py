@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-16 22:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="FinancialDataIngestModel",
+            fields=[
+                (
+                    "symbol",
+                    models.CharField(max_length=20, primary_key=True, serialize=False),
+                ),
+                ("last_date", models.DateField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "financial_data_ingest",
+            },
+        ),
+        migrations.CreateModel(
+            name="FinancialDataModel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("symbol", models.CharField(max_length=20)),
+                ("date", models.DateField()),
+                ("open_price", models.DecimalField(decimal_places=2, max_digits=20)),
+                ("close_price", models.DecimalField(decimal_places=2, max_digits=20)),
+                ("volume", models.BigIntegerField()),
+            ],
+            options={
+                "db_table": "financial_data",
+            },
+        ),
+    ]
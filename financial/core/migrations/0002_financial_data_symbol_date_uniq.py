@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-16 22:31
+
+from django.db import migrations, models, transaction
+from django.db.models import Count, Max, Q
+
+from core.operations import IfMissing
+
+# Number of duplicated (symbol, date) groups removed per transaction
+DELETE_BATCH_SIZE = 500
+
+
+def delete_duplicate_rows(apps, schema_editor):
+    """
+    Keep only the most recently inserted row of every (symbol, date) pair.
+
+    Duplicates are deleted in small transactions so the table stays writable while the
+    migration runs on a large, live table.
+    """
+    FinancialDataModel = apps.get_model("core", "FinancialDataModel")
+    db_alias = schema_editor.connection.alias
+    duplicates = list(
+        FinancialDataModel.objects.using(db_alias)
+        .values("symbol", "date")
+        .annotate(keep_id=Max("id"), rows=Count("id"))
+        .filter(rows__gt=1)
+        .values_list("symbol", "date", "keep_id")
+    )
+    for start in range(0, len(duplicates), DELETE_BATCH_SIZE):
+        condition = Q()
+        for symbol, date, keep_id in duplicates[start : start + DELETE_BATCH_SIZE]:
+            condition |= Q(symbol=symbol, date=date, id__lt=keep_id)
+        with transaction.atomic(using=db_alias):
+            FinancialDataModel.objects.using(db_alias).filter(condition).delete()
+
+
+class Migration(migrations.Migration):
+    # every batch of deletes commits on its own instead of locking the table until the end
+    atomic = False
+
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_rows, migrations.RunPython.noop),
+        IfMissing(
+            migrations.AddConstraint(
+                model_name="financialdatamodel",
+                constraint=models.UniqueConstraint(
+                    fields=("symbol", "date"), name="financial_data_symbol_date_uniq"
+                ),
+            )
+        ),
+    ]
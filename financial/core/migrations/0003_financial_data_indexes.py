@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-16 22:32
+
+from django.db import migrations, models
+
+from core.operations import IfMissing
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0002_financial_data_symbol_date_uniq"),
+    ]
+
+    operations = [
+        IfMissing(
+            migrations.AddIndex(
+                model_name="financialdatamodel",
+                index=models.Index(fields=["date"], name="financial_data_date_idx"),
+            )
+        ),
+        IfMissing(
+            migrations.AddIndex(
+                model_name="financialdatamodel",
+                index=models.Index(
+                    fields=["symbol", "date", "open_price", "close_price", "volume"],
+                    name="financial_data_covering_idx",
+                ),
+            )
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-16 22:33
+
+from django.db import migrations, models
+
+from core.operations import IfMissing
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0003_financial_data_indexes"),
+    ]
+
+    operations = [
+        IfMissing(
+            migrations.CreateModel(
+                name="FinancialDataRollupModel",
+                fields=[
+                    (
+                        "id",
+                        models.BigAutoField(
+                            auto_created=True,
+                            primary_key=True,
+                            serialize=False,
+                            verbose_name="ID",
+                        ),
+                    ),
+                    ("symbol", models.CharField(max_length=20)),
+                    ("date", models.DateField()),
+                    (
+                        "cum_open_price",
+                        models.DecimalField(decimal_places=2, max_digits=30),
+                    ),
+                    (
+                        "cum_close_price",
+                        models.DecimalField(decimal_places=2, max_digits=30),
+                    ),
+                    ("cum_volume", models.BigIntegerField()),
+                    ("cum_count", models.IntegerField()),
+                ],
+                options={
+                    "db_table": "financial_data_rollup",
+                },
+            )
+        ),
+        IfMissing(
+            migrations.AddConstraint(
+                model_name="financialdatarollupmodel",
+                constraint=models.UniqueConstraint(
+                    fields=("symbol", "date"),
+                    name="financial_data_rollup_symbol_date_uniq",
+                ),
+            )
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-16 22:35
+
+from django.db import migrations, models
+
+from core.operations import IfMissing
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0004_financial_data_rollup"),
+    ]
+
+    operations = [
+        IfMissing(
+            migrations.AddField(
+                model_name="financialdataingestmodel",
+                name="version",
+                field=models.BigIntegerField(default=0),
+            )
+        ),
+    ]
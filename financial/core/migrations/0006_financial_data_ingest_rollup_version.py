@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+from core.operations import IfMissing
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0005_financial_data_ingest_version"),
+    ]
+
+    operations = [
+        IfMissing(
+            migrations.AddField(
+                model_name="financialdataingestmodel",
+                name="rollup_version",
+                field=models.BigIntegerField(default=0),
+            )
+        ),
+    ]
@@ -13,3 +13,61 @@ class FinancialDataModel(models.Model):
 
     class Meta:
         db_table = "financial_data"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["symbol", "date"], name="financial_data_symbol_date_uniq"
+            )
+        ]
+        # (symbol, date) lookups are served by the unique constraint above
+        indexes = [
+            models.Index(fields=["date"], name="financial_data_date_idx"),
+            # covers the statistics aggregates, so they are answered from the index alone
+            models.Index(
+                fields=["symbol", "date", "open_price", "close_price", "volume"],
+                name="financial_data_covering_idx",
+            ),
+        ]
+
+
+class FinancialDataIngestModel(models.Model):
+    symbol = models.CharField(max_length=20, primary_key=True)
+    last_date = models.DateField()
+    # bumped by every ingest of the symbol, cached API responses are keyed on it
+    version = models.BigIntegerField(default=0)
+    # the version the rollup of the symbol was last rebuilt at, the rollup is only read while the
+    # two are equal
+    rollup_version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.symbol} - {self.last_date}"
+
+    class Meta:
+        db_table = "financial_data_ingest"
+
+
+class FinancialDataRollupModel(models.Model):
+    """
+    Running totals of a symbol's financial data up to and including each date.
+
+    The statistics of any date range are the difference of two rows, so they cost two
+    indexed lookups whatever the length of the range. Maintained by get_raw_data.py.
+    """
+
+    symbol = models.CharField(max_length=20)
+    date = models.DateField()
+    cum_open_price = models.DecimalField(max_digits=30, decimal_places=2)
+    cum_close_price = models.DecimalField(max_digits=30, decimal_places=2)
+    cum_volume = models.BigIntegerField()
+    cum_count = models.IntegerField()
+
+    def __str__(self):
+        return f"{self.symbol} - {self.date}"
+
+    class Meta:
+        db_table = "financial_data_rollup"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["symbol", "date"], name="financial_data_rollup_symbol_date_uniq"
+            )
+        ]
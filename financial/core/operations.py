@@ -0,0 +1,80 @@
+"""
+Migration operations that tolerate the schema created by get_raw_data.py.
+
+The ingest script creates its tables from schema.sql, with the same key and index names as the
+models, so a database may already have what a migration adds. `migrate --fake-initial` only skips
+0001_initial, the later migrations wrap their schema operations in IfMissing instead.
+"""
+
+from django.db.migrations.operations import (
+    AddConstraint,
+    AddField,
+    AddIndex,
+    CreateModel,
+)
+from django.db.migrations.operations.base import Operation
+
+
+class IfMissing(Operation):
+    """
+    Apply a CreateModel, AddField, AddIndex or AddConstraint operation to the database only when its
+    table, column, index or constraint does not exist yet. The migration state always changes.
+    """
+
+    reduces_to_sql = False
+
+    def __init__(self, operation):
+        if not isinstance(operation, (CreateModel, AddField, AddIndex, AddConstraint)):
+            raise TypeError(f"IfMissing can not check {type(operation).__name__}")
+        self.operation = operation
+
+    def state_forwards(self, app_label, state):
+        self.operation.state_forwards(app_label, state)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not self.exists(app_label, schema_editor, to_state):
+            self.operation.database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        self.operation.database_backwards(
+            app_label, schema_editor, from_state, to_state
+        )
+
+    def describe(self):
+        return f"{self.operation.describe()} unless it exists"
+
+    @property
+    def migration_name_fragment(self):
+        return self.operation.migration_name_fragment
+
+    def exists(self, app_label, schema_editor, to_state):
+        """
+        Tell whether the database already has what the operation creates.
+        """
+        operation = self.operation
+        if isinstance(operation, CreateModel):
+            model_name = operation.name_lower
+        else:
+            model_name = operation.model_name_lower
+        model = to_state.apps.get_model(app_label, model_name)
+        table = model._meta.db_table
+        connection = schema_editor.connection
+        introspection = connection.introspection
+        with connection.cursor() as cursor:
+            if table not in introspection.table_names(cursor):
+                return False
+            if isinstance(operation, CreateModel):
+                return True
+            if isinstance(operation, AddField):
+                column = model._meta.get_field(operation.name).column
+                return column in [
+                    column.name
+                    for column in introspection.get_table_description(cursor, table)
+                ]
+            if isinstance(operation, AddIndex):
+                name = operation.index.name
+            else:
+                name = operation.constraint.name
+            return name in introspection.get_constraints(cursor, table)
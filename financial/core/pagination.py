@@ -0,0 +1,136 @@
+import json
+import base64
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+
+
+def keyset_filter(position, reverse=False):
+    """
+    Build the filter selecting rows after (or before, when reversed) a (symbol, date, id) position.
+
+    :param position: tuple, (symbol, date, id) of the last row already returned
+    :param reverse: bool, select the rows before the position instead of after it
+    :return: django.db.models.Q
+    """
+    symbol, date, pk = position
+    op = "lt" if reverse else "gt"
+    return (
+        Q(**{f"symbol__{op}": symbol})
+        | Q(symbol=symbol, **{f"date__{op}": date})
+        | Q(symbol=symbol, date=date, **{f"id__{op}": pk})
+    )
+
+
+class KeysetPagination:
+    """
+    Cursor pagination ordered on (symbol, date, id).
+
+    Every page is a range scan that starts right after the previous one, so its cost does not grow
+    with the depth of the page. The total count is only computed when the client asks for it.
+    """
+
+    ordering = ("symbol", "date", "id")
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    page_size = 5
+
+    def paginate_queryset(self, queryset, request):
+        self.page_size = int(request.query_params.get("limit", self.page_size))
+        if self.page_size < 1:
+            raise ValueError("limit must be a positive integer")
+        position, reverse = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param)
+        )
+
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ("true", "1"):
+            self.count = queryset.count()
+
+        if reverse:
+            ordering = [f"-{field}" for field in self.ordering]
+        else:
+            ordering = list(self.ordering)
+        if position is not None:
+            queryset = queryset.filter(keyset_filter(position, reverse))
+        rows = list(queryset.order_by(*ordering)[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_cursor = self.previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                self.next_cursor = self.encode_cursor(rows[-1], reverse=False)
+            if position is not None and (has_more or not reverse):
+                self.previous_cursor = self.encode_cursor(rows[0], reverse=True)
+        return rows
+
+    def get_pagination_data(self):
+        pagination = {
+            "next": self.next_cursor,
+            "previous": self.previous_cursor,
+            "limit": self.page_size,
+        }
+        if self.count is not None:
+            pagination["count"] = self.count
+        return pagination
+
+    def encode_cursor(self, row, reverse):
+        payload = [row.symbol, row.date.isoformat(), row.id, reverse]
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None, False
+        try:
+            symbol, date, pk, reverse = json.loads(base64.urlsafe_b64decode(cursor))
+            return (str(symbol), str(date), int(pk)), bool(reverse)
+        except (ValueError, TypeError):
+            raise ValueError("cursor is invalid")
+
+
+class LazyPageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination that returns the page as an unevaluated queryset slice.
+
+    The list serializer can then read the page with values_list() instead of building model instances.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.get_page(queryset, request)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async counterpart of paginate_queryset, the count is read with the async ORM.
+        """
+        return self.get_page(queryset, request, count=await queryset.acount())
+
+    def get_page(self, queryset, request, count=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        if count is not None:
+            # Paginator.count is a cached property, setting it skips the sync COUNT query
+            paginator.count = count
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            # The browsable API should display pagination controls.
+            self.display_page_controls = True
+
+        return self.page.object_list
@@ -0,0 +1,255 @@
+import io
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .middleware import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Columns of the columnar exports and their numpy types. Prices are exported as float64, which is
+# what the analytics clients compute with, instead of an object array of Decimals.
+COLUMN_DTYPES = {
+    "symbol": "str",
+    "date": "datetime64[D]",
+    "open_price": "float64",
+    "close_price": "float64",
+    "volume": "int64",
+}
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed.
+
+    Types orjson does not handle natively (dates, decimals, ...) go through DRF's own encoder, so
+    the API's responses are byte-identical to JSONRenderer's compact, unescaped-unicode output.
+    Only floats in exponent notation and NaN are written differently. Any other configuration
+    (indentation, ensure_ascii) falls back to JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed("render"):
+            return self.encode(data, accepted_media_type, renderer_context)
+
+    def encode(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        # JSONRenderer always escapes these to keep the output a strict javascript subset
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class StreamingRenderer(BaseRenderer):
+    """
+    Base class of the export renderers.
+
+    stream() encodes an iterable of row batches lazily, one chunk of bytes per batch, so a
+    StreamingHttpResponse never holds more than one batch in memory. Row renderers get batches of
+    dicts encoded like the serializer, columnar renderers get the raw value tuples.
+    """
+
+    charset = "utf-8"
+    columnar = False
+    # Optional package the renderer needs, checked before the export starts
+    requires = None
+    available = True
+
+    def stream(self, batches, fields):
+        raise NotImplementedError(".stream() must be implemented.")
+
+
+class CSVRenderer(StreamingRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+    def stream(self, batches, fields):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for batch in batches:
+            writer.writerows([row[name] for name in fields] for row in batch)
+            yield buffer.getvalue().encode(self.charset)
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode(self.charset)
+
+
+class NDJSONRenderer(StreamingRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def stream(self, batches, fields):
+        for batch in batches:
+            if orjson is not None:
+                lines = [orjson.dumps(row) for row in batch]
+            else:
+                lines = [
+                    json.dumps(row, ensure_ascii=False, separators=(",", ":")).encode(
+                        self.charset
+                    )
+                    for row in batch
+                ]
+            if lines:
+                yield b"\n".join(lines) + b"\n"
+
+
+def get_columns(batch, fields):
+    """
+    Transpose a batch of value tuples into one numpy array per exported column.
+
+    :param batch: list of tuple, rows of values in the order of fields
+    :param fields: sequence of str, names of the values of a row
+    :return: dict mapping the COLUMN_DTYPES names to numpy arrays
+    """
+    values = dict(zip(fields, zip(*batch))) if batch else {}
+    return {
+        name: np.array(values.get(name, ()), dtype=dtype)
+        for name, dtype in COLUMN_DTYPES.items()
+    }
+
+
+class _ChunkSink:
+    """
+    Write-only file object collecting what a pyarrow writer writes until it is drained.
+    """
+
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ColumnarRenderer(StreamingRenderer):
+    charset = None
+    columnar = True
+    requires = "numpy"
+    available = np is not None
+
+
+class ArrowRenderer(ColumnarRenderer):
+    """
+    Zstd compressed Arrow IPC stream, one record batch per batch of rows, symbols dictionary
+    encoded.
+    """
+
+    media_type = "application/vnd.apache.arrow.stream"
+    format = "arrow"
+    requires = "pyarrow"
+    available = np is not None and pa is not None
+
+    def get_schema(self):
+        return pa.schema(
+            [
+                ("symbol", pa.dictionary(pa.int32(), pa.string())),
+                ("date", pa.date32()),
+                ("open_price", pa.float64()),
+                ("close_price", pa.float64()),
+                ("volume", pa.int64()),
+            ]
+        )
+
+    def get_record_batch(self, batch, fields, schema):
+        columns = get_columns(batch, fields)
+        columns["symbol"] = pa.array(columns["symbol"]).dictionary_encode()
+        return pa.record_batch([columns[name] for name in schema.names], schema=schema)
+
+    def open_writer(self, sink, schema):
+        return pa.ipc.new_stream(
+            sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd")
+        )
+
+    def stream(self, batches, fields):
+        schema = self.get_schema()
+        sink = _ChunkSink()
+        writer = self.open_writer(sink, schema)
+        for batch in batches:
+            writer.write_batch(self.get_record_batch(batch, fields, schema))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+
+class ParquetRenderer(ArrowRenderer):
+    """
+    Parquet file, one row group per batch of rows.
+    """
+
+    media_type = "application/vnd.apache.parquet"
+    format = "parquet"
+
+    def open_writer(self, sink, schema):
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+
+
+class NPZRenderer(ColumnarRenderer):
+    """
+    Compressed NumPy archive with one array per column.
+
+    A zip archive is written in one piece, so the columns are accumulated before it is rendered.
+    They take a few dozen bytes per row, far less than the rows themselves.
+    """
+
+    media_type = "application/x-npz"
+    format = "npz"
+
+    def stream(self, batches, fields):
+        parts = {name: [] for name in COLUMN_DTYPES}
+        for batch in batches:
+            for name, column in get_columns(batch, fields).items():
+                parts[name].append(column)
+        columns = {
+            name: np.concatenate(arrays)
+            if arrays
+            else np.array((), dtype=COLUMN_DTYPES[name])
+            for name, arrays in parts.items()
+        }
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **columns)
+        yield buffer.getvalue()
@@ -0,0 +1,126 @@
+"""
+Database router sending reads to the read replicas of the default database.
+
+Replicas are the aliases listed in settings.DATABASE_REPLICAS, each request reads from the next
+one in turn. All reads of a request go to the same replica, so the count and the rows of a page see
+the same replication lag. A replica that cannot be connected to is skipped for
+DATABASE_REPLICA_RETRY_SECONDS, and reads fall back to the primary when none is left. Writes and migrations always go to the primary.
+
+Reads are pinned to the primary for the rest of a request after it writes, and after an ingest of
+the requested symbols (see pin_if_recently_ingested), so clients read their own writes.
+"""
+
+import time
+import datetime
+import itertools
+import threading
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils import timezone
+
+from .models import FinancialDataIngestModel
+
+# Set for the rest of the request, or of the task under ASGI
+_pinned = ContextVar("pinned_to_primary", default=False)
+_replica = ContextVar("read_replica", default=None)
+
+
+def pin_to_primary():
+    """
+    Send the reads of the current request to the primary.
+    """
+    _pinned.set(True)
+
+
+def is_pinned_to_primary():
+    return _pinned.get()
+
+
+def pin_if_recently_ingested(updated_at):
+    """
+    Pin the current request to the primary if the data it reads was ingested recently.
+
+    The ingest script writes to the primary, replicas may lag behind it for a while. Without the
+    pin a cached response keyed on the new data version could be filled with the old data.
+
+    :param updated_at: datetime, last ingest time of the requested symbols read from the primary
+    """
+    seconds = settings.DATABASE_REPLICA_PIN_SECONDS
+    if updated_at is None or not seconds:
+        return
+    if not timezone.is_aware(updated_at):
+        updated_at = timezone.make_aware(updated_at, datetime.timezone.utc)
+    if (timezone.now() - updated_at).total_seconds() < seconds:
+        pin_to_primary()
+
+
+def _reset_pin(**kwargs):
+    # WSGI threads serve many requests in the same context
+    _pinned.set(False)
+    _replica.set(None)
+
+
+request_started.connect(_reset_pin, dispatch_uid="core.routers.reset_pin")
+
+
+class ReadReplicaRouter:
+    """
+    Round-robin requests over settings.DATABASE_REPLICAS with failover to the primary.
+    """
+
+    def __init__(self):
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        # Replica alias mapped to the time until which it is skipped
+        self.down_until = {}
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or is_pinned_to_primary():
+            return DEFAULT_DB_ALIAS
+        # The data version must come from the primary when the requests it pins rely on it
+        if model is FinancialDataIngestModel and settings.DATABASE_REPLICA_PIN_SECONDS:
+            return DEFAULT_DB_ALIAS
+
+        # Keep the replica of the request, unless it went down since
+        alias = _replica.get()
+        if alias in replicas and self.is_available(alias):
+            return alias
+        start = next(self.counter)
+        for i in range(len(replicas)):
+            alias = replicas[(start + i) % len(replicas)]
+            if self.is_available(alias):
+                _replica.set(alias)
+                return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return db not in settings.DATABASE_REPLICAS
+
+    def is_available(self, alias):
+        """
+        Check that a replica can be connected to, a failed one is retried after a while.
+        """
+        if self.down_until.get(alias, 0) > time.monotonic():
+            return False
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            with self.lock:
+                self.down_until[alias] = (
+                    time.monotonic() + settings.DATABASE_REPLICA_RETRY_SECONDS
+                )
+            return False
+        return True
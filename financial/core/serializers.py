@@ -1,8 +1,198 @@
+import decimal
+from operator import attrgetter
+
+from django.db.models import Q, QuerySet
+from django.db.models.manager import BaseManager
 from rest_framework import serializers
+from rest_framework.utils.serializer_helpers import ReturnList
+from rest_framework.settings import ISO_8601, api_settings
+
 from .models import FinancialDataModel
 
 
+def _decimal_converter(field):
+    """
+    Return a function formatting values like DecimalField.to_representation, or None if the field
+    uses options the fast path does not reproduce.
+    """
+    coerce_to_string = getattr(
+        field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING
+    )
+    if not coerce_to_string or field.localize or field.normalize_output:
+        return None
+    exponent = decimal.Decimal(".1") ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return f"{value.quantize(exponent, rounding=rounding, context=context):f}"
+
+    return convert
+
+
+def _date_converter(field):
+    output_format = getattr(field, "format", api_settings.DATE_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return None
+
+    def convert(value):
+        return value if isinstance(value, str) else value.isoformat()
+
+    return convert
+
+
+def build_row_encoder(serializer):
+    """
+    Compile a function turning a tuple of field values into the serializer's representation.
+
+    The function is generated once per serializer class, so encoding a row is a single dict display
+    instead of DRF's per-field attribute lookups and to_representation calls. Fields that are not
+    plain integers, strings, ISO dates or string-coerced decimals keep their own to_representation.
+
+    :param serializer: ModelSerializer instance whose Meta.fields are encoded in order
+    :return: function taking a tuple of values and returning a dict
+    """
+    namespace = {}
+    items = []
+    for i, name in enumerate(serializer.Meta.fields):
+        field = serializer.fields[name]
+        if isinstance(field, (serializers.IntegerField, serializers.CharField)):
+            converter = None
+        elif isinstance(field, serializers.DecimalField):
+            converter = _decimal_converter(field) or field.to_representation
+        elif isinstance(field, serializers.DateField):
+            converter = _date_converter(field) or field.to_representation
+        else:
+            converter = field.to_representation
+        if converter is None:
+            items.append(f"{name!r}: v{i}")
+        else:
+            namespace[f"c{i}"] = converter
+            items.append(f"{name!r}: None if v{i} is None else c{i}(v{i})")
+    values = "".join(f"v{i}, " for i in range(len(serializer.Meta.fields)))
+    source = f"def encode(row):\n    {values}= row\n    return {{{', '.join(items)}}}\n"
+    exec(source, namespace)
+    return namespace["encode"]
+
+
+def get_row_encoder(serializer):
+    """
+    Return the row encoder of a serializer's class, building it on first use.
+    """
+    serializer_class = type(serializer)
+    encode = serializer_class.__dict__.get("_row_encoder")
+    if encode is None:
+        encode = serializer_class._row_encoder = build_row_encoder(serializer)
+    return encode
+
+
+class FinancialDataListSerializer(serializers.ListSerializer):
+    """
+    Serialize many rows through a precompiled row encoder instead of one ModelSerializer per row.
+
+    Querysets are read with values_list(), so no model instances are built at all. The output is
+    identical to the ModelSerializer's.
+    """
+
+    def to_representation(self, data):
+        encode = get_row_encoder(self.child)
+        fields = self.child.Meta.fields
+        if isinstance(data, BaseManager):
+            data = data.all()
+        if isinstance(data, QuerySet):
+            rows = data.values_list(*fields)
+        else:
+            rows = map(attrgetter(*fields), data)
+        return [encode(row) for row in rows]
+
+    async def adata(self):
+        """
+        Async counterpart of .data for a queryset, the rows are read with the async ORM.
+        """
+        encode = get_row_encoder(self.child)
+        rows = self.instance.values_list(*self.child.Meta.fields)
+        return ReturnList([encode(row) async for row in rows], serializer=self)
+
+
 class FinancialDataSerializer(serializers.ModelSerializer):
     class Meta:
         model = FinancialDataModel
         fields = ("id", "symbol", "date", "open_price", "close_price", "volume")
+        list_serializer_class = FinancialDataListSerializer
+
+
+class ResampledDataListSerializer(serializers.ListSerializer):
+    """
+    Serialize a page of bars, with the open and close prices read in one query.
+
+    The bars only hold the first and last date of their bucket. The prices of those days are read
+    for the bars of the page by the unique (symbol, date) key, not for every bar of the range.
+    """
+
+    def to_representation(self, data):
+        bars = list(data)
+        prices = self.get_prices_queryset(bars)
+        return super().to_representation(self.add_prices(bars, prices))
+
+    async def adata(self):
+        """
+        Async counterpart of .data for a queryset, the bars and prices are read with the async ORM.
+        """
+        bars = [bar async for bar in self.instance]
+        prices = [row async for row in self.get_prices_queryset(bars)]
+        return ReturnList(
+            super().to_representation(self.add_prices(bars, prices)), serializer=self
+        )
+
+    def get_prices_queryset(self, bars):
+        dates = {}
+        for bar in bars:
+            dates.setdefault(bar["symbol"], set()).update(
+                (bar["first_date"], bar["last_date"])
+            )
+        positions = Q()
+        for symbol, symbol_dates in dates.items():
+            positions |= Q(symbol=symbol, date__in=sorted(symbol_dates))
+        if not dates:
+            return FinancialDataModel.objects.none()
+        return (
+            FinancialDataModel.objects.filter(positions)
+            .order_by()
+            .values_list("symbol", "date", "open_price", "close_price")
+        )
+
+    def add_prices(self, bars, prices):
+        prices = {
+            (symbol, date): (open_price, close_price)
+            for symbol, date, open_price, close_price in prices
+        }
+        for bar in bars:
+            bar["first_open_price"] = prices[bar["symbol"], bar["first_date"]][0]
+            bar["last_close_price"] = prices[bar["symbol"], bar["last_date"]][1]
+        return bars
+
+
+class ResampledDataSerializer(serializers.Serializer):
+    """
+    Serialize the bars of a resampled queryset, one per symbol and interval.
+
+    Bars have the same fields as the daily rows, with the date of the first day of the interval,
+    the first open price, the last close price and the summed volume.
+    """
+
+    symbol = serializers.CharField()
+    date = serializers.DateField(source="bucket")
+    open_price = serializers.DecimalField(
+        max_digits=20, decimal_places=2, source="first_open_price"
+    )
+    close_price = serializers.DecimalField(
+        max_digits=20, decimal_places=2, source="last_close_price"
+    )
+    volume = serializers.IntegerField(source="total_volume")
+
+    class Meta:
+        list_serializer_class = ResampledDataListSerializer
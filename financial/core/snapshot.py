@@ -0,0 +1,300 @@
+"""
+Immutable, memory-mapped columnar snapshot of the financial_data table.
+
+get_raw_data.py publishes a snapshot after every ingest and the web workers map it read-only, so
+all workers share one copy of the data in the page cache and hot reads skip the database. The
+file holds one column per field with the rows in (symbol, date) order and an offset index of
+where each symbol's rows start:
+
+    b"FINSNAP1" | header length (uint64) | JSON header | columns, each aligned to 64 bytes
+
+The header lists the symbols, the data version of every symbol when the snapshot was taken and
+the dtype and offset of every column. Prices are stored as int64 cents, so they convert back to
+the exact two-place decimals of the table. A new snapshot is written next to the old one and
+swapped in with os.replace(); readers notice the new file and map it on their next request, the
+old mapping stays valid until the requests still using it finish.
+
+This module only depends on numpy, get_raw_data.py imports it without Django.
+"""
+
+import os
+import json
+import mmap
+import shutil
+import struct
+import tempfile
+import itertools
+import threading
+from contextlib import ExitStack
+from decimal import Decimal
+
+import numpy as np
+
+MAGIC = b"FINSNAP1"
+ALIGNMENT = 64
+# Columns after the offset index, in file order
+COLUMNS = {
+    "id": "<i8",
+    "date": "<M8[D]",
+    "open_price": "<i8",
+    "close_price": "<i8",
+    "volume": "<i8",
+}
+WRITE_BATCH_SIZE = 100000
+COPY_BUFFER_SIZE = 1 << 20
+
+
+def to_cents(value):
+    """
+    Convert a price with at most two decimal places to an integer number of cents.
+    """
+    return int(Decimal(str(value)).scaleb(2))
+
+
+def from_cents(value):
+    return Decimal(int(value)).scaleb(-2)
+
+
+def write_snapshot(path, rows, versions, batch_size=WRITE_BATCH_SIZE):
+    """
+    Write a snapshot and atomically replace the file at path with it.
+
+    Rows are converted batch by batch and appended to one temporary file per column, which are
+    copied behind the header once the row count is known, so the table never has to fit in memory.
+
+    :param path: str or Path, snapshot file, the new file is written in the same directory
+    :param rows: iterable of tuple, (id, symbol, date, open_price, close_price, volume) rows in
+        (symbol, date) order, prices as decimals or strings with at most two decimal places
+    :param versions: dict, maps symbol to its data version in the ingest table
+    :param batch_size: int, number of rows converted at a time
+    :return: int, number of rows written
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    names, starts, count, last = [], [], 0, None
+    seen = set()
+    rows = iter(rows)
+    with ExitStack() as stack:
+        parts = {
+            name: stack.enter_context(tempfile.TemporaryFile(dir=directory))
+            for name in COLUMNS
+        }
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            ids, symbols, dates, opens, closes, volumes = zip(*batch)
+            # Readers find the rows of a symbol between two offsets and search its dates
+            for i, (symbol, day) in enumerate(zip(symbols, dates), count):
+                if last is None or symbol != last[0]:
+                    if symbol in seen:
+                        raise ValueError("rows must be in (symbol, date) order")
+                    seen.add(symbol)
+                    names.append(symbol)
+                    starts.append(i)
+                elif day < last[1]:
+                    raise ValueError("rows must be in (symbol, date) order")
+                last = symbol, day
+            arrays = {
+                "id": ids,
+                "date": dates,
+                "open_price": [to_cents(p) for p in opens],
+                "close_price": [to_cents(p) for p in closes],
+                "volume": volumes,
+            }
+            for name, values in arrays.items():
+                parts[name].write(np.array(values, dtype=COLUMNS[name]).tobytes())
+            count += len(batch)
+
+        # Column offsets are relative to the end of the header, which is padded to the alignment
+        offsets = np.array(starts + [count], dtype="<i8")
+        columns, position = {}, 0
+        for name, dtype, length in [("offsets", offsets.dtype, len(offsets))] + [
+            (name, np.dtype(dtype), count) for name, dtype in COLUMNS.items()
+        ]:
+            columns[name] = [dtype.str, position, length]
+            position += -(-length * dtype.itemsize // ALIGNMENT) * ALIGNMENT
+        header = json.dumps(
+            {
+                "symbols": names,
+                "versions": {symbol: int(v) for symbol, v in versions.items()},
+                "columns": columns,
+            }
+        ).encode()
+        header += b" " * (-(len(MAGIC) + 8 + len(header)) % ALIGNMENT)
+
+        fd, tmp_path = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+                f.write(offsets.tobytes())
+                f.write(b"\0" * (-offsets.nbytes % ALIGNMENT))
+                for part in parts.values():
+                    size = part.tell()
+                    part.seek(0)
+                    shutil.copyfileobj(part, f, COPY_BUFFER_SIZE)
+                    f.write(b"\0" * (-size % ALIGNMENT))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    return count
+
+
+class Snapshot:
+    """
+    Read-only view of a snapshot file, the columns are numpy arrays backed by the mapping.
+    """
+
+    def __init__(self, f):
+        stat = os.fstat(f.fileno())
+        self.identity = (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+        self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.buffer[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{f.name} is not a financial data snapshot")
+        (length,) = struct.unpack_from("<Q", self.buffer, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(self.buffer[start : start + length])
+
+        self.symbols = header["symbols"]
+        self.positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.versions = header["versions"]
+        columns = {
+            name: np.frombuffer(
+                self.buffer, dtype=dtype, count=count, offset=start + length + offset
+            )
+            for name, (dtype, offset, count) in header["columns"].items()
+        }
+        self.offsets = columns.pop("offsets")
+        self.columns = columns
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as f:
+            return cls(f)
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def get_version(self, symbols):
+        """
+        Return the data version of the symbols when the snapshot was taken, summed like the API's.
+        """
+        return sum(self.versions.get(symbol, 0) for symbol in set(symbols))
+
+    def get_range(self, symbol, start_date=None, end_date=None):
+        """
+        Find the rows of a symbol between two dates, both included.
+
+        :return: tuple, (first, stop) row positions, empty if the symbol has no rows
+        """
+        i = self.positions.get(symbol)
+        if i is None:
+            return 0, 0
+        first, stop = int(self.offsets[i]), int(self.offsets[i + 1])
+        dates = self.columns["date"][first:stop]
+        if start_date is not None:
+            first += int(np.searchsorted(dates, np.datetime64(start_date, "D")))
+        if end_date is not None:
+            stop = int(self.offsets[i]) + int(
+                np.searchsorted(dates, np.datetime64(end_date, "D"), side="right")
+            )
+        return first, max(first, stop)
+
+    def select(self, symbols, start_date=None, end_date=None):
+        """
+        Select the rows of the symbols between two dates in (symbol, date) order.
+
+        :return: SnapshotRows
+        """
+        ranges = [
+            self.get_range(symbol, start_date, end_date) for symbol in sorted(symbols)
+        ]
+        return SnapshotRows(self, [r for r in ranges if r[0] < r[1]])
+
+    def get_totals(self, symbol, start_date=None, end_date=None):
+        """
+        Sum the rows of a symbol between two dates.
+
+        :return: tuple, (open_price sum, close_price sum, volume sum, row count) like a rollup row
+        """
+        first, stop = self.get_range(symbol, start_date, end_date)
+        columns = self.columns
+        return (
+            from_cents(columns["open_price"][first:stop].sum()),
+            from_cents(columns["close_price"][first:stop].sum()),
+            int(columns["volume"][first:stop].sum()),
+            stop - first,
+        )
+
+
+class SnapshotRows:
+    """
+    Lazy sequence of selected snapshot rows, only the rows of a slice are converted.
+
+    Rows are (id, symbol, date, open_price, close_price, volume) tuples with the types the
+    database returns.
+    """
+
+    def __init__(self, snapshot, ranges):
+        self.snapshot = snapshot
+        self.ranges = ranges
+        self.length = sum(stop - first for first, stop in ranges)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step not in (None, 1):
+            raise TypeError("SnapshotRows only supports contiguous slices")
+        start, stop, _ = index.indices(self.length)
+
+        # Positions of the rows of the slice, gathered from the ranges it overlaps
+        pieces, skipped = [], 0
+        for first, last in self.ranges:
+            low, high = max(start - skipped, 0), min(stop - skipped, last - first)
+            if low < high:
+                pieces.append(np.arange(first + low, first + high))
+            skipped += last - first
+        positions = np.concatenate(pieces) if pieces else np.empty(0, dtype=np.int64)
+
+        snapshot = self.snapshot
+        columns = snapshot.columns
+        symbols = np.searchsorted(snapshot.offsets, positions, side="right") - 1
+        return list(
+            zip(
+                columns["id"][positions].tolist(),
+                [snapshot.symbols[i] for i in symbols.tolist()],
+                columns["date"][positions].tolist(),
+                map(from_cents, columns["open_price"][positions].tolist()),
+                map(from_cents, columns["close_price"][positions].tolist()),
+                columns["volume"][positions].tolist(),
+            )
+        )
+
+
+_snapshots = {}
+_lock = threading.Lock()
+
+
+def get_snapshot(path):
+    """
+    Return the snapshot at path, mapping it again when the file was replaced.
+
+    :param path: str or Path, snapshot file
+    :return: Snapshot, or None if there is no file at path
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    snapshot = _snapshots.get(path)
+    if snapshot is None or snapshot.identity != (
+        stat.st_dev,
+        stat.st_ino,
+        stat.st_mtime_ns,
+    ):
+        with _lock:
+            snapshot = _snapshots[path] = Snapshot.open(path)
+    return snapshot
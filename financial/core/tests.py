@@ -196,7 +196,8 @@ class FinancialDataAPIViewTestCase(TestCase):
         # Assert
         self.maxDiff = None
         self.assertEqual(
-            actual_queryset.query.__str__(), expected_queryset.query.__str__()
+            actual_queryset.query.__str__(),
+            expected_queryset.order_by("symbol", "date", "id").query.__str__(),
         )
 
     def test_get_queryset_symbol_start_date(self):
@@ -214,7 +215,8 @@ class FinancialDataAPIViewTestCase(TestCase):
         # Assert
         self.maxDiff = None
         self.assertEqual(
-            actual_queryset.query.__str__(), expected_queryset.query.__str__()
+            actual_queryset.query.__str__(),
+            expected_queryset.order_by("symbol", "date", "id").query.__str__(),
         )
 
     def test_get_queryset(self):
@@ -238,7 +240,8 @@ class FinancialDataAPIViewTestCase(TestCase):
         # Assert
         self.maxDiff = None
         self.assertEqual(
-            actual_queryset.query.__str__(), expected_queryset.query.__str__()
+            actual_queryset.query.__str__(),
+            expected_queryset.order_by("symbol", "date", "id").query.__str__(),
         )
 
     def test_get_queryset_no_data(self):
@@ -254,7 +257,8 @@ class FinancialDataAPIViewTestCase(TestCase):
         # Assert
         self.maxDiff = None
         self.assertEqual(
-            actual_queryset.query.__str__(), expected_queryset.query.__str__()
+            actual_queryset.query.__str__(),
+            expected_queryset.order_by("symbol", "date", "id").query.__str__(),
         )
 
     def test_get_queryset_invalid_data(self):
@@ -270,7 +274,8 @@ class FinancialDataAPIViewTestCase(TestCase):
         # Assert
         self.maxDiff = None
         self.assertEqual(
-            actual_queryset.query.__str__(), expected_queryset.query.__str__()
+            actual_queryset.query.__str__(),
+            expected_queryset.order_by("symbol", "date", "id").query.__str__(),
         )
 
     def test_get_without_filters(self):
@@ -345,6 +350,7 @@ class FinancialDataAPIViewTestCase(TestCase):
         paginator_mock = Mock()
         paginator_mock.page_size = 0
         paginator_mock.page.paginator.num_pages = 0
+        paginator_mock.page.paginator.count = 0
         paginator_mock.page.number = 1
         paginator_mock.paginate_queryset.return_value = []
         request = self.factory.get("/api/financial_data")
@@ -380,6 +386,7 @@ class FinancialDataAPIViewTestCase(TestCase):
         paginator.page_size = 5
         paginator.paginate_queryset.return_value = serializer_data
         paginator.page.paginator.num_pages = 1
+        paginator.page.paginator.count = 2
         paginator.page.number = 1
         request = self.factory.get("/api/financial_data", {"limit": 5})
         request.query_params = QueryDict()
@@ -396,6 +403,8 @@ class FinancialDataAPIViewTestCase(TestCase):
         view.serializer_class.assert_called_once_with(serializer_data, many=True)
         view.pagination_class.assert_called_once_with()
         paginator.paginate_queryset.assert_called_once_with(queryset, request)
+        # the paginator's count is reused instead of running a second COUNT query
+        queryset.count.assert_not_called()
         self.assertEqual(
             response.data,
             {
@@ -428,3 +437,2143 @@ class FinancialDataAPIViewTestCase(TestCase):
         self.assertEqual(response.data["pagination"]["page"], 1)
         self.assertEqual(response.data["pagination"]["limit"], 5)
         self.assertEqual(response.data["pagination"]["pages"], 1)
+
+
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class FinancialDataUniquenessTestCase(TestCase):
+    def test_duplicate_symbol_date_is_rejected(self):
+        # Arrange
+        FinancialDataModel.objects.create(
+            symbol="IBM",
+            date="2023-03-10",
+            open_price=100.0,
+            close_price=101.0,
+            volume=1000,
+        )
+
+        # Act & Assert
+        with self.assertRaises(IntegrityError):
+            FinancialDataModel.objects.create(
+                symbol="IBM",
+                date="2023-03-10",
+                open_price=102.0,
+                close_price=103.0,
+                volume=2000,
+            )
+
+
+class DeduplicateMigrationTestCase(TransactionTestCase):
+    migrate_from = [("core", "0001_initial")]
+    migrate_to = [("core", "0002_financial_data_symbol_date_uniq")]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        apps = executor.loader.project_state(self.migrate_from).apps
+        model = apps.get_model("core", "FinancialDataModel")
+        for volume in (1000, 2000, 3000):
+            model.objects.create(
+                symbol="IBM",
+                date="2023-03-10",
+                open_price=100.0,
+                close_price=101.0,
+                volume=volume,
+            )
+        model.objects.create(
+            symbol="IBM",
+            date="2023-03-09",
+            open_price=100.0,
+            close_price=101.0,
+            volume=500,
+        )
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_keeps_latest_row_per_symbol_date(self):
+        # Act
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+
+        # Assert
+        apps = executor.loader.project_state(self.migrate_to).apps
+        model = apps.get_model("core", "FinancialDataModel")
+        rows = model.objects.order_by("date").values_list("date", "volume")
+        self.assertEqual(
+            [(str(date), volume) for date, volume in rows],
+            [("2023-03-09", 500), ("2023-03-10", 3000)],
+        )
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("financial_data")
+        for symbol in ("AAPL", "IBM"):
+            for day in range(1, 4):
+                FinancialDataModel.objects.create(
+                    symbol=symbol,
+                    date=f"2023-03-0{day}",
+                    open_price=100.0,
+                    close_price=101.0,
+                    volume=1000,
+                )
+
+    def get_page(self, **params):
+        response = self.client.get(self.url, {"limit": 2, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = [(row["symbol"], row["date"]) for row in response.data["data"]]
+        return rows, response.data["pagination"]
+
+    def test_walk_forward_and_back(self):
+        # Act
+        first, pagination = self.get_page(cursor="")
+        second, pagination = self.get_page(cursor=pagination["next"])
+        third, last_pagination = self.get_page(cursor=pagination["next"])
+        back, back_pagination = self.get_page(cursor=last_pagination["previous"])
+
+        # Assert
+        self.assertEqual(first, [("AAPL", "2023-03-01"), ("AAPL", "2023-03-02")])
+        self.assertEqual(second, [("AAPL", "2023-03-03"), ("IBM", "2023-03-01")])
+        self.assertEqual(third, [("IBM", "2023-03-02"), ("IBM", "2023-03-03")])
+        self.assertIsNone(last_pagination["next"])
+        self.assertEqual(back, second)
+        self.assertIsNotNone(back_pagination["next"])
+        self.assertIsNotNone(back_pagination["previous"])
+        self.assertNotIn("count", last_pagination)
+
+    def test_count_is_opt_in(self):
+        # Act
+        # the data version lookup and the page query
+        with self.assertNumQueries(2):
+            _, pagination = self.get_page(cursor="", symbol="IBM")
+        _, counted = self.get_page(cursor="", symbol="IBM", count="true")
+
+        # Assert
+        self.assertNotIn("count", pagination)
+        self.assertEqual(counted["count"], 3)
+        self.assertIsNone(pagination["previous"])
+
+    def test_invalid_cursor(self):
+        # Act
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["info"]["error"], "cursor is invalid")
+
+
+from decimal import Decimal
+from .models import FinancialDataRollupModel
+
+
+class StatisticsRollupTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("statistics")
+        cum_open = cum_close = Decimal("0")
+        cum_volume = 0
+        for count, (day, open_price, close_price, volume) in enumerate(
+            [
+                ("2023-03-01", "100.00", "101.00", 1000),
+                ("2023-03-02", "102.00", "103.00", 2000),
+                ("2023-03-03", "104.00", "105.00", 3000),
+            ],
+            start=1,
+        ):
+            FinancialDataModel.objects.create(
+                symbol="IBM",
+                date=day,
+                open_price=open_price,
+                close_price=close_price,
+                volume=volume,
+            )
+            cum_open += Decimal(open_price)
+            cum_close += Decimal(close_price)
+            cum_volume += volume
+            FinancialDataRollupModel.objects.create(
+                symbol="IBM",
+                date=day,
+                cum_open_price=cum_open,
+                cum_close_price=cum_close,
+                cum_volume=cum_volume,
+                cum_count=count,
+            )
+        FinancialDataIngestModel.objects.create(
+            symbol="IBM", last_date="2023-03-03", version=1, rollup_version=1
+        )
+
+    def get_statistics(self, symbol, start_date, end_date):
+        response = self.client.get(
+            self.url,
+            {"symbol": symbol, "start_date": start_date, "end_date": end_date},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["data"]
+
+    def test_statistics_from_rollup(self):
+        # Act
+        # the data version lookup and two rollup lookups
+        with self.assertNumQueries(3):
+            data = self.get_statistics("IBM", "2023-03-02", "2023-03-31")
+
+        # Assert
+        self.assertEqual(data["average_daily_open_price"], Decimal("103"))
+        self.assertEqual(data["average_daily_close_price"], Decimal("104"))
+        self.assertEqual(data["average_daily_volume"], 5000)
+
+    def test_empty_range_from_rollup(self):
+        # Act
+        data = self.get_statistics("IBM", "2023-04-01", "2023-04-30")
+
+        # Assert
+        self.assertIsNone(data["average_daily_open_price"])
+        self.assertIsNone(data["average_daily_volume"])
+
+    def test_single_aggregate_query_without_rollup(self):
+        # Arrange
+        FinancialDataRollupModel.objects.all().delete()
+
+        # Act
+        # the data version lookup, one rollup lookup and one aggregate query
+        with self.assertNumQueries(3):
+            data = self.get_statistics("IBM", "2023-03-02", "2023-03-31")
+
+        # Assert
+        self.assertEqual(data["average_daily_open_price"], Decimal("103"))
+        self.assertEqual(data["average_daily_volume"], 5000)
+
+    def test_admin_edit_does_not_serve_stale_rollup(self):
+        # Arrange
+        # the row is edited in the admin, the ingest script never sees it
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "password")
+        )
+        row = FinancialDataModel.objects.get(symbol="IBM", date="2023-03-03")
+        response = self.client.post(
+            reverse("admin:core_financialdatamodel_change", args=[row.pk]),
+            {
+                "symbol": "IBM",
+                "date": "2023-03-03",
+                "open_price": "110.00",
+                "close_price": "111.00",
+                "volume": 9000,
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+
+        # Act
+        data = self.get_statistics("IBM", "2023-03-02", "2023-03-31")
+
+        # Assert
+        self.assertEqual(data["average_daily_open_price"], Decimal("106"))
+        self.assertEqual(data["average_daily_volume"], 11000)
+        ingest = FinancialDataIngestModel.objects.get(symbol="IBM")
+        self.assertEqual((ingest.version, ingest.rollup_version), (2, 1))
+
+    def test_stale_rollup_is_not_read_for_many_symbols(self):
+        # Arrange
+        # a row deleted without the ingest script, only the data version says so
+        FinancialDataModel.objects.filter(symbol="IBM", date="2023-03-03").delete()
+        FinancialDataIngestModel.objects.filter(symbol="IBM").update(version=2)
+
+        # Act
+        data = self.get_statistics("IBM,AAPL", "2023-03-02", "2023-03-31")
+
+        # Assert
+        self.assertEqual(
+            data["symbols"]["IBM"]["average_daily_open_price"], Decimal("102")
+        )
+        self.assertEqual(data["symbols"]["IBM"]["average_daily_volume"], 2000)
+
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import override_settings
+from .models import FinancialDataIngestModel
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "api": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "core-tests",
+    },
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ResponseCacheTestCase(TestCase):
+    def setUp(self):
+        caches["api"].clear()
+        self.client = APIClient()
+        self.url = reverse("financial_data")
+        FinancialDataModel.objects.create(
+            symbol="IBM",
+            date="2023-03-10",
+            open_price=100.0,
+            close_price=101.0,
+            volume=1000,
+        )
+        FinancialDataIngestModel.objects.create(
+            symbol="IBM", last_date="2023-03-10", version=1
+        )
+
+    def test_identical_query_is_served_from_cache(self):
+        # Arrange
+        first = self.client.get(self.url, {"symbol": "IBM", "limit": 10})
+
+        # Act
+        # only the data version is read, parameters may come in any order
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url, {"limit": 10, "symbol": "IBM"})
+
+        # Assert
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+
+    def test_ingest_version_bump_invalidates(self):
+        # Arrange
+        self.client.get(self.url, {"symbol": "IBM"})
+        FinancialDataModel.objects.create(
+            symbol="IBM",
+            date="2023-03-11",
+            open_price=102.0,
+            close_price=103.0,
+            volume=2000,
+        )
+        FinancialDataIngestModel.objects.filter(symbol="IBM").update(version=2)
+
+        # Act
+        response = self.client.get(self.url, {"symbol": "IBM"})
+
+        # Assert
+        self.assertEqual(response.data["pagination"]["count"], 2)
+
+    def test_errors_are_not_cached(self):
+        # Act
+        self.client.get(reverse("statistics"), {"symbol": "IBM"})
+
+        # Assert
+        self.assertEqual(len(caches["api"]._cache), 0)
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("statistics")
+        self.params = {
+            "symbol": "IBM",
+            "start_date": "2023-03-01",
+            "end_date": "2023-03-31",
+        }
+        FinancialDataIngestModel.objects.create(
+            symbol="IBM", last_date="2023-03-10", version=1
+        )
+
+    def test_if_none_match_returns_not_modified(self):
+        # Arrange
+        etag = self.client.get(self.url, self.params)["ETag"]
+
+        # Act
+        # only the data version is read, the statistics are not computed
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since_returns_not_modified(self):
+        # Arrange
+        last_modified = self.client.get(self.url, self.params)["Last-Modified"]
+
+        # Act
+        response = self.client.get(
+            self.url, self.params, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since_skips_the_view(self):
+        # The "api" cache is a DummyCache in the test settings, as with API_CACHE=off
+        for url, params in (
+            (self.url, self.params),
+            (reverse("financial_data"), {"symbol": "IBM", "limit": 10}),
+        ):
+            with self.subTest(url=url):
+                # Arrange
+                last_modified = self.client.get(url, params)["Last-Modified"]
+
+                # Act
+                # only the data version is read, the view does not run
+                with self.assertNumQueries(1):
+                    response = self.client.get(
+                        url, params, HTTP_IF_MODIFIED_SINCE=last_modified
+                    )
+
+                # Assert
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+                self.assertEqual(response["Last-Modified"], last_modified)
+
+    def test_invalid_financial_data_params_never_return_not_modified(self):
+        for params in (
+            {"symbol": "IBM", "start_date": "2023/03/01"},
+            {"symbol": "IBM", "interval": "1d"},
+            {"symbol": "IBM", "limit": "0"},
+            {"symbol": "IBM", "cursor": "invalid"},
+        ):
+            with self.subTest(params=params):
+                # Act
+                response = self.client.get(
+                    reverse("financial_data"),
+                    params,
+                    HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT",
+                )
+
+                # Assert
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ingest_changes_etag(self):
+        # Arrange
+        etag = self.client.get(self.url, self.params)["ETag"]
+        FinancialDataIngestModel.objects.filter(symbol="IBM").update(version=2)
+
+        # Act
+        response = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_errors_have_no_validators(self):
+        # Arrange: an invalid date range, with preconditions any valid response would meet
+        params = dict(self.params, end_date="2023-02-01")
+
+        # Act
+        response = self.client.get(
+            self.url,
+            params,
+            HTTP_IF_NONE_MATCH="*",
+            HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT",
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(response.has_header("ETag"))
+        self.assertFalse(response.has_header("Last-Modified"))
+
+
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from .renderers import FastJSONRenderer, orjson
+import unittest
+
+
+class ReferenceFinancialDataSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FinancialDataModel
+        fields = FinancialDataSerializer.Meta.fields
+
+
+class FastSerializationTestCase(TestCase):
+    def setUp(self):
+        FinancialDataModel.objects.create(
+            symbol="IBM",
+            date="2023-03-10",
+            open_price=100,
+            close_price="105.5",
+            volume=1000,
+        )
+        FinancialDataModel.objects.create(
+            symbol="AAPL",
+            date="2023-03-11",
+            open_price="99.99",
+            close_price="0.01",
+            volume=0,
+        )
+        self.queryset = FinancialDataModel.objects.order_by("id")
+        self.expected = JSONRenderer().render(
+            ReferenceFinancialDataSerializer(self.queryset, many=True).data
+        )
+
+    def test_queryset_matches_model_serializer(self):
+        # Act
+        # the rows are read as tuples, no model instances are built
+        with self.assertNumQueries(1):
+            data = FinancialDataSerializer(self.queryset, many=True).data
+
+        # Assert
+        self.assertEqual(JSONRenderer().render(data), self.expected)
+        self.assertEqual(data[0]["open_price"], "100.00")
+
+    def test_instances_match_model_serializer(self):
+        # Act
+        data = FinancialDataSerializer(list(self.queryset), many=True).data
+
+        # Assert
+        self.assertEqual(JSONRenderer().render(data), self.expected)
+
+    @unittest.skipIf(orjson is None, "orjson is not installed")
+    def test_fast_renderer_matches_json_renderer(self):
+        # Arrange
+        data = {
+            "data": FinancialDataSerializer(self.queryset, many=True).data,
+            "pagination": {"count": 2, "page": 1, "limit": 5, "pages": 1},
+            "info": {"error": "line\u2028separator \u00e9"},
+        }
+
+        # Act
+        rendered = FastJSONRenderer().render(data)
+
+        # Assert
+        self.assertEqual(rendered, JSONRenderer().render(data))
+
+
+import csv
+import io
+import json
+
+from .views import FinancialDataExportAPIView
+
+
+class FinancialDataExportTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("financial_data_export")
+        for day, symbol in ((1, "IBM"), (2, "IBM"), (3, "IBM"), (1, "AAPL")):
+            FinancialDataModel.objects.create(
+                symbol=symbol,
+                date=f"2023-03-0{day}",
+                open_price=100 + day,
+                close_price="105.5",
+                volume=1000 * day,
+            )
+        self.expected = FinancialDataSerializer(
+            FinancialDataModel.objects.filter(symbol="IBM").order_by("date"),
+            many=True,
+        ).data
+
+    def test_export_csv(self):
+        # Act
+        response = self.client.get(self.url, {"symbol": "IBM"})
+        content = b"".join(response.streaming_content).decode()
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(
+            rows, [{k: str(v) for k, v in r.items()} for r in self.expected]
+        )
+
+    def test_export_ndjson(self):
+        # Act
+        response = self.client.get(self.url, {"symbol": "IBM", "format": "ndjson"})
+        content = b"".join(response.streaming_content).decode()
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response["Content-Type"], "application/x-ndjson; charset=utf-8"
+        )
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(rows, self.expected)
+
+    @patch.object(FinancialDataExportAPIView, "export_batch_size", 2)
+    def test_export_reads_bounded_batches(self):
+        # Arrange
+        response = self.client.get(self.url, {"format": "ndjson"})
+
+        # Act
+        # 4 rows in batches of 2, the last range scan finds no rows
+        with self.assertNumQueries(3):
+            content = b"".join(response.streaming_content).decode()
+
+        # Assert
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [(row["symbol"], row["date"]) for row in rows],
+            [
+                ("AAPL", "2023-03-01"),
+                ("IBM", "2023-03-01"),
+                ("IBM", "2023-03-02"),
+                ("IBM", "2023-03-03"),
+            ],
+        )
+
+    def test_export_invalid_date(self):
+        # Act
+        response = self.client.get(self.url, {"start_date": "2023/03/01"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json()["info"]["error"],
+            "start_date must be in the format YYYY-MM-DD",
+        )
+
+    def test_export_unknown_format(self):
+        # Act
+        response = self.client.get(self.url, {"format": "xml"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.json()["data"], [])
+
+
+from datetime import date
+from .renderers import np, pa, pq
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class ColumnarExportTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("financial_data_export")
+        for day, symbol in ((1, "IBM"), (2, "IBM"), (1, "AAPL")):
+            FinancialDataModel.objects.create(
+                symbol=symbol,
+                date=f"2023-03-0{day}",
+                open_price="100.25",
+                close_price=101 + day,
+                volume=1000 * day,
+            )
+        self.expected = {
+            "symbol": ["AAPL", "IBM", "IBM"],
+            "date": [date(2023, 3, 1), date(2023, 3, 1), date(2023, 3, 2)],
+            "open_price": [100.25, 100.25, 100.25],
+            "close_price": [102.0, 102.0, 103.0],
+            "volume": [1000, 1000, 2000],
+        }
+
+    def get_content(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b"".join(response.streaming_content)
+
+    def test_export_npz(self):
+        # Act
+        content = self.get_content({"format": "npz"})
+
+        # Assert
+        with np.load(io.BytesIO(content)) as arrays:
+            columns = {name: arrays[name].tolist() for name in arrays.files}
+        self.assertEqual(columns, self.expected)
+
+    @unittest.skipIf(pa is None, "pyarrow is not installed")
+    @patch.object(FinancialDataExportAPIView, "export_batch_size", 2)
+    def test_export_arrow(self):
+        # Act
+        content = self.get_content({"format": "arrow"})
+
+        # Assert
+        table = pa.ipc.open_stream(content).read_all()
+        self.assertEqual(table.to_pydict(), self.expected)
+
+    @unittest.skipIf(pa is None, "pyarrow is not installed")
+    @patch.object(FinancialDataExportAPIView, "export_batch_size", 2)
+    def test_export_parquet(self):
+        # Act
+        content = self.get_content({"format": "parquet", "symbol": "IBM"})
+
+        # Assert
+        table = pq.read_table(pa.BufferReader(content))
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(table.column("close_price").to_pylist(), [102.0, 103.0])
+
+    @patch("core.renderers.ArrowRenderer.available", False)
+    def test_export_missing_package(self):
+        # Act
+        response = self.client.get(self.url, {"format": "arrow"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json()["info"]["error"],
+            "format arrow requires pyarrow to be installed",
+        )
+
+
+class MultiSymbolTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for symbol, day, price, volume in (
+            ("IBM", "2023-03-01", "100.00", 1000),
+            ("IBM", "2023-03-02", "102.00", 2000),
+            ("AAPL", "2023-03-02", "150.00", 3000),
+            ("MSFT", "2023-03-01", "250.00", 4000),
+        ):
+            FinancialDataModel.objects.create(
+                symbol=symbol,
+                date=day,
+                open_price=price,
+                close_price=price,
+                volume=volume,
+            )
+        # AAPL has no rollup rows, MSFT has none in the requested range
+        FinancialDataRollupModel.objects.create(
+            symbol="IBM",
+            date="2023-03-01",
+            cum_open_price="100.00",
+            cum_close_price="100.00",
+            cum_volume=1000,
+            cum_count=1,
+        )
+        FinancialDataRollupModel.objects.create(
+            symbol="IBM",
+            date="2023-03-02",
+            cum_open_price="202.00",
+            cum_close_price="202.00",
+            cum_volume=3000,
+            cum_count=2,
+        )
+        FinancialDataRollupModel.objects.create(
+            symbol="MSFT",
+            date="2023-03-01",
+            cum_open_price="250.00",
+            cum_close_price="250.00",
+            cum_volume=4000,
+            cum_count=1,
+        )
+        for symbol in ("IBM", "MSFT"):
+            FinancialDataIngestModel.objects.create(
+                symbol=symbol, last_date="2023-03-02", version=1, rollup_version=1
+            )
+
+    def test_financial_data_symbol_list(self):
+        # Act
+        response = self.client.get(reverse("financial_data"), {"symbol": "IBM,AAPL"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        symbols = response.data["data"]["symbols"]
+        self.assertEqual(list(symbols), ["IBM", "AAPL"])
+        self.assertEqual(
+            [row["date"] for row in symbols["IBM"]], ["2023-03-01", "2023-03-02"]
+        )
+        self.assertEqual([row["date"] for row in symbols["AAPL"]], ["2023-03-02"])
+        self.assertEqual(response.data["pagination"]["count"], 3)
+
+    def test_financial_data_symbol_without_rows_on_page(self):
+        # Act
+        response = self.client.get(
+            reverse("financial_data"),
+            {"symbol": "IBM,MSFT", "start_date": "2023-03-02"},
+        )
+
+        # Assert
+        symbols = response.data["data"]["symbols"]
+        self.assertEqual([row["date"] for row in symbols["IBM"]], ["2023-03-02"])
+        self.assertEqual(symbols["MSFT"], [])
+
+    def test_statistics_keyed_by_symbol(self):
+        # Act
+        # the data version lookup, the rollup bounds, the rollup rows and one GROUP BY aggregate
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                reverse("statistics"),
+                {
+                    "symbol": "IBM,AAPL,MSFT,GOOG",
+                    "start_date": "2023-03-02",
+                    "end_date": "2023-03-31",
+                },
+            )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data["data"]["symbols"]
+        self.assertEqual(list(data), ["IBM", "AAPL", "MSFT", "GOOG"])
+        self.assertEqual(data["IBM"]["average_daily_open_price"], Decimal("102"))
+        self.assertEqual(data["IBM"]["average_daily_volume"], 2000)
+        self.assertEqual(data["AAPL"]["average_daily_close_price"], Decimal("150"))
+        self.assertEqual(data["AAPL"]["average_daily_volume"], 3000)
+        self.assertIsNone(data["MSFT"]["average_daily_open_price"])
+        self.assertIsNone(data["GOOG"]["average_daily_volume"])
+
+    def test_single_symbol_response_is_unchanged(self):
+        # Act
+        response = self.client.get(
+            reverse("statistics"),
+            {"symbol": "IBM,", "start_date": "2023-03-01", "end_date": "2023-03-31"},
+        )
+
+        # Assert
+        self.assertEqual(response.data["data"]["symbol"], "IBM")
+        self.assertEqual(response.data["data"]["average_daily_volume"], 3000)
+
+    def test_too_many_symbols(self):
+        # Act
+        response = self.client.get(
+            reverse("financial_data"),
+            {"symbol": ",".join(f"S{n}" for n in range(101))},
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["info"]["error"], "symbol accepts at most 100 symbols"
+        )
+
+
+import numpy
+
+from . import analytics
+
+
+class AnalyticsFunctionsTestCase(TestCase):
+    def setUp(self):
+        self.close = numpy.array([10.0, 11.0, 9.9, 10.5, 12.0, 8.4, 9.0, 9.5])
+
+    def test_simple_moving_average(self):
+        # Act
+        sma = analytics.simple_moving_average(self.close, 3)
+
+        # Assert
+        self.assertTrue(numpy.isnan(sma[:2]).all())
+        expected = [self.close[i - 2 : i + 1].mean() for i in range(2, 8)]
+        numpy.testing.assert_allclose(sma[2:], expected)
+
+    def test_exponential_moving_average_matches_recurrence(self):
+        # Arrange
+        values = numpy.random.default_rng(0).normal(100, 5, 2000)
+        alpha = 2 / (50 + 1)
+        expected = [values[0]]
+        for value in values[1:]:
+            expected.append(alpha * value + (1 - alpha) * expected[-1])
+
+        # Act
+        ema = analytics.exponential_moving_average(values, 50)
+
+        # Assert
+        numpy.testing.assert_allclose(ema, expected, rtol=1e-10)
+
+    def test_rolling_volatility(self):
+        # Arrange
+        returns = analytics.daily_returns(self.close)
+
+        # Act
+        volatility = analytics.rolling_volatility(returns, 4)
+
+        # Assert
+        self.assertTrue(numpy.isnan(volatility[:4]).all())
+        expected = [returns[i - 3 : i + 1].std(ddof=1) for i in range(4, 8)]
+        numpy.testing.assert_allclose(volatility[4:], expected)
+
+    def test_max_drawdown(self):
+        # Act
+        drawdown, peak, trough = analytics.max_drawdown(self.close)
+
+        # Assert
+        self.assertAlmostEqual(drawdown, 8.4 / 12.0 - 1)
+        self.assertEqual((peak, trough), (4, 5))
+
+    def test_max_drawdown_rising_prices(self):
+        # Act
+        result = analytics.max_drawdown(numpy.array([1.0, 2.0, 3.0]))
+
+        # Assert
+        self.assertEqual(result, (0.0, None, None))
+
+
+class AnalyticsAPIViewTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("analytics")
+        for day, price in enumerate(["10.00", "11.00", "9.90", "10.50"], start=1):
+            FinancialDataModel.objects.create(
+                symbol="IBM",
+                date=f"2023-03-0{day}",
+                open_price=price,
+                close_price=price,
+                volume=1000,
+            )
+
+    def test_get_analytics(self):
+        # Act
+        # the data version lookup and the series
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                self.url, {"symbol": "IBM", "sma": "2,3", "ema": "2", "volatility": "2"}
+            )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data["data"]
+        self.assertEqual(len(data["dates"]), 4)
+        self.assertIsNone(data["returns"][0])
+        self.assertAlmostEqual(data["returns"][1], 0.1)
+        self.assertEqual(list(data["sma"]), ["2", "3"])
+        self.assertEqual(data["sma"]["2"][:2], [None, 10.5])
+        self.assertEqual(data["ema"]["2"][0], 10.0)
+        self.assertEqual(data["volatility"][:2], [None, None])
+        self.assertAlmostEqual(data["max_drawdown"]["value"], -0.1)
+        self.assertEqual(str(data["max_drawdown"]["peak_date"]), "2023-03-02")
+
+    def test_date_filters(self):
+        # Act
+        response = self.client.get(
+            self.url, {"symbol": "IBM", "start_date": "2023-03-03"}
+        )
+
+        # Assert
+        self.assertEqual(response.data["data"]["close"], [9.9, 10.5])
+
+    def test_invalid_window(self):
+        # Act
+        response = self.client.get(self.url, {"symbol": "IBM", "sma": "1"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["info"]["error"], "sma windows must be at least 2"
+        )
+
+    def test_symbol_is_required(self):
+        # Act
+        response = self.client.get(self.url, {"symbol": "IBM,AAPL"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_volatility_takes_one_window(self):
+        # Act
+        response = self.client.get(self.url, {"symbol": "IBM", "volatility": "20,30"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["info"]["error"], "volatility must be an integer"
+        )
+
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class ResampledDataTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("financial_data")
+        for symbol, day, open_price, close_price, volume in (
+            ("IBM", "2023-01-30", "10.00", "11.00", 100),
+            ("IBM", "2023-01-31", "11.00", "12.00", 200),
+            ("IBM", "2023-02-01", "12.00", "13.00", 300),
+            ("IBM", "2023-02-02", "13.00", "14.00", 400),
+            ("IBM", "2024-03-01", "20.00", "21.00", 500),
+            ("AAPL", "2023-02-15", "50.00", "51.00", 600),
+        ):
+            FinancialDataModel.objects.create(
+                symbol=symbol,
+                date=day,
+                open_price=open_price,
+                close_price=close_price,
+                volume=volume,
+            )
+
+    def get_bars(self, params):
+        response = self.client.get(self.url, {"limit": 10, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_monthly_bars(self):
+        # Act
+        data = self.get_bars({"symbol": "IBM", "interval": "1M"})
+
+        # Assert
+        self.assertEqual(
+            data["data"],
+            [
+                {
+                    "symbol": "IBM",
+                    "date": "2023-01-01",
+                    "open_price": "10.00",
+                    "close_price": "12.00",
+                    "volume": 300,
+                },
+                {
+                    "symbol": "IBM",
+                    "date": "2023-02-01",
+                    "open_price": "12.00",
+                    "close_price": "14.00",
+                    "volume": 700,
+                },
+                {
+                    "symbol": "IBM",
+                    "date": "2024-03-01",
+                    "open_price": "20.00",
+                    "close_price": "21.00",
+                    "volume": 500,
+                },
+            ],
+        )
+        self.assertEqual(data["pagination"]["count"], 3)
+
+    def test_weekly_bars_start_on_monday(self):
+        # Act
+        data = self.get_bars(
+            {"symbol": "IBM", "interval": "1w", "end_date": "2023-12-31"}
+        )
+
+        # Assert
+        self.assertEqual(len(data["data"]), 1)
+        self.assertEqual(data["data"][0]["date"], "2023-01-30")
+        self.assertEqual(data["data"][0]["close_price"], "14.00")
+        self.assertEqual(data["data"][0]["volume"], 1000)
+
+    def test_yearly_bars_of_many_symbols(self):
+        # Act
+        data = self.get_bars({"interval": "1y"})
+
+        # Assert
+        self.assertEqual(
+            [(bar["symbol"], bar["date"], bar["volume"]) for bar in data["data"]],
+            [
+                ("AAPL", "2023-01-01", 600),
+                ("IBM", "2023-01-01", 1000),
+                ("IBM", "2024-01-01", 500),
+            ],
+        )
+
+    def test_bars_are_grouped_without_window_functions(self):
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get_bars({"symbol": "IBM", "interval": "1M", "limit": 2})
+
+        # Assert
+        # the data version lookup, the grouped count, the page of bars and the prices of the page
+        self.assertEqual(len(queries), 4)
+        self.assertNotIn(" OVER ", "".join(query["sql"] for query in queries))
+        self.assertIn("GROUP BY", queries[1]["sql"])
+        self.assertEqual(data["pagination"]["count"], 3)
+        self.assertEqual(
+            [(bar["open_price"], bar["close_price"]) for bar in data["data"]],
+            [("10.00", "12.00"), ("12.00", "14.00")],
+        )
+
+    def test_invalid_interval(self):
+        # Act
+        response = self.client.get(self.url, {"interval": "1d"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["info"]["error"], "interval must be one of 1w, 1M, 1y"
+        )
+
+
+class CorrelationTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("correlation")
+        rng = numpy.random.default_rng(1)
+        self.prices = {
+            "IBM": 100 + rng.normal(0, 1, 30).cumsum(),
+            "AAPL": 150 + rng.normal(0, 1, 30).cumsum(),
+        }
+        # MSFT follows IBM but has no price on the first ten days
+        self.prices["MSFT"] = self.prices["IBM"] * 2
+        for symbol, prices in self.prices.items():
+            for day, price in enumerate(prices):
+                if symbol == "MSFT" and day < 10:
+                    continue
+                FinancialDataModel.objects.create(
+                    symbol=symbol,
+                    date=date(2023, 1, 1) + timedelta(days=day),
+                    open_price=1,
+                    close_price=round(price, 2),
+                    volume=1,
+                )
+
+    def test_correlation_matrix_matches_corrcoef(self):
+        # Arrange
+        returns = numpy.random.default_rng(2).normal(0, 1, (50, 4))
+
+        # Act
+        matrix = analytics.correlation_matrix(returns, 2)
+
+        # Assert
+        numpy.testing.assert_allclose(matrix, numpy.corrcoef(returns.T))
+
+    def test_correlation_uses_pairwise_complete_rows(self):
+        # Arrange
+        returns = numpy.random.default_rng(3).normal(0, 1, (40, 2))
+        returns[:10, 1] = numpy.nan
+
+        # Act
+        matrix = analytics.correlation_matrix(returns, 2)
+
+        # Assert
+        expected = numpy.corrcoef(returns[10:].T)[0, 1]
+        self.assertAlmostEqual(matrix[0, 1], expected)
+        self.assertAlmostEqual(matrix[1, 0], expected)
+
+    def test_get_correlation(self):
+        # Act
+        # the data version lookup and the prices of all symbols
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                self.url, {"symbol": "MSFT,IBM,AAPL", "min_observations": "5"}
+            )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data["data"]
+        self.assertEqual(data["symbols"], ["AAPL", "IBM", "MSFT"])
+        matrix = numpy.array(data["matrix"], dtype=float)
+        numpy.testing.assert_allclose(numpy.diag(matrix), 1.0)
+        numpy.testing.assert_allclose(matrix, matrix.T)
+        self.assertAlmostEqual(matrix[1, 2], 1.0, places=3)
+
+    def test_dates_like_statistics(self):
+        # Arrange
+        params = {"symbol": "IBM,MSFT", "start_date": "2023-01-02"}
+
+        # Act
+        response = self.client.get(self.url, params)
+        invalid = self.client.get(self.url, dict(params, end_date="2023-01-32"))
+
+        # Assert
+        # the parsed dates are returned, rendered like the ones of /api/statistics
+        data = response.json()["data"]
+        self.assertEqual(data["start_date"], "2023-01-02T00:00:00")
+        self.assertIsNone(data["end_date"])
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_too_few_observations(self):
+        # Act
+        response = self.client.get(
+            self.url,
+            {"symbol": "IBM,MSFT", "end_date": "2023-01-15", "min_observations": "5"},
+        )
+
+        # Assert
+        # MSFT has 5 prices in the range, so only 4 returns in common with IBM
+        self.assertIsNone(response.data["data"]["matrix"][0][1])
+
+    def test_requires_two_symbols(self):
+        # Act
+        response = self.client.get(self.url, {"symbol": "IBM"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["info"]["error"], "symbol must list at least two symbols"
+        )
+
+    def test_invalid_min_observations(self):
+        # Act
+        response = self.client.get(
+            self.url, {"symbol": "IBM,MSFT", "min_observations": "1"}
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["info"]["error"], "min_observations must be at least 2"
+        )
+
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from .cache import get_response_cache_key
+
+
+class ResponseCacheKeyTestCase(TestCase):
+    def test_symbol_order_does_not_change_key(self):
+        # Arrange
+        factory = APIRequestFactory()
+        first = Request(factory.get("/", {"symbol": "IBM,AAPL", "limit": 5}))
+        second = Request(factory.get("/", {"limit": 5, "symbol": "AAPL,IBM,IBM"}))
+
+        # Act / Assert
+        self.assertEqual(
+            get_response_cache_key("correlation", first),
+            get_response_cache_key("correlation", second),
+        )
+
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory
+from . import async_views
+
+
+class AsyncViewsTestCase(TestCase):
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        for day, symbol in ((1, "IBM"), (2, "IBM"), (3, "IBM"), (1, "AAPL")):
+            FinancialDataModel.objects.create(
+                symbol=symbol,
+                date=f"2023-03-0{day}",
+                open_price=100 + day,
+                close_price="105.5",
+                volume=1000 * day,
+            )
+        FinancialDataRollupModel.objects.create(
+            symbol="IBM",
+            date="2023-03-03",
+            cum_open_price="306.00",
+            cum_close_price="316.50",
+            cum_volume=6000,
+            cum_count=3,
+        )
+        FinancialDataIngestModel.objects.create(
+            symbol="IBM", last_date="2023-03-03", version=1, rollup_version=1
+        )
+
+    async def assert_same_response(self, async_view, url, params):
+        # Act
+        response = await async_view(self.factory.get(url, params))
+        expected = await self.async_client.get(url, params)
+
+        # Assert
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response.get("ETag"), expected.get("ETag"))
+        return response
+
+    async def test_financial_data(self):
+        await self.assert_same_response(
+            async_views.financial_data,
+            "/api/financial_data",
+            {"symbol": "IBM", "limit": 2, "page": 2},
+        )
+
+    async def test_financial_data_fallback_modes(self):
+        await self.assert_same_response(
+            async_views.financial_data, "/api/financial_data", {"cursor": ""}
+        )
+        await self.assert_same_response(
+            async_views.financial_data, "/api/financial_data", {"interval": "1M"}
+        )
+
+    async def test_financial_data_error(self):
+        response = await self.assert_same_response(
+            async_views.financial_data,
+            "/api/financial_data",
+            {"start_date": "2023/03/01"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_statistics(self):
+        for symbol in ("IBM", "AAPL", "IBM,AAPL"):
+            await self.assert_same_response(
+                async_views.statistics,
+                "/api/statistics",
+                {
+                    "symbol": symbol,
+                    "start_date": "2023-03-02",
+                    "end_date": "2023-03-31",
+                },
+            )
+
+    async def test_if_none_match_returns_not_modified(self):
+        # Arrange
+        url, params = "/api/statistics", {
+            "symbol": "IBM",
+            "start_date": "2023-03-01",
+            "end_date": "2023-03-31",
+        }
+        etag = (await async_views.statistics(self.factory.get(url, params)))["ETag"]
+
+        # Act
+        response = await async_views.statistics(
+            self.factory.get(url, params, headers={"If-None-Match": etag})
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since_skips_the_view(self):
+        for view, url, params in (
+            (
+                async_views.statistics,
+                "/api/statistics",
+                {"symbol": "IBM", "start_date": "2023-03-01", "end_date": "2023-03-31"},
+            ),
+            (async_views.financial_data, "/api/financial_data", {"symbol": "IBM"}),
+        ):
+            with self.subTest(url=url):
+                # Arrange
+                view = async_to_sync(view)
+                last_modified = view(self.factory.get(url, params))["Last-Modified"]
+                request = self.factory.get(
+                    url, params, headers={"If-Modified-Since": last_modified}
+                )
+
+                # Act
+                # only the data version is read, the view does not run
+                with self.assertNumQueries(1):
+                    response = view(request)
+
+                # Assert
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_errors_have_no_validators(self):
+        # Arrange
+        request = self.factory.get(
+            "/api/statistics",
+            {"symbol": "IBM", "start_date": "2023-03-31", "end_date": "2023-03-01"},
+            headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"},
+        )
+
+        # Act
+        response = await async_views.statistics(request)
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(response.has_header("ETag"))
+
+    async def test_export_streams_asynchronously(self):
+        # Act
+        response = await self.async_client.get(
+            "/api/financial_data/export", {"format": "ndjson"}
+        )
+        content = b"".join([chunk async for chunk in response.streaming_content])
+
+        # Assert
+        # a sync iterator would be buffered whole by the ASGI handler
+        self.assertTrue(response.is_async)
+        self.assertEqual(len(content.splitlines()), 4)
+
+
+from financial import api_settings
+
+API_ONLY_SETTINGS = {
+    "MIDDLEWARE": api_settings.MIDDLEWARE,
+    "ROOT_URLCONF": api_settings.ROOT_URLCONF,
+    "REST_FRAMEWORK": api_settings.REST_FRAMEWORK,
+}
+
+
+class ApiSettingsTestCase(TestCase):
+    def setUp(self):
+        for day in range(1, 4):
+            FinancialDataModel.objects.create(
+                symbol="IBM",
+                date=f"2023-03-0{day}",
+                open_price=100 + day,
+                close_price="105.5",
+                volume=1000 * day,
+            )
+
+    def test_leaves_out_apps_and_middleware(self):
+        # Assert
+        for app in ("django.contrib.admin", "django.contrib.sessions"):
+            self.assertNotIn(app, api_settings.INSTALLED_APPS)
+        self.assertNotIn(
+            "django.middleware.csrf.CsrfViewMiddleware", api_settings.MIDDLEWARE
+        )
+        # Views read the renderers when they are imported, so this is not overridable in a test
+        self.assertEqual(
+            api_settings.REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"],
+            ["core.renderers.FastJSONRenderer"],
+        )
+
+    def test_same_api_responses(self):
+        for url, params in (
+            ("/api/financial_data", {"symbol": "IBM", "limit": 2}),
+            ("/api/statistics", {"symbol": "IBM", "start_date": "2023-03-01"}),
+            ("/api/financial_data/export", {"format": "csv"}),
+        ):
+            # Act
+            expected = self.client.get(url, params)
+            with self.settings(**API_ONLY_SETTINGS):
+                response = self.client.get(url, params)
+
+            # Assert
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertEqual(response.getvalue(), expected.getvalue())
+            self.assertEqual(response.get("ETag"), expected.get("ETag"))
+
+    @override_settings(**API_ONLY_SETTINGS)
+    def test_admin_is_not_routed(self):
+        # Act
+        response = self.client.get("/admin/")
+
+        # Assert
+        self.assertEqual(response.status_code, 404)
+
+
+from datetime import timedelta
+from django.core.signals import request_started
+from django.db import OperationalError, connections
+from django.utils import timezone
+from .routers import ReadReplicaRouter
+
+
+@override_settings(DATABASE_REPLICAS=["replica"], DATABASE_REPLICA_PIN_SECONDS=60)
+class ReadReplicaRouterTestCase(TestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        # The replica lags behind the primary by one price update
+        for alias, price in (("default", "101.00"), ("replica", "100.00")):
+            FinancialDataModel.objects.using(alias).create(
+                symbol="IBM",
+                date="2023-03-01",
+                open_price=price,
+                close_price=price,
+                volume=1000,
+            )
+        self.ingest = FinancialDataIngestModel.objects.create(
+            symbol="IBM", last_date="2023-03-01", version=1
+        )
+        self.router = ReadReplicaRouter()
+
+    def get_open_price(self):
+        response = self.client.get("/api/financial_data", {"symbol": "IBM"})
+        return response.json()["data"][0]["open_price"]
+
+    def test_reads_go_to_replica(self):
+        # Arrange
+        FinancialDataIngestModel.objects.update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+
+        # Act / Assert
+        self.assertEqual(self.get_open_price(), "100.00")
+
+    def test_reads_pinned_to_primary_after_ingest(self):
+        # Act / Assert
+        self.assertEqual(self.get_open_price(), "101.00")
+
+    @override_settings(DATABASE_REPLICAS=["replica", "default"])
+    def test_round_robin(self):
+        # Act
+        aliases = []
+        for _ in range(4):
+            request_started.send(sender=self.__class__)
+            aliases.append(self.router.db_for_read(FinancialDataModel))
+
+        # Assert
+        self.assertEqual(aliases, ["replica", "default", "replica", "default"])
+
+    @override_settings(DATABASE_REPLICAS=["replica", "default"])
+    def test_one_replica_per_request(self):
+        # Arrange
+        request_started.send(sender=self.__class__)
+
+        # Act
+        aliases = [self.router.db_for_read(FinancialDataModel) for _ in range(3)]
+
+        # Assert
+        self.assertEqual(aliases, ["replica", "replica", "replica"])
+
+    def test_failover_to_primary(self):
+        # Arrange
+        request_started.send(sender=self.__class__)
+
+        # Act
+        with patch.object(
+            connections["replica"], "ensure_connection", side_effect=OperationalError
+        ) as ensure_connection:
+            aliases = [self.router.db_for_read(FinancialDataModel) for _ in range(2)]
+
+        # Assert
+        self.assertEqual(aliases, ["default", "default"])
+        # The failed replica is not retried right away
+        self.assertEqual(ensure_connection.call_count, 1)
+
+    def test_writes_pin_reads_to_primary(self):
+        # Arrange
+        request_started.send(sender=self.__class__)
+
+        # Act
+        write = self.router.db_for_write(FinancialDataModel)
+        read = self.router.db_for_read(FinancialDataModel)
+
+        # Assert
+        self.assertEqual((write, read), ("default", "default"))
+        self.assertFalse(self.router.allow_migrate("replica", "core"))
+
+
+import os
+import tempfile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from .snapshot import get_snapshot, write_snapshot
+import warnings
+from django.core.paginator import UnorderedObjectListWarning
+
+
+class SnapshotTestCase(TestCase):
+    def setUp(self):
+        rows = (
+            ("AAPL", "2023-03-01", "150.25", "151.00", 5000),
+            ("IBM", "2023-03-01", "101.00", "105.50", 1000),
+            ("IBM", "2023-03-02", "102.00", "105.50", 2000),
+            ("IBM", "2023-03-03", "103.01", "106.00", 3000),
+        )
+        totals = {}
+        for symbol, day, open_price, close_price, volume in rows:
+            FinancialDataModel.objects.create(
+                symbol=symbol,
+                date=day,
+                open_price=open_price,
+                close_price=close_price,
+                volume=volume,
+            )
+            # Running totals, so the database answers statistics like the snapshot formats them
+            total = totals.get(symbol, (Decimal(0), Decimal(0), 0, 0))
+            total = totals[symbol] = (
+                total[0] + Decimal(open_price),
+                total[1] + Decimal(close_price),
+                total[2] + volume,
+                total[3] + 1,
+            )
+            FinancialDataRollupModel.objects.create(
+                symbol=symbol,
+                date=day,
+                cum_open_price=total[0],
+                cum_close_price=total[1],
+                cum_volume=total[2],
+                cum_count=total[3],
+            )
+        for symbol in ("AAPL", "IBM"):
+            FinancialDataIngestModel.objects.create(
+                symbol=symbol, last_date="2023-03-03", version=1, rollup_version=1
+            )
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "financial_data.snapshot")
+        self.publish()
+
+    def publish(self):
+        write_snapshot(
+            self.path,
+            FinancialDataModel.objects.order_by("symbol", "date").values_list(
+                "id", "symbol", "date", "open_price", "close_price", "volume"
+            ),
+            dict(FinancialDataIngestModel.objects.values_list("symbol", "version")),
+            # Symbols span several batches
+            batch_size=2,
+        )
+
+    def test_same_responses_without_queries(self):
+        for url, params in (
+            ("/api/financial_data", {"symbol": "IBM", "limit": 2, "page": 2}),
+            (
+                "/api/financial_data",
+                {"symbol": "IBM,AAPL", "start_date": "2023-03-01", "limit": 10},
+            ),
+            ("/api/financial_data", {"symbol": "MSFT"}),
+            (
+                "/api/statistics",
+                {
+                    "symbol": "IBM",
+                    "start_date": "2023-03-02",
+                    "end_date": "2023-03-03",
+                },
+            ),
+            (
+                "/api/statistics",
+                {
+                    "symbol": "IBM,AAPL,MSFT",
+                    "start_date": "2023-03-01",
+                    "end_date": "2023-03-05",
+                },
+            ),
+        ):
+            # Act
+            expected = self.client.get(url, params)
+            with self.settings(SNAPSHOT_PATH=self.path):
+                # Only the data version is read from the database
+                with self.assertNumQueries(1):
+                    response = self.client.get(url, params)
+
+            # Assert
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, expected.content)
+
+    def test_same_pages_as_database(self):
+        # Arrange: the first IBM row is stored last
+        row = FinancialDataModel.objects.get(symbol="IBM", date="2023-03-01")
+        row.delete()
+        row.pk = None
+        row.save()
+        self.publish()
+
+        for page in (1, 2):
+            params = {"symbol": "IBM,AAPL", "limit": 2, "page": page}
+            # Act
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always")
+                expected = self.client.get("/api/financial_data", params)
+            with self.settings(SNAPSHOT_PATH=self.path):
+                response = self.client.get("/api/financial_data", params)
+
+            # Assert
+            self.assertEqual(response.content, expected.content)
+            self.assertFalse(
+                [w for w in caught if w.category is UnorderedObjectListWarning]
+            )
+
+    def test_unordered_rows_are_rejected(self):
+        # Arrange
+        rows = FinancialDataModel.objects.order_by("symbol", "-date").values_list(
+            "id", "symbol", "date", "open_price", "close_price", "volume"
+        )
+
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            write_snapshot(self.path, rows, {})
+        self.assertEqual(
+            os.listdir(os.path.dirname(self.path)), ["financial_data.snapshot"]
+        )
+
+    @override_settings(SNAPSHOT_PATH="")
+    def test_invalid_page_error(self):
+        # Arrange
+        params = {"symbol": "IBM", "page": 9}
+        expected = self.client.get("/api/financial_data", params)
+
+        # Act
+        with self.settings(SNAPSHOT_PATH=self.path):
+            response = self.client.get("/api/financial_data", params)
+
+        # Assert
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.content, expected.content)
+
+    def test_stale_snapshot_reads_database(self):
+        # Arrange
+        FinancialDataModel.objects.filter(symbol="IBM").update(volume=7)
+        FinancialDataIngestModel.objects.filter(symbol="IBM").update(version=2)
+
+        # Act
+        with self.settings(SNAPSHOT_PATH=self.path):
+            response = self.client.get("/api/financial_data", {"symbol": "IBM"})
+
+        # Assert
+        self.assertEqual({row["volume"] for row in response.json()["data"]}, {7})
+
+    def test_replaced_snapshot_is_mapped(self):
+        # Arrange
+        snapshot = get_snapshot(self.path)
+        FinancialDataModel.objects.filter(symbol="IBM").update(volume=7)
+        FinancialDataIngestModel.objects.filter(symbol="IBM").update(version=2)
+
+        # Act
+        self.publish()
+        with self.settings(SNAPSHOT_PATH=self.path):
+            with self.assertNumQueries(1):
+                response = self.client.get("/api/financial_data", {"symbol": "IBM"})
+
+        # Assert
+        self.assertIsNot(get_snapshot(self.path), snapshot)
+        self.assertEqual({row["volume"] for row in response.json()["data"]}, {7})
+        # The old mapping stays readable
+        self.assertEqual(snapshot.get_totals("IBM")[2], 6000)
+
+    def test_unsupported_requests_read_database(self):
+        for params in (
+            {"symbol": "IBM", "cursor": ""},
+            {"symbol": "IBM", "interval": "1M"},
+            {},
+        ):
+            # Act
+            with self.settings(SNAPSHOT_PATH=self.path):
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get("/api/financial_data", params)
+
+            # Assert
+            self.assertTrue(
+                any('FROM "financial_data"' in q["sql"] for q in queries),
+                msg=str(params),
+            )
+
+    async def test_async_views(self):
+        for view, url, params in (
+            (async_views.financial_data, "/api/financial_data", {"symbol": "IBM"}),
+            (
+                async_views.statistics,
+                "/api/statistics",
+                {
+                    "symbol": "IBM",
+                    "start_date": "2023-03-01",
+                    "end_date": "2023-03-02",
+                },
+            ),
+        ):
+            # Act
+            expected = await self.async_client.get(url, params)
+            with self.settings(SNAPSHOT_PATH=self.path):
+                response = await view(AsyncRequestFactory().get(url, params))
+
+            # Assert
+            self.assertEqual(response.content, expected.content)
+
+
+from io import StringIO
+from datetime import date
+from django.core.management import CommandError, call_command
+from django.db.models import Sum
+
+
+class GenerateMarketDataTestCase(TestCase):
+    def generate(self, **options):
+        call_command("generate_market_data", stdout=StringIO(), **options)
+        return list(
+            FinancialDataModel.objects.order_by("symbol", "date").values_list(
+                "symbol", "date", "open_price", "close_price", "volume"
+            )
+        )
+
+    def test_generates_histories(self):
+        # Act
+        rows = self.generate(symbols=3, years=0.1, start_date=date(2023, 3, 1))
+
+        # Assert
+        self.assertEqual(len(rows), 75)
+        self.assertEqual({row[0] for row in rows}, {"SYM00000", "SYM00001", "SYM00002"})
+        self.assertEqual(rows[0][1], date(2023, 3, 1))
+        self.assertTrue(all(row[1].weekday() < 5 for row in rows))
+        self.assertTrue(all(row[2] > 0 and row[3] > 0 and row[4] > 0 for row in rows))
+        ingest = FinancialDataIngestModel.objects.get(symbol="SYM00001")
+        self.assertEqual((ingest.last_date, ingest.version), (rows[-1][1], 1))
+
+    def test_builds_rollup(self):
+        # Act
+        self.generate(symbols=2, years=0.1)
+
+        # Assert
+        totals = FinancialDataModel.objects.filter(symbol="SYM00001").aggregate(
+            Sum("open_price"), Sum("volume")
+        )
+        last = FinancialDataRollupModel.objects.filter(symbol="SYM00001").latest("date")
+        self.assertEqual(FinancialDataRollupModel.objects.count(), 50)
+        self.assertEqual(last.cum_count, 25)
+        self.assertEqual(last.cum_open_price, totals["open_price__sum"])
+        self.assertEqual(last.cum_volume, totals["volume__sum"])
+
+    def test_same_seed_same_rows(self):
+        # Act
+        first = self.generate(symbols=2, years=0.1, seed=7)
+        second = self.generate(symbols=2, years=0.1, seed=7)
+        other = self.generate(symbols=2, years=0.1, seed=8)
+
+        # Assert
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        # Regenerated symbols get a new data version, so cached responses are not reused
+        self.assertEqual(
+            FinancialDataIngestModel.objects.get(symbol="SYM00000").version, 3
+        )
+
+    def test_flush(self):
+        # Arrange
+        FinancialDataModel.objects.create(
+            symbol="IBM",
+            date="2023-03-01",
+            open_price="101.00",
+            close_price="105.50",
+            volume=1000,
+        )
+        FinancialDataIngestModel.objects.create(
+            symbol="IBM", last_date="2023-03-01", version=4
+        )
+
+        # Act
+        kept = self.generate(symbols=1, years=0.1)
+        flushed = self.generate(symbols=1, years=0.1, flush=True)
+
+        # Assert
+        self.assertEqual(len(kept), 26)
+        self.assertEqual(len(flushed), 25)
+        # The wiped symbol keeps its ingest row with a newer version
+        self.assertEqual(FinancialDataIngestModel.objects.get(symbol="IBM").version, 5)
+
+    def test_flush_rewinds_watermarks(self):
+        # Arrange
+        for day in ("2023-03-01", "2023-03-02"):
+            FinancialDataModel.objects.create(
+                symbol="IBM",
+                date=day,
+                open_price="101.00",
+                close_price="105.50",
+                volume=1000,
+            )
+        FinancialDataIngestModel.objects.create(
+            symbol="IBM", last_date="2023-03-02", version=4
+        )
+        if str(settings.BASE_DIR.parent) not in sys.path:
+            sys.path.insert(0, str(settings.BASE_DIR.parent))
+        from get_raw_data import get_watermarks
+
+        # Act
+        self.generate(symbols=1, years=0.1, flush=True)
+
+        # Assert: the next ingest refetches IBM from its first stored day
+        watermarks = get_watermarks(connection)
+        self.assertEqual(str(watermarks["IBM"]), "2023-03-01")
+        self.assertEqual(FinancialDataIngestModel.objects.get(symbol="IBM").version, 5)
+
+    def test_versions_only_grow(self):
+        # Arrange
+        FinancialDataIngestModel.objects.create(
+            symbol="SYM00000", last_date="2023-03-01", version=7
+        )
+
+        # Act
+        rows = self.generate(symbols=2, years=0.1)
+
+        # Assert
+        versions = dict(
+            FinancialDataIngestModel.objects.values_list("symbol", "version")
+        )
+        self.assertEqual(versions, {"SYM00000": 8, "SYM00001": 1})
+        ingest = FinancialDataIngestModel.objects.get(symbol="SYM00000")
+        self.assertEqual(ingest.last_date, rows[-1][1])
+
+    def test_invalid_options(self):
+        for options in ({"symbols": 0}, {"years": 0}, {"prefix": "X" * 20}):
+            with self.assertRaises(CommandError, msg=str(options)):
+                self.generate(**options)
+
+
+from .middleware import timed
+
+
+class ServerTimingTestCase(TestCase):
+    def setUp(self):
+        for day, volume in (("2023-03-01", 1000), ("2023-03-02", 2000)):
+            FinancialDataModel.objects.create(
+                symbol="IBM",
+                date=day,
+                open_price="101.00",
+                close_price="105.50",
+                volume=volume,
+            )
+
+    def parse(self, header):
+        """
+        Map the metric names of a Server-Timing header to their parameters.
+        """
+        metrics = {}
+        for entry in header.split(", "):
+            name, *params = entry.split(";")
+            metrics[name] = dict(param.split("=", 1) for param in params)
+        return metrics
+
+    def test_header(self):
+        # Act
+        response = self.client.get("/api/financial_data", {"symbol": "IBM"})
+
+        # Assert
+        metrics = self.parse(response["Server-Timing"])
+        self.assertEqual(set(metrics), {"db", "serialize", "render", "view", "total"})
+        # The data version, the page count and the page
+        self.assertEqual(metrics["db"]["desc"], '"3 queries"')
+        total = float(metrics["total"]["dur"])
+        self.assertGreaterEqual(total, float(metrics["view"]["dur"]))
+        self.assertGreater(float(metrics["view"]["dur"]), float(metrics["db"]["dur"]))
+
+    def test_log_line(self):
+        # Act
+        with self.assertLogs("core.timing", "INFO") as logs:
+            self.client.get(
+                "/api/statistics",
+                {"symbol": "IBM", "start_date": "2023-03-01", "end_date": "2023-03-02"},
+            )
+
+        # Assert
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(
+            line["path"],
+            "/api/statistics?symbol=IBM&start_date=2023-03-01&end_date=2023-03-02",
+        )
+        self.assertEqual(line["status"], 200)
+        self.assertGreater(line["queries"], 0)
+        self.assertGreaterEqual(line["total_ms"], line["view_ms"])
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        # Act
+        with self.assertNoLogs("core.timing", "INFO"):
+            response = self.client.get("/api/financial_data", {"symbol": "IBM"})
+
+        # Assert
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(response.status_code, 200)
+
+    def test_timed_outside_request(self):
+        # Act
+        with timed("render"):
+            result = FastJSONRenderer().render({"a": 1})
+
+        # Assert
+        self.assertEqual(result, b'{"a":1}')
+
+    async def test_async(self):
+        # Act
+        response = await self.async_client.get("/api/financial_data", {"symbol": "IBM"})
+
+        # Assert
+        metrics = self.parse(response["Server-Timing"])
+        self.assertEqual(metrics["db"]["desc"], '"3 queries"')
+        self.assertIn("render", metrics)
+
+
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.test import RequestFactory
+from prometheus_client import REGISTRY
+from .metrics import observe_query
+from .middleware import MetricsMiddleware, ServerTimingMiddleware
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        caches["api"].clear()
+        FinancialDataModel.objects.create(
+            symbol="IBM",
+            date="2023-03-01",
+            open_price="101.00",
+            close_price="105.50",
+            volume=1000,
+        )
+
+    def get_value(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_requests_counted_by_route(self):
+        # Arrange
+        labels = {"route": "/api/financial_data", "method": "GET", "status": "200"}
+        before = self.get_value("financial_http_requests_total", **labels)
+        durations = self.get_value(
+            "financial_http_request_duration_seconds_count",
+            route="/api/financial_data",
+            method="GET",
+        )
+
+        # Act
+        self.client.get("/api/financial_data", {"symbol": "IBM"})
+        self.client.get("/api/financial_data", {"symbol": "AAPL"})
+        self.client.get("/missing")
+
+        # Assert
+        self.assertEqual(
+            self.get_value("financial_http_requests_total", **labels), before + 2
+        )
+        self.assertEqual(
+            self.get_value(
+                "financial_http_request_duration_seconds_count",
+                route="/api/financial_data",
+                method="GET",
+            ),
+            durations + 2,
+        )
+        self.assertGreater(
+            self.get_value(
+                "financial_http_requests_total",
+                route="unmatched",
+                method="GET",
+                status="404",
+            ),
+            0,
+        )
+        self.assertEqual(self.get_value("financial_http_requests_in_progress"), 0)
+
+    def test_queries_timed(self):
+        # Arrange
+        before = self.get_value(
+            "financial_db_query_duration_seconds_count", database="default"
+        )
+
+        # Act
+        self.client.get("/api/financial_data", {"symbol": "IBM"})
+
+        # Assert
+        self.assertEqual(
+            self.get_value(
+                "financial_db_query_duration_seconds_count", database="default"
+            ),
+            before + 3,
+        )
+
+    def test_connection_opened_in_sampled_request(self):
+        # Arrange
+        self.addCleanup(
+            setattr, connection, "execute_wrappers", list(connection.execute_wrappers)
+        )
+        connection.execute_wrappers = []
+
+        def get_response(request):
+            # What Django sends when the request opens the connection
+            connection_created.send(sender=type(connection), connection=connection)
+            FinancialDataModel.objects.count()
+            return HttpResponse()
+
+        # Act
+        response = ServerTimingMiddleware(get_response)(RequestFactory().get("/"))
+
+        # Assert
+        self.assertIn('desc="1 queries"', response["Server-Timing"])
+        self.assertEqual(connection.execute_wrappers, [observe_query])
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_cache_hits(self):
+        # Arrange
+        caches["api"].clear()
+        hits = self.get_value(
+            "financial_cache_requests_total", cache="api", result="hit"
+        )
+        misses = self.get_value(
+            "financial_cache_requests_total", cache="api", result="miss"
+        )
+
+        # Act
+        self.client.get("/api/financial_data", {"symbol": "IBM"})
+        self.client.get("/api/financial_data", {"symbol": "IBM"})
+
+        # Assert
+        self.assertEqual(
+            self.get_value("financial_cache_requests_total", cache="api", result="hit"),
+            hits + 1,
+        )
+        self.assertEqual(
+            self.get_value(
+                "financial_cache_requests_total", cache="api", result="miss"
+            ),
+            misses + 1,
+        )
+
+    def test_exceptions_counted(self):
+        # Arrange
+        middleware = MetricsMiddleware(lambda request: None)
+        before = self.get_value(
+            "financial_http_exceptions_total", route="unmatched", exception="ValueError"
+        )
+
+        # Act
+        middleware.process_exception(RequestFactory().get("/"), ValueError())
+
+        # Assert
+        self.assertEqual(
+            self.get_value(
+                "financial_http_exceptions_total",
+                route="unmatched",
+                exception="ValueError",
+            ),
+            before + 1,
+        )
+
+    def test_endpoint(self):
+        # Arrange
+        self.client.get("/api/financial_data", {"symbol": "IBM"})
+
+        # Act
+        response = self.client.get("/metrics")
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        self.assertIn(
+            'financial_http_requests_total{method="GET",route="/api/financial_data"',
+            body,
+        )
+        self.assertIn("financial_db_query_duration_seconds_bucket", body)
+
+    async def test_async_requests_counted(self):
+        # Arrange
+        labels = {"route": "/api/financial_data", "method": "GET", "status": "200"}
+        before = self.get_value("financial_http_requests_total", **labels)
+
+        # Act
+        await self.async_client.get("/api/financial_data", {"symbol": "IBM"})
+
+        # Assert
+        self.assertEqual(
+            self.get_value("financial_http_requests_total", **labels), before + 1
+        )
+
+
+import sys
+from unittest import skipUnless
+
+from django.conf import settings
+
+from .models import FinancialDataIngestModel
+
+
+@skipUnless(connection.vendor == "mysql", "the ingest script writes MySQL upserts")
+class WatermarkUpsertTestCase(TransactionTestCase):
+    """
+    The ingest script upserts into the table the Django migrations created, whose updated_at column
+    has no database default.
+    """
+
+    def setUp(self):
+        if str(settings.BASE_DIR.parent) not in sys.path:
+            sys.path.insert(0, str(settings.BASE_DIR.parent))
+        with connection.cursor() as cursor:
+            cursor.execute("SET SESSION sql_mode = 'STRICT_TRANS_TABLES'")
+
+    def test_upsert_into_migrated_table(self):
+        # Arrange
+        from get_raw_data import update_watermarks
+
+        # Act: Django's connection has the cursor(), commit() and rollback() of the script's
+        update_watermarks(connection, [{"symbol": "IBM", "date": "2023-03-09"}])
+        update_watermarks(connection, [{"symbol": "IBM", "date": "2023-03-10"}])
+
+        # Assert
+        ingest = FinancialDataIngestModel.objects.get(symbol="IBM")
+        self.assertEqual(str(ingest.last_date), "2023-03-10")
+        self.assertEqual(ingest.version, 2)
+        self.assertIsNotNone(ingest.updated_at)
+
+
+from .operations import IfMissing
+
+
+class IfMissingMigrationTestCase(TransactionTestCase):
+    initial = [("core", "0001_initial")]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_migrations_skip_schema_created_by_ingest_script(self):
+        # Arrange: the tables, keys and column already exist, as schema.sql creates them
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.initial)
+        executor.loader.build_graph()
+        state = executor.loader.project_state(self.initial)
+        with connection.schema_editor() as schema_editor:
+            for key, migration in sorted(executor.loader.disk_migrations.items()):
+                for operation in migration.operations:
+                    if not isinstance(operation, IfMissing):
+                        continue
+                    new_state = state.clone()
+                    operation.state_forwards("core", new_state)
+                    operation.operation.database_forwards(
+                        "core", schema_editor, state, new_state
+                    )
+                    state = new_state
+
+        # Act
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+        # Assert
+        self.assertIn(
+            ("core", "0005_financial_data_ingest_version"),
+            executor.recorder.applied_migrations(),
+        )
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, "financial_data"
+            )
+        self.assertIn("financial_data_symbol_date_uniq", constraints)
+        self.assertIn("financial_data_covering_idx", constraints)
@@ -1,13 +1,37 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# The ASGI deployment serves the async versions of the views
+if settings.ASYNC_API_VIEWS:
+    from . import async_views
+
+    financial_data_view = async_views.financial_data
+    statistics_view = async_views.statistics
+else:
+    financial_data_view = views.FinancialDataAPIView.as_view()
+    statistics_view = views.StatisticsAPIView.as_view()
+
 urlpatterns = [
-    path(route="financial_data/", view=views.FinancialDataAPIView.as_view()),
+    path(route="financial_data/", view=financial_data_view),
+    path(route="financial_data", view=financial_data_view, name="financial_data"),
+    path(
+        route="financial_data/export/",
+        view=views.FinancialDataExportAPIView.as_view(),
+    ),
+    path(
+        route="financial_data/export",
+        view=views.FinancialDataExportAPIView.as_view(),
+        name="financial_data_export",
+    ),
+    path(route="statistics/", view=statistics_view),
+    path(route="statistics", view=statistics_view, name="statistics"),
+    path(route="analytics/", view=views.AnalyticsAPIView.as_view()),
+    path(route="analytics", view=views.AnalyticsAPIView.as_view(), name="analytics"),
+    path(route="correlation/", view=views.CorrelationAPIView.as_view()),
     path(
-        route="financial_data",
-        view=views.FinancialDataAPIView.as_view(),
-        name="financial_data",
+        route="correlation",
+        view=views.CorrelationAPIView.as_view(),
+        name="correlation",
     ),
-    path(route="statistics/", view=views.StatisticsAPIView.as_view()),
-    path(route="statistics", view=views.StatisticsAPIView.as_view(), name="statistics"),
 ]
@@ -1,133 +1,829 @@
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
 
-from django.db.models import Avg, Sum
+from django.db.models import Avg, F, Max, Min, Q, Sum, Value
+from django.db.models.functions import Trunc
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from datetime import datetime
+from decimal import Decimal
 
-from .models import FinancialDataModel
-from .serializers import FinancialDataSerializer
+import numpy as np
 
+from . import analytics
+from .cache import cache_response, conditional_response, get_request_data_version
+from .models import (
+    FinancialDataIngestModel,
+    FinancialDataModel,
+    FinancialDataRollupModel,
+)
+from .pagination import KeysetPagination, LazyPageNumberPagination, keyset_filter
+from .renderers import (
+    ArrowRenderer,
+    CSVRenderer,
+    NDJSONRenderer,
+    NPZRenderer,
+    ParquetRenderer,
+)
+from .serializers import (
+    FinancialDataSerializer,
+    ResampledDataSerializer,
+    get_row_encoder,
+)
+from .metrics import observe_cache
+from .middleware import timed
+from .snapshot import get_snapshot
 
-class FinancialDataAPIView(APIView):
-    serializer_class = FinancialDataSerializer
-    pagination_class = PageNumberPagination
+# MySQL returns AVG() of a DECIMAL(n, 2) column with 6 decimal places
+AVERAGE_PRECISION = Decimal("0.000001")
+# Most symbols a single request may ask for
+MAX_SYMBOLS = 100
+# Most windows of one indicator a single analytics request may ask for
+MAX_WINDOWS = 5
+# Most symbols of one correlation matrix
+MAX_CORRELATION_SYMBOLS = 500
+# Resampling intervals of /api/financial_data and the Trunc kinds of their buckets
+INTERVALS = {"1w": "week", "1M": "month", "1y": "year"}
 
-    def get(self, request, *args, **kwargs):
-        try:
-            # Get the queryset based on the filters provided in the request
-            queryset = self.get_queryset(request)
 
-            # Paginate the results
-            paginator = self.pagination_class()
-            paginator.page_size = request.query_params.get("limit", 5)
-            result_page = paginator.paginate_queryset(queryset, request)
-            serializer = self.serializer_class(result_page, many=True)
+def parse_symbols(symbol, max_symbols=MAX_SYMBOLS):
+    """
+    Split a comma separated symbol parameter, dropping empty entries and duplicates.
 
-            # Construct the response data
-            response_data = {
-                "data": serializer.data,
-                "pagination": {
-                    "count": queryset.count(),
-                    "page": paginator.page.number,
-                    "limit": int(paginator.page_size),
-                    "pages": paginator.page.paginator.num_pages,
-                },
-                "info": {"error": ""},
-            }
+    :param symbol: str, value of the symbol query parameter
+    :param max_symbols: int, most symbols accepted
+    :return: list of str, symbols in the order they were given
+    """
+    symbols = list(dict.fromkeys(s for s in symbol.split(",") if s))
+    if len(symbols) > max_symbols:
+        raise ValueError(f"symbol accepts at most {max_symbols} symbols")
+    return symbols
 
-            return Response(response_data)
 
-        except Exception as e:
-            # Return an error response if an exception is raised
-            return Response(
-                {"data": [], "pagination": {}, "info": {"error": str(e)}},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+async def iterate_in_thread(iterator):
+    """
+    Iterate a sync iterator from async code, each step runs in the thread of the sync ORM.
+    """
+    done = object()
+    while True:
+        item = await sync_to_async(next)(iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+def parse_windows(value, name):
+    """
+    Parse a comma separated list of indicator windows.
+
+    :param value: str, value of the query parameter
+    :param name: str, name of the query parameter used in error messages
+    :return: list of int, distinct windows in the order they were given
+    """
+    try:
+        windows = list(dict.fromkeys(int(w) for w in value.split(",") if w))
+    except ValueError:
+        raise ValueError(f"{name} must be a comma separated list of integers")
+    if not windows or len(windows) > MAX_WINDOWS:
+        raise ValueError(f"{name} accepts between 1 and {MAX_WINDOWS} windows")
+    if min(windows) < 2:
+        raise ValueError(f"{name} windows must be at least 2")
+    return windows
+
+
+def parse_positive_int(value, name, minimum=1):
+    """
+    Parse a single integer query parameter.
+
+    :param value: str, value of the query parameter
+    :param name: str, name of the query parameter used in error messages
+    :param minimum: int, smallest accepted value
+    :return: int
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+    if number < minimum:
+        raise ValueError(f"{name} must be at least {minimum}")
+    return number
+
+
+def get_rollup_difference(end, start):
+    """
+    Compute the statistics of a range from the rollup running totals at both of its ends.
+
+    :param end: tuple, (cum_open_price, cum_close_price, cum_volume, cum_count) at the end date
+    :param start: tuple, the same totals before the start date, None if there are no earlier rows
+    :return: dict with the same keys as the aggregate query
+    """
+    open_sum, close_sum, volume_sum, count = (
+        e - s for e, s in zip(end, start or (0, 0, 0, 0))
+    )
+    if count == 0:
+        return {
+            "open_price__avg": None,
+            "close_price__avg": None,
+            "volume__sum": None,
+        }
+    return {
+        "open_price__avg": (open_sum / count).quantize(AVERAGE_PRECISION),
+        "close_price__avg": (close_sum / count).quantize(AVERAGE_PRECISION),
+        "volume__sum": volume_sum,
+    }
+
+
+def get_current_snapshot(request, symbols):
+    """
+    Return the snapshot if one is configured and it holds the current data of the symbols.
+
+    Its data versions are compared with the ones the request's cache key and ETag are built from,
+    so a snapshot older than the last ingest of any of the symbols is never served.
+
+    :param request: Request, its data version is looked up once per request
+    :param symbols: list of str, symbols the request reads
+    :return: Snapshot, or None to read from the database
+    """
+    if not settings.SNAPSHOT_PATH or not symbols:
+        return None
+    snapshot = get_snapshot(settings.SNAPSHOT_PATH)
+    if snapshot is not None:
+        version, _ = get_request_data_version(request)
+        if snapshot.get_version(symbols) != version:
+            snapshot = None
+    observe_cache("snapshot", snapshot is not None)
+    return snapshot
+
+
+class FinancialDataFilterMixin:
+    """
+    Filters of /api/financial_data by date range and symbols, shared by the views reading daily rows.
+    """
+
+    max_symbols = MAX_SYMBOLS
 
     def get_queryset(self, request):
         # Get all FinancialDataModel objects
         queryset = FinancialDataModel.objects.all()
+        start_date, end_date, symbols = self.get_filters(request)
+
+        # Filter by the dates provided in the request
+        if start_date:
+            queryset = queryset.filter(date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(date__lte=end_date)
+
+        # Filter by the symbols provided in the request, a list of symbols is read with a single
+        # IN query
+        if len(symbols) == 1:
+            queryset = queryset.filter(symbol=symbols[0])
+        elif symbols:
+            queryset = queryset.filter(symbol__in=symbols)
+
+        # The order of the (symbol, date) index, which the snapshot keeps its rows in as well
+        return queryset.order_by("symbol", "date", "id")
+
+    def get_filters(self, request):
+        """
+        Validate the optional filters of the request.
 
-        # Filter by start date if start_date parameter is provided in the request
+        :return: tuple, (start_date datetime or None, end_date datetime or None, list of str
+            symbols, empty if not filtered by symbol)
+        """
+        # Parse the start date if start_date parameter is provided in the request
         start_date = request.query_params.get("start_date")
         if start_date:
             try:
                 start_date = datetime.strptime(start_date, "%Y-%m-%d")
             except ValueError:
                 raise ValueError("start_date must be in the format YYYY-MM-DD")
-            queryset = queryset.filter(date__gte=start_date)
 
-        # Filter by end date if end_date parameter is provided in the request
+        # Parse the end date if end_date parameter is provided in the request
         end_date = request.query_params.get("end_date")
         if end_date:
             try:
                 end_date = datetime.strptime(end_date, "%Y-%m-%d")
             except ValueError:
                 raise ValueError("end_date must be in the format YYYY-MM-DD")
-            queryset = queryset.filter(date__lte=end_date)
 
-        # Filter by symbol if symbol parameter is provided in the request
+        # Split the symbol parameter, a comma separated list of symbols
         symbol = request.query_params.get("symbol")
-        if symbol:
-            queryset = queryset.filter(symbol=symbol)
+        symbols = parse_symbols(symbol, self.max_symbols) if symbol else []
+
+        return start_date or None, end_date or None, symbols
+
+
+class FinancialDataAPIView(FinancialDataFilterMixin, APIView):
+    serializer_class = FinancialDataSerializer
+    pagination_class = LazyPageNumberPagination
+    keyset_pagination_class = KeysetPagination
+
+    @conditional_response("financial_data", validate="validate_params")
+    @cache_response("financial_data")
+    def get(self, request, *args, **kwargs):
+        try:
+            return Response(self.get_data(request))
+
+        except Exception as e:
+            # Return an error response if an exception is raised
+            return Response(
+                {"data": [], "pagination": {}, "info": {"error": str(e)}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+    def get_data(self, request):
+        # Read the page from the snapshot when it holds the current data of the symbols
+        data = self.get_snapshot_data(request)
+        if data is not None:
+            return data
+
+        # Get the queryset based on the filters provided in the request
+        queryset, serializer_class = self.get_filtered_queryset(request)
+
+        # Use keyset pagination when the client opts in with the cursor parameter
+        if "cursor" in request.query_params:
+            return self.get_keyset_page(request, queryset)
+
+        # Paginate the results
+        paginator = self.pagination_class()
+        paginator.page_size = request.query_params.get("limit", 5)
+        result_page = paginator.paginate_queryset(queryset, request)
+        with timed("serialize"):
+            data = serializer_class(result_page, many=True).data
+
+        # Construct the response data
+        return self.get_page_data(request, data, paginator)
+
+    def get_snapshot_data(self, request):
+        """
+        Read a page of daily rows of the requested symbols from the memory mapped snapshot.
+
+        Rows come in (symbol, date) order, the order of the unique index MySQL reads them from.
+
+        :return: dict, the response data, or None if the request must be answered from the database
+        """
+        if "cursor" in request.query_params or request.query_params.get("interval"):
+            return None
+        start_date, end_date, symbols = self.get_filters(request)
+        snapshot = get_current_snapshot(request, symbols)
+        if snapshot is None:
+            return None
+
+        paginator = self.pagination_class()
+        paginator.page_size = request.query_params.get("limit", 5)
+        result_page = paginator.paginate_queryset(
+            snapshot.select(symbols, start_date, end_date), request
+        )
+        with timed("serialize"):
+            encode = get_row_encoder(self.serializer_class())
+            data = [encode(row) for row in result_page]
+        return self.get_page_data(request, data, paginator)
+
+    def get_filtered_queryset(self, request):
+        """
+        Return the queryset of the request and the serializer class of its rows.
+        """
+        queryset = self.get_queryset(request)
+
+        # Aggregate the rows into weekly, monthly or yearly bars if an interval is given
+        interval = self.get_interval(request)
+        if interval:
+            return (
+                self.get_resampled_queryset(queryset, interval),
+                ResampledDataSerializer,
+            )
+        return queryset, self.serializer_class
+
+    def get_interval(self, request):
+        """
+        Validate the optional resampling interval of the request.
+
+        :return: str, one of INTERVALS, or None for daily rows
+        """
+        interval = request.query_params.get("interval")
+        if not interval:
+            return None
+        if interval not in INTERVALS:
+            raise ValueError(f"interval must be one of {', '.join(INTERVALS)}")
+        if "cursor" in request.query_params:
+            raise ValueError("interval cannot be combined with cursor")
+        return interval
+
+    def validate_params(self, request):
+        """
+        Validate the query parameters without reading any rows.
+
+        A page number past the last page is only detected once the rows are counted.
+        """
+        self.get_filters(request)
+        self.get_interval(request)
+        limit = request.query_params.get("limit")
+        if limit:
+            parse_positive_int(limit, "limit")
+        if "cursor" in request.query_params:
+            self.keyset_pagination_class().decode_cursor(
+                request.query_params["cursor"]
+            )
+
+    def get_page_data(self, request, data, paginator):
+        return {
+            "data": self.group_by_symbol(request, data),
+            "pagination": {
+                "count": paginator.page.paginator.count,
+                "page": paginator.page.number,
+                "limit": int(paginator.page_size),
+                "pages": paginator.page.paginator.num_pages,
+            },
+            "info": {"error": ""},
+        }
+
+    def get_keyset_page(self, request, queryset):
+        paginator = self.keyset_pagination_class()
+        result_page = paginator.paginate_queryset(queryset, request)
+        with timed("serialize"):
+            data = self.serializer_class(result_page, many=True).data
+        return {
+            "data": self.group_by_symbol(request, data),
+            "pagination": paginator.get_pagination_data(),
+            "info": {"error": ""},
+        }
+
+    def group_by_symbol(self, request, data):
+        """
+        Key the rows of a page by symbol under "symbols" when the request lists several symbols.
+
+        Pages are cut from the rows of all the symbols in (symbol, date) order, a symbol whose rows
+        are all on other pages has an empty list.
+        """
+        _, _, symbols = self.get_filters(request)
+        if len(symbols) < 2:
+            return data
+        grouped = {symbol: [] for symbol in symbols}
+        for row in data:
+            grouped[row["symbol"]].append(row)
+        return {"symbols": grouped}
+
+    def get_resampled_queryset(self, queryset, interval):
+        """
+        Aggregate the rows of a queryset into one bar per symbol and interval in SQL.
+
+        The rows are grouped on (symbol, bucket), with the summed volume and the first and last
+        date of each bucket. Counting the bars for the paginator is a grouped count as well. The
+        open price of the first day and the close price of the last day are looked up for the
+        bars of a page only, by ResampledDataSerializer.
+
+        :param queryset: QuerySet of FinancialDataModel, already filtered
+        :param interval: str, one of INTERVALS
+        :return: QuerySet of dicts with symbol, bucket, total_volume, first_date and last_date,
+            ordered by symbol and bucket
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"interval must be one of {', '.join(INTERVALS)}")
+        return (
+            queryset.annotate(bucket=Trunc("date", INTERVALS[interval]))
+            .values("symbol", "bucket")
+            .annotate(
+                total_volume=Sum("volume"),
+                first_date=Min("date"),
+                last_date=Max("date"),
+            )
+            .order_by("symbol", "bucket")
+        )
+
+
+class FinancialDataExportAPIView(FinancialDataAPIView):
+    renderer_classes = [
+        CSVRenderer,
+        NDJSONRenderer,
+        ArrowRenderer,
+        ParquetRenderer,
+        NPZRenderer,
+    ]
+    # Rows read per query, the memory used by an export does not depend on anything else
+    export_batch_size = 5000
+
+    @conditional_response("financial_data_export")
+    def get(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        try:
+            if not renderer.available:
+                raise ValueError(
+                    f"format {renderer.format} requires {renderer.requires} to be installed"
+                )
+
+            # Reuse the filters of /api/financial_data
+            queryset = self.get_queryset(request)
+        except Exception as e:
+            return JsonResponse(
+                {"data": [], "info": {"error": str(e)}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Row formats are encoded like the serializer, columnar formats take the raw values
+        batches = self.get_batches(queryset)
+        if not renderer.columnar:
+            encode = get_row_encoder(self.serializer_class())
+            batches = ([encode(row) for row in batch] for batch in batches)
+
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+        content = renderer.stream(batches, self.serializer_class.Meta.fields)
+        if isinstance(request._request, ASGIRequest):
+            # ASGI would buffer a sync iterator before serving it, hand it an async one instead
+            content = iterate_in_thread(content)
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response[
+            "Content-Disposition"
+        ] = f'attachment; filename="financial_data.{renderer.format}"'
+        return response
+
+    def get_batches(self, queryset):
+        """
+        Read the queryset in (symbol, date, id) order, one keyset range scan per batch.
 
-        return queryset
+        Each batch is a separate bounded query, so memory stays constant on every backend. MySQL
+        drivers buffer the whole result set of a single query client-side, which is why
+        QuerySet.iterator() alone would not bound it.
+
+        :return: generator of lists of tuples, the values of the serializer's fields of each row
+        """
+        fields = self.serializer_class.Meta.fields
+        position_index = [fields.index(name) for name in KeysetPagination.ordering]
+        queryset = queryset.order_by(*KeysetPagination.ordering).values_list(*fields)
+
+        batch = list(queryset[: self.export_batch_size])
+        while batch:
+            yield batch
+            if len(batch) < self.export_batch_size:
+                return
+            position = tuple(batch[-1][i] for i in position_index)
+            batch = list(
+                queryset.filter(keyset_filter(position))[: self.export_batch_size]
+            )
+
+    def handle_exception(self, exc):
+        # The export renderers cannot render error payloads, so errors are always JSON
+        response = super().handle_exception(exc)
+        return JsonResponse(
+            {"data": [], "info": {"error": str(response.data.get("detail", ""))}},
+            status=response.status_code,
+        )
 
 
 class StatisticsAPIView(APIView):
     serializer_class = FinancialDataModel
 
+    @conditional_response("statistics", validate="get_params")
+    @cache_response("statistics")
     def get(self, request, *args, **kwargs):
         try:
-            # Get the required parameters from the query params
-            start_date = request.query_params.get("start_date")
-            end_date = request.query_params.get("end_date")
-            symbol = request.query_params.get("symbol")
+            return Response(self.get_data(request))
 
-            # Check if all required parameters are present
-            if not all([start_date, end_date, symbol]):
-                raise ValueError(
-                    "start_date, end_date, and symbol are required parameters"
+        except Exception as e:
+            return Response(
+                {"data": {}, "info": {"error": str(e)}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+    def get_data(self, request):
+        start_date, end_date, symbols = self.get_params(request)
+
+        # Sum the rows in the snapshot when it holds the current data of the symbols
+        data = self.get_snapshot_data(request, start_date, end_date, symbols)
+        if data is not None:
+            return data
+
+        # Answer a comma separated list of symbols with statistics keyed by symbol
+        if len(symbols) > 1:
+            statistics = self.get_statistics_by_symbol(symbols, start_date, end_date)
+            return self.get_many_data(start_date, end_date, statistics)
+
+        # Calculate the statistics from the rollup, or with a single aggregate query
+        symbol = symbols[0]
+        statistics = self.get_rollup_statistics(symbol, start_date, end_date)
+        if statistics is None:
+            statistics = self.get_aggregate_queryset(
+                symbol, start_date, end_date
+            ).aggregate(Avg("open_price"), Avg("close_price"), Sum("volume"))
+        return self.get_single_data(start_date, end_date, symbol, statistics)
+
+    def get_params(self, request):
+        """
+        Validate the query parameters.
+
+        :return: tuple, (start_date datetime, end_date datetime, list of str symbols)
+        """
+        # Get the required parameters from the query params
+        start_date = request.query_params.get("start_date")
+        end_date = request.query_params.get("end_date")
+        symbols = parse_symbols(request.query_params.get("symbol", ""))
+
+        # Check if all required parameters are present
+        if not all([start_date, end_date, symbols]):
+            raise ValueError("start_date, end_date, and symbol are required parameters")
+
+        # Check if the start_date and end_date parameters are in the correct format
+        try:
+            start_date = datetime.strptime(start_date, "%Y-%m-%d")
+            end_date = datetime.strptime(end_date, "%Y-%m-%d")
+        except ValueError:
+            raise ValueError("start_date and end_date must be in the format YYYY-MM-DD")
+
+        # Check if the start_date parameter is before the end_date parameter
+        if start_date > end_date:
+            raise ValueError("start_date must be before end_date")
+
+        return start_date, end_date, symbols
+
+    def get_snapshot_data(self, request, start_date, end_date, symbols):
+        """
+        Compute the statistics from the rows of the memory mapped snapshot.
+
+        :return: dict, the response data, or None if the request must be answered from the database
+        """
+        snapshot = get_current_snapshot(request, symbols)
+        if snapshot is None:
+            return None
+        statistics = {
+            symbol: get_rollup_difference(
+                snapshot.get_totals(symbol, start_date, end_date), None
+            )
+            for symbol in symbols
+        }
+        if len(symbols) > 1:
+            return self.get_many_data(
+                start_date, end_date, self.get_symbol_statistics(symbols, statistics)
+            )
+        return self.get_single_data(
+            start_date, end_date, symbols[0], statistics[symbols[0]]
+        )
+
+    def get_aggregate_queryset(self, symbol, start_date, end_date):
+        # Get the queryset filtered by the required parameters
+        return FinancialDataModel.objects.filter(
+            date__gte=start_date, date__lte=end_date, symbol=symbol
+        )
+
+    def get_single_data(self, start_date, end_date, symbol, statistics):
+        return {
+            "data": {
+                "start_date": start_date,
+                "end_date": end_date,
+                "symbol": symbol,
+                "average_daily_open_price": statistics["open_price__avg"],
+                "average_daily_close_price": statistics["close_price__avg"],
+                "average_daily_volume": statistics["volume__sum"],
+            },
+            "info": {"error": ""},
+        }
+
+    def get_many_data(self, start_date, end_date, statistics):
+        return {
+            "data": {
+                "start_date": start_date,
+                "end_date": end_date,
+                "symbols": statistics,
+            },
+            "info": {"error": ""},
+        }
+
+    def get_rollup_statistics(self, symbol, start_date, end_date):
+        """
+        Compute the statistics as the difference of the running totals at both ends of the range.
+
+        :return: dict with the same keys as the aggregate query, or None if the current rollup
+            has no rows for the symbol up to end_date
+        """
+        end_totals, start_totals = self.get_rollup_querysets(
+            symbol, start_date, end_date
+        )
+        end = end_totals.first()
+        if end is None:
+            return None
+        start = start_totals.first()
+        return get_rollup_difference(end, start)
+
+    def get_current_rollup(self, symbols):
+        """
+        Return the rollup rows of the symbols whose running totals are current.
+
+        Ingests rebuild the rollup of their symbols and record the data version it was built at.
+        Writes that bypass them, such as the admin, only bump the data version, so the statistics
+        of those symbols come from the aggregate query until the next ingest rebuilds the rollup.
+        The check is a subquery, it adds no query.
+        """
+        current = FinancialDataIngestModel.objects.filter(
+            symbol__in=symbols, rollup_version=F("version")
+        ).values("symbol")
+        return FinancialDataRollupModel.objects.filter(symbol__in=current)
+
+    def get_rollup_querysets(self, symbol, start_date, end_date):
+        """
+        Return the querysets of the running totals at the end and before the start of the range,
+        newest first, so the totals are the first row of each.
+        """
+        fields = ("cum_open_price", "cum_close_price", "cum_volume", "cum_count")
+        rollup = self.get_current_rollup([symbol]).order_by("-date")
+        return (
+            rollup.filter(date__lte=end_date).values_list(*fields),
+            rollup.filter(date__lt=start_date).values_list(*fields),
+        )
+
+    def get_statistics_by_symbol(self, symbols, start_date, end_date):
+        """
+        Compute the statistics of many symbols at once.
+
+        Symbols with current rollup rows are answered from the rollup, the others with a single
+        GROUP BY symbol aggregate query.
+
+        :return: dict mapping every symbol to its statistics, in the order of symbols
+        """
+        statistics = self.get_rollup_statistics_by_symbol(symbols, start_date, end_date)
+        missing = [symbol for symbol in symbols if symbol not in statistics]
+        if missing:
+            rows = (
+                FinancialDataModel.objects.filter(
+                    date__gte=start_date, date__lte=end_date, symbol__in=missing
                 )
+                .order_by()
+                .values("symbol")
+                .annotate(Avg("open_price"), Avg("close_price"), Sum("volume"))
+            )
+            for row in rows:
+                statistics[row.pop("symbol")] = row
+        return self.get_symbol_statistics(symbols, statistics)
 
-            # Check if the start_date and end_date parameters are in the correct format
-            try:
-                start_date = datetime.strptime(start_date, "%Y-%m-%d")
-                end_date = datetime.strptime(end_date, "%Y-%m-%d")
-            except ValueError:
+    def get_symbol_statistics(self, symbols, statistics):
+        """
+        Key the statistics of many symbols by symbol, in the order of symbols.
+
+        :param statistics: dict mapping symbols to dicts with the keys of the aggregate query,
+            symbols without data may be missing
+        """
+        result = {}
+        for symbol in symbols:
+            row = statistics.get(symbol, {})
+            result[symbol] = {
+                "average_daily_open_price": row.get("open_price__avg"),
+                "average_daily_close_price": row.get("close_price__avg"),
+                "average_daily_volume": row.get("volume__sum"),
+            }
+        return result
+
+    def get_rollup_statistics_by_symbol(self, symbols, start_date, end_date):
+        """
+        Compute get_rollup_statistics() for many symbols with two queries.
+
+        The first finds the last rollup dates of every symbol up to end_date and before
+        start_date, two MAX(date) GROUP BY queries sent as one UNION that are answered from the
+        unique (symbol, date) key. The second reads the rollup rows at those dates.
+
+        :return: dict mapping the symbols that have current rollup rows up to end_date to the
+            statistics
+        """
+        rollup = self.get_current_rollup(symbols).order_by()
+        ends = (
+            rollup.filter(date__lte=end_date)
+            .values_list("symbol")
+            .annotate(last_date=Max("date"), is_end=Value(True))
+        )
+        starts = (
+            rollup.filter(date__lt=start_date)
+            .values_list("symbol")
+            .annotate(last_date=Max("date"), is_end=Value(False))
+        )
+        bounds = list(ends.union(starts, all=True))
+        if not bounds:
+            return {}
+
+        positions = Q()
+        for symbol, date, _ in bounds:
+            positions |= Q(symbol=symbol, date=date)
+        fields = ("cum_open_price", "cum_close_price", "cum_volume", "cum_count")
+        totals = {
+            (symbol, date): values
+            for symbol, date, *values in FinancialDataRollupModel.objects.filter(
+                positions
+            ).values_list("symbol", "date", *fields)
+        }
+
+        end_totals, start_totals = {}, {}
+        for symbol, date, is_end in bounds:
+            (end_totals if is_end else start_totals)[symbol] = totals[symbol, date]
+        return {
+            symbol: get_rollup_difference(end, start_totals.get(symbol))
+            for symbol, end in end_totals.items()
+        }
+
+
+class AnalyticsAPIView(FinancialDataFilterMixin, APIView):
+    @conditional_response("analytics")
+    @cache_response("analytics")
+    def get(self, request, *args, **kwargs):
+        try:
+            # Get the parameters from the query params
+            symbol = request.query_params.get("symbol")
+            if not symbol or "," in symbol:
                 raise ValueError(
-                    "start_date and end_date must be in the format YYYY-MM-DD"
+                    "symbol is a required parameter and accepts one symbol"
                 )
+            sma_windows = parse_windows(request.query_params.get("sma", "20"), "sma")
+            ema_windows = parse_windows(request.query_params.get("ema", "20"), "ema")
+            volatility_window = parse_positive_int(
+                request.query_params.get("volatility", "20"), "volatility", minimum=2
+            )
 
-            # Check if the start_date parameter is before the end_date parameter
-            if start_date > end_date:
-                raise ValueError("start_date must be before end_date")
+            # Filter by the dates of the request and load the series in one query
+            queryset = self.get_queryset(request)
+            rows = list(queryset.order_by("date").values_list("date", "close_price"))
+            dates = [row[0] for row in rows]
+            close = np.fromiter(
+                (row[1] for row in rows), dtype=np.float64, count=len(rows)
+            )
+
+            # Compute the indicators on the whole series at once
+            returns = analytics.daily_returns(close)
+            drawdown, peak, trough = analytics.max_drawdown(close)
 
-            # Get the queryset filtered by the required parameters
-            queryset = FinancialDataModel.objects.filter(
-                date__gte=start_date, date__lte=end_date, symbol=symbol
+            # Construct the response data
+            response_data = {
+                "data": {
+                    "symbol": symbol,
+                    "dates": dates,
+                    "close": analytics.to_list(close),
+                    "returns": analytics.to_list(returns),
+                    "sma": {
+                        str(window): analytics.to_list(
+                            analytics.simple_moving_average(close, window)
+                        )
+                        for window in sma_windows
+                    },
+                    "ema": {
+                        str(window): analytics.to_list(
+                            analytics.exponential_moving_average(close, window)
+                        )
+                        for window in ema_windows
+                    },
+                    "volatility": analytics.to_list(
+                        analytics.rolling_volatility(returns, volatility_window)
+                    ),
+                    "max_drawdown": {
+                        "value": drawdown,
+                        "peak_date": None if peak is None else dates[peak],
+                        "trough_date": None if trough is None else dates[trough],
+                    },
+                },
+                "info": {"error": ""},
+            }
+
+            return Response(response_data)
+
+        except Exception as e:
+            return Response(
+                {"data": {}, "info": {"error": str(e)}},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-            # Calculate the statistics
-            average_daily_open_price = queryset.aggregate(Avg("open_price"))[
-                "open_price__avg"
-            ]
-            average_daily_close_price = queryset.aggregate(Avg("close_price"))[
-                "close_price__avg"
-            ]
-            average_daily_volume = queryset.aggregate(Sum("volume"))["volume__sum"]
+
+class CorrelationAPIView(FinancialDataFilterMixin, APIView):
+    max_symbols = MAX_CORRELATION_SYMBOLS
+
+    @conditional_response("correlation")
+    @cache_response("correlation")
+    def get(self, request, *args, **kwargs):
+        try:
+            # Filter by the dates and symbols of the request, at least two symbols are required
+            queryset = self.get_queryset(request)
+            start_date, end_date, symbols = self.get_filters(request)
+            symbols = sorted(symbols)
+            if len(symbols) < 2:
+                raise ValueError("symbol must list at least two symbols")
+            min_observations = parse_positive_int(
+                request.query_params.get("min_observations", "20"),
+                "min_observations",
+                minimum=2,
+            )
+
+            # Load the close prices of all symbols with one query and align them by date
+            rows = queryset.order_by().values_list("date", "symbol", "close_price")
+            prices = analytics.price_matrix(rows, symbols)
+
+            # Correlate the daily returns of every pair of symbols at once
+            matrix = analytics.correlation_matrix(
+                analytics.daily_returns(prices), min_observations
+            )
 
             # Construct the response data
             response_data = {
                 "data": {
                     "start_date": start_date,
                     "end_date": end_date,
-                    "symbol": symbol,
-                    "average_daily_open_price": average_daily_open_price,
-                    "average_daily_close_price": average_daily_close_price,
-                    "average_daily_volume": average_daily_volume,
+                    "symbols": symbols,
+                    "matrix": [analytics.to_list(row) for row in matrix],
                 },
                 "info": {"error": ""},
             }
@@ -0,0 +1,40 @@
+"""
+API-only settings profile for deployments serving nothing but the read-only JSON API.
+
+The admin, sessions, messages and auth apps and their middleware are left out, requests go
+through the metrics, timing, security and common middleware only and DRF skips authentication.
+Select it with DJANGO_SETTINGS_MODULE=financial.api_settings, migrations must be run with the
+full settings.
+"""
+
+from .settings import *
+
+INSTALLED_APPS = [
+    "rest_framework",
+    "core",
+]
+
+MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
+    "core.middleware.ServerTimingMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "django.middleware.common.CommonMiddleware",
+]
+
+ROOT_URLCONF = "financial.api_urls"
+
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "DIRS": [],
+        "APP_DIRS": True,
+    }
+]
+
+# JSON only, without django.contrib.auth there is no user to authenticate
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": ["core.renderers.FastJSONRenderer"],
+    "DEFAULT_AUTHENTICATION_CLASSES": [],
+    "DEFAULT_PERMISSION_CLASSES": [],
+    "UNAUTHENTICATED_USER": None,
+}
@@ -0,0 +1,9 @@
+"""financial URL Configuration of the API-only settings profile, without the admin"""
+from django.urls import path, include
+from . import views
+
+urlpatterns = [
+    path("api/", include("core.urls")),
+    path("metrics", views.metrics, name="metrics"),
+    path("", views.health_check, name="health_check"),
+]
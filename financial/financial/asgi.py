@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "financial.settings")
+# Serve the async views, so requests waiting on the database do not hold a worker thread
+os.environ.setdefault("ASYNC_API_VIEWS", "ON")
+# Connections are opened per request thread under ASGI, they cannot be reused between requests
+os.environ.setdefault("DB_CONN_MAX_AGE", "0")
 
 application = get_asgi_application()
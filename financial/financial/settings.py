@@ -21,12 +21,19 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/4.1/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = "django-insecure-6fpnw#5!-36*r#*z#+iub@en95tt=9x#3z4vcvx*k$*u&#k$=n"
+SECRET_KEY = os.getenv(
+    "SECRET_KEY", "django-insecure-6fpnw#5!-36*r#*z#+iub@en95tt=9x#3z4vcvx*k$*u&#k$=n"
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# DEBUG also keeps every executed query in memory, the production deployment sets DEBUG to "OFF"
+DEBUG = os.getenv("DEBUG", "ON") == "ON"
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [
+    host
+    for host in os.getenv("ALLOWED_HOSTS", "localhost,127.0.0.1").split(",")
+    if host
+]
 
 
 # Application definition
@@ -44,6 +51,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
+    "core.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -81,10 +90,79 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD", "ritheeshPassword1"),
         "HOST": os.getenv("DB_HOST", "127.0.0.1"),
         "PORT": os.getenv("DB_PORT", "3306"),
+        # Keep connections open between requests, checked before reuse after a failure. asgi.py
+        # turns it off, under ASGI every request runs its queries in a new thread.
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
     },
     "test": {"ENGINE": "django.db.backends.sqlite3"},
 }
 
+# Read replicas of the default database, DB_REPLICA_HOSTS is a comma separated list of host or
+# host:port. core.routers.ReadReplicaRouter sends reads to them in turn and writes to default.
+DATABASE_REPLICAS = []
+for number, address in enumerate(
+    filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(",")), 1
+):
+    host, _, port = address.partition(":")
+    DATABASES[f"replica{number}"] = dict(
+        DATABASES["default"], HOST=host, PORT=port or DATABASES["default"]["PORT"]
+    )
+    DATABASE_REPLICAS.append(f"replica{number}")
+
+DATABASE_ROUTERS = ["core.routers.ReadReplicaRouter"]
+# Seconds reads stay on the primary after an ingest, longer than the replication lag. 0 turns it
+# off, the data version is then read from the replicas with the data.
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv("DB_REPLICA_PIN_SECONDS", "60"))
+# Seconds before a replica that could not be connected to is tried again
+DATABASE_REPLICA_RETRY_SECONDS = int(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# API responses are cached in the "api" cache, set API_CACHE to "locmem", "file" or "off".
+# The local memory cache evicts the least recently used entries once MAX_ENTRIES is reached.
+
+API_CACHE_BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "off": "django.core.cache.backends.dummy.DummyCache",
+}
+API_CACHE = os.getenv("API_CACHE", "locmem")
+
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "api": {
+        "BACKEND": API_CACHE_BACKENDS[API_CACHE],
+        "LOCATION": os.getenv("API_CACHE_DIR", "/tmp/financial-api-cache")
+        if API_CACHE == "file"
+        else "financial-api",
+        "TIMEOUT": int(os.getenv("API_CACHE_TIMEOUT", "86400")),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("API_CACHE_MAX_ENTRIES", "10000"))},
+    },
+}
+
+# Memory mapped snapshot of financial_data written by get_raw_data.py, reads of symbols whose data
+# it holds skip the database. Empty to always read from the database.
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "")
+
+# Serve the async versions of the financial_data and statistics views, asgi.py turns it on
+ASYNC_API_VIEWS = os.getenv("ASYNC_API_VIEWS", "OFF") == "ON"
+
+# Share of the requests core.middleware.ServerTimingMiddleware times, between 0 (off) and 1 (all).
+# Sampled responses get a Server-Timing header and their timings are logged to core.timing.
+SERVER_TIMING_SAMPLE_RATE = float(os.getenv("SERVER_TIMING_SAMPLE_RATE", "0.1"))
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+# FastJSONRenderer uses orjson when it is installed and renders like JSONRenderer otherwise.
+
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ]
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -110,6 +188,30 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Logging
+# https://docs.djangoproject.com/en/4.1/topics/logging/
+# Request timings are written to stderr as one JSON object per line, SERVER_TIMING_LOG=OFF drops
+# them and only keeps the Server-Timing header.
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {"message": {"format": "%(message)s"}},
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "message"},
+    },
+    "loggers": {
+        "core.timing": {
+            "handlers": ["console"],
+            "level": "INFO"
+            if os.getenv("SERVER_TIMING_LOG", "ON") == "ON"
+            else "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.1/howto/static-files/
 
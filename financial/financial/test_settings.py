@@ -1,5 +1,24 @@
 from .settings import *
 
+# A second database stands in for a read replica, the router tests send reads to it
 DATABASES = {
-    "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": BASE_DIR / "db.sqlite3"}
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.sqlite3",
+    },
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "replica.sqlite3",
+    },
 }
+DATABASE_REPLICAS = []
+
+# Cached responses would leak between tests, cache tests enable it with override_settings
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "api": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+}
+
+# Every request is timed, but their log lines would flood the test output
+SERVER_TIMING_SAMPLE_RATE = 1
+LOGGING["loggers"]["core.timing"]["level"] = "WARNING"
@@ -20,5 +20,6 @@ from . import views
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("core.urls")),
+    path("metrics", views.metrics, name="metrics"),
     path("", views.health_check, name="health_check"),
 ]
@@ -1,5 +1,17 @@
 from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from core.metrics import get_registry
 
 
 def health_check(request):
     return HttpResponse("Service is up and running")
+
+
+def metrics(request):
+    """
+    Serve the metrics of all workers in the Prometheus text format, see core/metrics.py.
+    """
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
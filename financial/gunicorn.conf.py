@@ -0,0 +1,63 @@
+"""
+Gunicorn configuration of the production deployment, loaded by gunicorn from the working
+directory:
+
+    cd financial && gunicorn financial.wsgi:application
+
+Every value can be overridden with an environment variable, see the README.
+"""
+
+import os
+import glob
+import tempfile
+import multiprocessing
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+
+# Pre-forked workers, two per core plus one keeps a core busy while another worker waits on MySQL
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+# Threaded workers by default. The ASGI application needs uvicorn.workers.UvicornWorker and the
+# application module changed too: gunicorn financial.asgi:application
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+# Import Django once in the master, workers fork with the application already loaded
+preload_app = os.getenv("GUNICORN_PRELOAD", "ON") == "ON"
+
+# Restart workers now and then so a slow leak cannot grow forever, jittered so they do not all
+# restart at once
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# "-" logs requests to stdout, "OFF" turns the access log off
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+if accesslog == "OFF":
+    accesslog = None
+errorlog = "-"
+
+# Workers write their metrics to files in this directory and /metrics adds them up. The metric
+# files of an earlier run are removed before the application is loaded, this file is only read by
+# the master. Nothing else in the directory is touched, it may be a shared or mounted one.
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "financial-metrics")
+)
+os.makedirs(metrics_dir, exist_ok=True)
+for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+    os.remove(path)
+
+
+def post_fork(server, worker):
+    # A connection opened in the master while preloading must not be shared by the workers
+    from django.db import connections
+
+    connections.close_all()
+
+
+def child_exit(server, worker):
+    # Drop the in-progress gauge of a dead worker, its counters keep adding to the totals
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
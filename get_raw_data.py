@@ -1,9 +1,15 @@
 #!/usr/bin/env python3
 import os
+import sys
+import csv
+import time
+import tempfile
 import requests
 import logging
+import threading
 import mysql.connector
 from mysql.connector import errorcode
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
 from dotenv import load_dotenv
@@ -14,11 +20,34 @@ BASE_DIR = Path(__file__).resolve().parent
 SCHEMA_FILE = BASE_DIR / "schema.sql"
 
 API_KEY = os.getenv("ALPHAVANTAGE_API_KEY", "15SWOEC7H3CLW3B1")
-SYMBOLS = ["IBM", "AAPL"]
+SYMBOLS = os.getenv("SYMBOLS", "IBM,AAPL").split(",")
 DB_NAME = os.getenv("MYSQL_DATABASE", "financial")
 USER = os.getenv("MYSQL_USER", "ritheesh")
 PASSWORD = os.getenv("MYSQL_PASSWORD", "ritheeshPassword1")
 HOST = os.getenv("HOST", "127.0.0.1")
+# AlphaVantage free tier allows 5 calls per minute
+CALLS_PER_MINUTE = int(os.getenv("ALPHAVANTAGE_CALLS_PER_MINUTE", "5"))
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "4"))
+REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "30"))
+INSERT_BATCH_SIZE = int(os.getenv("INSERT_BATCH_SIZE", "1000"))
+LOAD_DATA_INFILE = os.getenv("LOAD_DATA_INFILE", "OFF") == "ON"
+# Number of days fetched for a symbol that has no watermark yet
+HISTORY_DAYS = int(os.getenv("HISTORY_DAYS", "14"))
+# outputsize=compact returns the latest 100 trading days, roughly 140 calendar days
+COMPACT_DAYS = 130
+# Memory mapped snapshot of financial_data published for the API workers after every ingest
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "")
+SNAPSHOT_FETCH_SIZE = int(os.getenv("SNAPSHOT_FETCH_SIZE", "50000"))
+# The watermarks and the running totals of a daily data table live in tables named after it, so a
+# scratch copy such as test_financial_data never touches the tables the API serves
+INGEST_SUFFIX = "_ingest"
+ROLLUP_SUFFIX = "_rollup"
+
+UPSERT_SQL = """
+    INSERT INTO {} (symbol, date, open_price, close_price, volume)
+    {}
+    ON DUPLICATE KEY UPDATE open_price=VALUES(open_price), close_price=VALUES(close_price), volume=VALUES(volume)
+"""
 
 # Set up logging
 logging.basicConfig(
@@ -29,27 +58,37 @@ logging.basicConfig(
 )
 
 
-def get_financial_data(symbol):
+def get_financial_data(symbol, since=None):
     """
-    Retrieve financial data for a given stock symbol from AlphaVantage API for the past two weeks.
+    Retrieve financial data for a given stock symbol from AlphaVantage API.
+
+    Without a watermark only the past HISTORY_DAYS days are kept. With a watermark the days from it onwards
+    are kept, and the compact payload (latest 100 trading days) is requested whenever it covers them. The
+    watermark day itself is fetched again, its bar may have been stored while the market was still open.
 
     :param symbol: str, stock symbol to retrieve data for
+    :param since: datetime.date, last date already stored for the symbol (high-water mark)
     :return: list of dict, each dict contains financial data for a single day
     """
     try:
-        url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY_ADJUSTED&symbol={symbol}&apikey={API_KEY}"
-        response = requests.get(url)
+        today = datetime.now().date()
+        if since is None:
+            first_date = today - timedelta(days=HISTORY_DAYS)
+        else:
+            first_date = since
+        outputsize = "compact" if (today - first_date).days <= COMPACT_DAYS else "full"
+        url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY_ADJUSTED&symbol={symbol}&outputsize={outputsize}&apikey={API_KEY}"
+        response = requests.get(url, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         data = response.json()["Time Series (Daily)"]
-        today = datetime.now().date()
-        two_weeks_ago = today - timedelta(days=14)
+        # ISO dates compare like strings, so older days are skipped without being parsed
+        first_date, today = first_date.isoformat(), today.isoformat()
         records = []
         for date, values in data.items():
-            date = datetime.strptime(date, "%Y-%m-%d").date()
-            if date >= two_weeks_ago and date <= today:
+            if first_date <= date <= today:
                 record = {
                     "symbol": symbol,
-                    "date": date.isoformat(),
+                    "date": date,
                     "open_price": values["1. open"],
                     "close_price": values["4. close"],
                     "volume": values["6. volume"],
@@ -66,6 +105,80 @@ def get_financial_data(symbol):
         raise e
 
 
+class TokenBucket:
+    """
+    Thread-safe token bucket used to keep API calls under the vendor's calls-per-minute quota.
+
+    :param calls_per_minute: int, number of calls allowed per minute
+    :param capacity: int, maximum number of calls allowed in a burst, defaults to calls_per_minute
+    """
+
+    def __init__(self, calls_per_minute, capacity=None):
+        self.rate = calls_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else calls_per_minute
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available and consume it.
+
+        :return: None
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def fetch_financial_data(
+    symbols, max_workers=FETCH_WORKERS, limiter=None, watermarks=None
+):
+    """
+    Retrieve financial data for several stock symbols concurrently with a bounded thread pool.
+
+    Every API call first takes a token from the limiter, so the pool never exceeds the vendor quota.
+    A failing symbol is reported with its exception instead of aborting the other fetches.
+
+    :param symbols: list of str, stock symbols to retrieve data for
+    :param max_workers: int, maximum number of requests in flight
+    :param limiter: TokenBucket, rate limiter shared by all workers, defaults to CALLS_PER_MINUTE
+    :param watermarks: dict, maps symbol to the last date already stored for it
+    :return: generator of (symbol, records, error) tuples in completion order, error is None on success
+    """
+    if limiter is None:
+        limiter = TokenBucket(CALLS_PER_MINUTE)
+    if watermarks is None:
+        watermarks = {}
+
+    def fetch(symbol):
+        limiter.acquire()
+        since = watermarks.get(symbol)
+        if since is None:
+            logging.info(f"Retrieving financial data for symbol {symbol}")
+            return get_financial_data(symbol)
+        logging.info(f"Retrieving financial data for symbol {symbol} after {since}")
+        return get_financial_data(symbol, since=since)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch, symbol): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                yield symbol, future.result(), None
+            except Exception as e:
+                yield symbol, None, e
+
+
 def create_financial_data_table(conn):
     """
     Create a new table named 'financial_data' in the database with the specified connection.
@@ -79,7 +192,9 @@ def create_financial_data_table(conn):
         cursor.execute(f"USE {DB_NAME}")
         with open(SCHEMA_FILE, "r") as f:
             schema = f.read()
-        cursor.execute(schema, multi=True)
+        # multi=True returns a generator that runs the statements as it is consumed
+        for _ in cursor.execute(schema, multi=True):
+            pass
         conn.commit()
         logging.info("Created financial_data table")
     except mysql.connector.Error as e:
@@ -92,59 +207,382 @@ def create_financial_data_table(conn):
 
 def insert_financial_data(conn, records, table_name="financial_data"):
     """
-    Insert financial data records into the 'financial_data' table in the database with the specified connection.
+    Ingest financial data records: upsert them, then bring the rollup and the watermarks up to date.
+
+    The three writes are committed together, so the rows never become visible without the bump of the
+    data versions the API keys its cached responses, ETags and snapshot on.
+
+    :param conn: mysql.connector.connection_cext.CMySQLConnection object, connection to the database
+    :param records: list of dict, each dict contains financial data for a single day
+    :param table_name: str, table to upsert the records into, its rollup and ingest tables are
+        table_name + "_rollup" and table_name + "_ingest"
+    :return: None
+    """
+    if not records:
+        return
+    try:
+        bulk_insert_financial_data(conn, records, table_name, commit=False)
+        update_rollup(conn, records, table_name, commit=False)
+        update_watermarks(conn, records, table_name, commit=False)
+        conn.commit()
+    except Exception as e:
+        logging.error(f"Rolled back the ingest of {len(records)} records: {e}")
+        conn.rollback()
+        raise e
+
+
+def bulk_insert_financial_data(
+    conn,
+    records,
+    table_name="financial_data",
+    batch_size=INSERT_BATCH_SIZE,
+    load_data=LOAD_DATA_INFILE,
+    commit=True,
+):
+    """
+    Upsert financial data records in batches instead of one statement per record.
+
+    Each batch is sent as a single multi-row INSERT ... VALUES statement. With load_data enabled the
+    records are written to a temporary CSV file, loaded with LOAD DATA LOCAL INFILE into a staging
+    table and upserted from there with one INSERT ... SELECT, which is the fastest path for backfills.
+    The connection must then be opened with allow_local_infile=True.
 
     :param conn: mysql.connector.connection_cext.CMySQLConnection object, connection to the database
     :param records: list of dict, each dict contains financial data for a single day
+    :param table_name: str, table to upsert the records into
+    :param batch_size: int, number of records per INSERT statement
+    :param load_data: bool, use LOAD DATA LOCAL INFILE instead of multi-row INSERT statements
+    :param commit: bool, commit the upsert, False to leave the transaction to the caller
     :return: None
     """
+    if not records:
+        return
+    started = time.perf_counter()
     try:
         cursor = conn.cursor()
+        if load_data:
+            _load_data_infile(cursor, records, table_name)
+        else:
+            for start in range(0, len(records), batch_size):
+                batch = records[start : start + batch_size]
+                values = "VALUES " + ", ".join(["(%s, %s, %s, %s, %s)"] * len(batch))
+                params = []
+                for record in batch:
+                    params.extend(
+                        (
+                            record["symbol"],
+                            record["date"],
+                            record["open_price"],
+                            record["close_price"],
+                            record["volume"],
+                        )
+                    )
+                cursor.execute(UPSERT_SQL.format(table_name, values), params)
+        if commit:
+            conn.commit()
+        elapsed = time.perf_counter() - started
+        logging.info(
+            f"Upserted {len(records)} financial data records into {table_name} "
+            f"in {elapsed:.3f}s ({len(records) / max(elapsed, 1e-9):.0f} rows/s)"
+        )
+    except mysql.connector.Error as e:
+        logging.error(f"Error bulk inserting financial data into database: {str(e)}")
+        if commit:
+            conn.rollback()
+        raise e
+    except Exception as e:
+        logging.error(f"Unknown error bulk inserting financial_data table: {e}")
+        raise e
+
+
+def _load_data_infile(cursor, records, table_name):
+    """
+    Load records through a temporary CSV file and a staging table, then upsert them into table_name.
+
+    :param cursor: mysql.connector cursor of a connection opened with allow_local_infile=True
+    :param records: list of dict, each dict contains financial data for a single day
+    :param table_name: str, table to upsert the records into
+    :return: None
+    """
+    staging_table = f"{table_name}_staging"
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".csv", newline="", delete=False
+    ) as csv_file:
+        writer = csv.writer(csv_file, lineterminator="\n")
         for record in records:
-            cursor.execute(
-                """
-                INSERT INTO {} (symbol, date, open_price, close_price, volume)
-                VALUES (%s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE open_price=VALUES(open_price), close_price=VALUES(close_price), volume=VALUES(volume)
-            """.format(
-                    table_name
-                ),
+            writer.writerow(
                 (
                     record["symbol"],
                     record["date"],
                     record["open_price"],
                     record["close_price"],
                     record["volume"],
-                ),
+                )
             )
+    try:
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging_table}")
+        cursor.execute(f"CREATE TEMPORARY TABLE {staging_table} LIKE {table_name}")
+        cursor.execute(
+            f"""
+            LOAD DATA LOCAL INFILE %s INTO TABLE {staging_table}
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+            LINES TERMINATED BY '\\n'
+            (symbol, date, open_price, close_price, volume)
+            """,
+            (csv_file.name,),
+        )
+        cursor.execute(
+            UPSERT_SQL.format(
+                table_name,
+                f"SELECT symbol, date, open_price, close_price, volume FROM {staging_table}",
+            )
+        )
+        cursor.execute(f"DROP TEMPORARY TABLE {staging_table}")
+    finally:
+        os.remove(csv_file.name)
+
+
+def get_watermarks(conn, table_name="financial_data"):
+    """
+    Read the last stored date of every symbol from the ingest table.
+
+    :param conn: mysql.connector.connection_cext.CMySQLConnection object, connection to the database
+    :param table_name: str, table holding the daily financial data
+    :return: dict, maps symbol to datetime.date of its latest stored record
+    """
+    ingest_table = table_name + INGEST_SUFFIX
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT symbol, last_date FROM {ingest_table}")
+        return {symbol: last_date for symbol, last_date in cursor.fetchall()}
+    except mysql.connector.Error as e:
+        logging.error(f"Failed to read watermarks from {ingest_table}: {str(e)}")
+        raise e
+
+
+def update_watermarks(conn, records, table_name="financial_data", commit=True):
+    """
+    Move the watermark of every symbol in records forward to its latest date and bump its data version.
+
+    The API keys its cached responses on the data version, so this must run after every table derived
+    from the records has been written. The rollup of the symbols is marked as built at the new version.
+
+    :param conn: mysql.connector.connection_cext.CMySQLConnection object, connection to the database
+    :param records: list of dict, each dict contains financial data for a single day
+    :param table_name: str, table holding the daily financial data
+    :param commit: bool, commit the update, False to leave the transaction to the caller
+    :return: None
+    """
+    ingest_table = table_name + INGEST_SUFFIX
+    # Dates are compared as given, str or datetime.date, never against a sentinel of another type
+    last_dates = {}
+    for record in records:
+        date = record["date"]
+        last_dates[record["symbol"]] = max(
+            date, last_dates.get(record["symbol"], date)
+        )
+    if not last_dates:
+        return
+    try:
+        cursor = conn.cursor()
+        # updated_at is written explicitly, the column has no default when Django created the table
+        values = ", ".join(["(%s, %s, 1, 1, CURRENT_TIMESTAMP)"] * len(last_dates))
+        params = [value for item in last_dates.items() for value in item]
+        # MySQL assigns from left to right, rollup_version reads version before it is bumped
+        cursor.execute(
+            f"""
+            INSERT INTO {ingest_table} (symbol, last_date, version, rollup_version, updated_at)
+            VALUES {values}
+            ON DUPLICATE KEY UPDATE last_date=GREATEST(last_date, VALUES(last_date)),
+            rollup_version=version + 1, version=version + 1, updated_at=CURRENT_TIMESTAMP
+            """,
+            params,
+        )
+        if commit:
+            conn.commit()
+    except mysql.connector.Error as e:
+        logging.error(f"Failed to update watermarks in {ingest_table}: {str(e)}")
+        if commit:
+            conn.rollback()
+        raise e
+
+
+def update_rollup(conn, records, table_name="financial_data", commit=True):
+    """
+    Recompute the running totals of every symbol in records from its earliest new date onwards.
+
+    The totals before that date are read back from the rollup table, so a daily ingest only rewrites
+    the newest rows. A symbol without rollup rows yet, or whose rows were written since its rollup was
+    built (its rollup_version is behind its version), is rebuilt from its first stored day.
+
+    :param conn: mysql.connector.connection_cext.CMySQLConnection object, connection to the database
+    :param records: list of dict, each dict contains financial data for a single day
+    :param table_name: str, table holding the daily financial data
+    :param commit: bool, commit the update, False to leave the transaction to the caller
+    :return: None
+    """
+    rollup_table = table_name + ROLLUP_SUFFIX
+    ingest_table = table_name + INGEST_SUFFIX
+    first_dates = {}
+    for record in records:
+        date = record["date"]
+        first_dates[record["symbol"]] = min(
+            date, first_dates.get(record["symbol"], date)
+        )
+    try:
+        cursor = conn.cursor()
+        for symbol, first_date in first_dates.items():
+            cursor.execute(
+                f"""
+                SELECT r.cum_open_price, r.cum_close_price, r.cum_volume, r.cum_count
+                FROM {rollup_table} r
+                JOIN {ingest_table} i ON i.symbol = r.symbol AND i.rollup_version = i.version
+                WHERE r.symbol = %s AND r.date < %s ORDER BY r.date DESC LIMIT 1
+                """,
+                (symbol, first_date),
+            )
+            totals = cursor.fetchone()
+            if totals is None:
+                totals, first_date = (0, 0, 0, 0), "0001-01-01"
+            cum_open, cum_close, cum_volume, cum_count = totals
+            # Rows of days that were deleted since the rollup was built must not be read either
+            cursor.execute(
+                f"DELETE FROM {rollup_table} WHERE symbol = %s AND date >= %s",
+                (symbol, first_date),
+            )
+            cursor.execute(
+                f"""
+                SELECT date, open_price, close_price, volume FROM {table_name}
+                WHERE symbol = %s AND date >= %s ORDER BY date
+                """,
+                (symbol, first_date),
+            )
+            rows = []
+            for date, open_price, close_price, volume in cursor.fetchall():
+                cum_open += open_price
+                cum_close += close_price
+                cum_volume += volume
+                cum_count += 1
+                rows.append((symbol, date, cum_open, cum_close, cum_volume, cum_count))
+            for start in range(0, len(rows), INSERT_BATCH_SIZE):
+                batch = rows[start : start + INSERT_BATCH_SIZE]
+                values = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(batch))
+                cursor.execute(
+                    f"""
+                    INSERT INTO {rollup_table} (symbol, date, cum_open_price, cum_close_price, cum_volume, cum_count)
+                    VALUES {values}
+                    ON DUPLICATE KEY UPDATE cum_open_price=VALUES(cum_open_price), cum_close_price=VALUES(cum_close_price),
+                    cum_volume=VALUES(cum_volume), cum_count=VALUES(cum_count)
+                    """,
+                    [value for row in batch for value in row],
+                )
+        if commit:
+            conn.commit()
+    except mysql.connector.Error as e:
+        logging.error(f"Failed to update {rollup_table}: {str(e)}")
+        if commit:
+            conn.rollback()
+        raise e
+
+
+def publish_snapshot(conn, path, table_name="financial_data"):
+    """
+    Write the memory mapped snapshot of the table that the API workers serve hot reads from.
+
+    The rows and the data versions are read in one consistent read-only transaction, the API only
+    serves a symbol from the snapshot while its version in the ingest table is still the same. Rows
+    are streamed in (symbol, date) order from the unique index, SNAPSHOT_FETCH_SIZE at a time.
+
+    :param conn: mysql.connector.connection_cext.CMySQLConnection object, connection to the database
+    :param path: str, snapshot file, replaced atomically
+    :param table_name: str, table holding the daily financial data
+    :return: int, number of rows written
+    """
+    # The snapshot format is defined next to the API that reads it
+    if str(BASE_DIR / "financial") not in sys.path:
+        sys.path.insert(0, str(BASE_DIR / "financial"))
+    from core.snapshot import write_snapshot
+
+    try:
+        # End the transaction of earlier reads, so the snapshot sees every committed ingest
         conn.commit()
-        logging.info(
-            f"Inserted {len(records)} financial data records for symbol {records[0]['symbol']}"
+        conn.start_transaction(consistent_snapshot=True, readonly=True)
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT symbol, version FROM {table_name}{INGEST_SUFFIX}")
+        versions = dict(cursor.fetchall())
+        cursor.execute(
+            f"SELECT id, symbol, date, open_price, close_price, volume FROM {table_name} "
+            "ORDER BY symbol, date"
         )
-        for record in records:
-            logging.debug(record)
+        count = write_snapshot(path, _fetch_rows(cursor), versions)
+        conn.commit()
     except mysql.connector.Error as e:
-        logging.error(f"Error inserting financial data into database: {str(e)}")
+        logging.error(f"Failed to read {table_name} for the snapshot: {str(e)}")
         conn.rollback()
+        raise e
     except Exception as e:
-        logging.error(f"Unknown error inserting financial_data table: {e}")
+        logging.error(f"Failed to write the snapshot to {path}: {str(e)}")
+        conn.rollback()
         raise e
+    logging.info(f"Published a snapshot of {count} rows to {path}")
+    return count
+
+
+def _fetch_rows(cursor, size=SNAPSHOT_FETCH_SIZE):
+    """
+    Yield the rows of the executed query, fetched from the server a batch at a time.
+    """
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield from rows
 
 
 def main():
     """
     Main function that retrieves financial data for the specified stock symbols and inserts them into the database.
 
-    :return: None
+    Symbols are fetched concurrently and each one is inserted as soon as its data arrives. Only the days
+    from each symbol's watermark on are fetched and written, then the watermark moves forward. When
+    SNAPSHOT_PATH is set, a snapshot of the table is published for the API at the end.
+
+    :return: dict, "succeeded" list of symbols and "failed" dict mapping symbol to error message
     """
     conn = None
+    summary = {"succeeded": [], "failed": {}}
     try:
-        conn = mysql.connector.connect(user=USER, password=PASSWORD, host=HOST)
+        conn = mysql.connector.connect(
+            user=USER,
+            password=PASSWORD,
+            host=HOST,
+            allow_local_infile=LOAD_DATA_INFILE,
+        )
         create_financial_data_table(conn)
-        for symbol in SYMBOLS:
-            logging.info(f"Retrieving financial data for symbol {symbol}")
-            records = get_financial_data(symbol)
-            insert_financial_data(conn, records)
+        watermarks = get_watermarks(conn)
+        for symbol, records, error in fetch_financial_data(
+            SYMBOLS, watermarks=watermarks
+        ):
+            if error is None and records:
+                try:
+                    insert_financial_data(conn, records)
+                except Exception as e:
+                    error = e
+            if error is None:
+                summary["succeeded"].append(symbol)
+            else:
+                summary["failed"][symbol] = str(error)
+                logging.error(f"Failed to ingest symbol {symbol}: {str(error)}")
+        logging.info(
+            f"Ingested {len(summary['succeeded'])} symbols, {len(summary['failed'])} failed"
+        )
+        if SNAPSHOT_PATH:
+            # The API falls back to the database while the snapshot is out of date
+            try:
+                publish_snapshot(conn, SNAPSHOT_PATH)
+            except Exception as e:
+                logging.error(f"Failed to publish the snapshot: {str(e)}")
+        return summary
     except mysql.connector.Error as e:
         if e.errno == errorcode.ER_ACCESS_DENIED_ERROR:
             logging.error("Something is wrong with your user name or password")
@@ -4,5 +4,27 @@ CREATE TABLE IF NOT EXISTS financial_data (
     date DATE NOT NULL,
     open_price DECIMAL(10,2) NOT NULL,
     close_price DECIMAL(10,2) NOT NULL,
-    volume BIGINT NOT NULL
+    volume BIGINT NOT NULL,
+    UNIQUE KEY financial_data_symbol_date_uniq (symbol, date),
+    INDEX financial_data_date_idx (date),
+    INDEX financial_data_covering_idx (symbol, date, open_price, close_price, volume)
+);
+
+CREATE TABLE IF NOT EXISTS financial_data_ingest (
+    symbol VARCHAR(255) NOT NULL PRIMARY KEY,
+    last_date DATE NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    rollup_version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS financial_data_rollup (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    symbol VARCHAR(255) NOT NULL,
+    date DATE NOT NULL,
+    cum_open_price DECIMAL(30,2) NOT NULL,
+    cum_close_price DECIMAL(30,2) NOT NULL,
+    cum_volume BIGINT NOT NULL,
+    cum_count INT NOT NULL,
+    UNIQUE KEY financial_data_rollup_symbol_date_uniq (symbol, date)
 );
@@ -1,15 +1,26 @@
 #!/usr/bin/env python3
+import os
+import tempfile
 import unittest
 import mysql.connector
 
 from unittest import mock
 from unittest.mock import patch, MagicMock
 from pathlib import Path
+from datetime import date, timedelta
+from decimal import Decimal
 from get_raw_data import (
     get_financial_data,
     create_financial_data_table,
     insert_financial_data,
+    bulk_insert_financial_data,
+    fetch_financial_data,
+    get_watermarks,
+    update_watermarks,
+    update_rollup,
+    publish_snapshot,
     main,
+    TokenBucket,
     SYMBOLS,
 )
 
@@ -81,6 +92,236 @@ class TestGetFinancialData(unittest.TestCase):
             get_financial_data("AAPL")
 
 
+class TestGetFinancialDataSinceWatermark(unittest.TestCase):
+    def setUp(self):
+        self.today = date.today()
+        self.days = [self.today - timedelta(days=n) for n in range(4)]
+        self.mock_response = {
+            "Time Series (Daily)": {
+                day.isoformat(): {
+                    "1. open": "100.00",
+                    "4. close": "101.00",
+                    "6. volume": "1000",
+                }
+                for day in self.days
+            }
+        }
+
+    @patch("requests.get")
+    def test_only_days_from_watermark(self, mock_get):
+        # Arrange
+        mock_get.return_value.json.return_value = self.mock_response
+
+        # Act
+        result = get_financial_data("AAPL", since=self.days[2])
+
+        # Assert
+        self.assertIn("outputsize=compact", mock_get.call_args[0][0])
+        self.assertEqual(
+            [record["date"] for record in result],
+            [day.isoformat() for day in self.days[:3]],
+        )
+
+    @patch("requests.get")
+    def test_watermark_day_is_refetched(self, mock_get):
+        # Arrange: the watermark day was stored from a partial intraday bar, it has closed since
+        watermark = self.days[1].isoformat()
+        self.mock_response["Time Series (Daily)"][watermark] = {
+            "1. open": "100.00",
+            "4. close": "105.50",
+            "6. volume": "250000",
+        }
+        mock_get.return_value.json.return_value = self.mock_response
+
+        # Act
+        result = get_financial_data("AAPL", since=self.days[1])
+
+        # Assert
+        record = next(record for record in result if record["date"] == watermark)
+        self.assertEqual(record["close_price"], "105.50")
+        self.assertEqual(record["volume"], "250000")
+
+    @patch("requests.get")
+    def test_old_watermark_requests_full_history(self, mock_get):
+        # Arrange
+        mock_get.return_value.json.return_value = self.mock_response
+
+        # Act
+        result = get_financial_data("AAPL", since=self.today - timedelta(days=365))
+
+        # Assert
+        self.assertIn("outputsize=full", mock_get.call_args[0][0])
+        self.assertEqual(len(result), 4)
+
+
+class TestWatermarks(unittest.TestCase):
+    def setUp(self):
+        self.mock_conn = MagicMock()
+        self.mock_cursor = MagicMock()
+        self.mock_conn.cursor.return_value = self.mock_cursor
+
+    def test_get_watermarks(self):
+        # Arrange
+        self.mock_cursor.fetchall.return_value = [("IBM", date(2023, 3, 10))]
+
+        # Act
+        watermarks = get_watermarks(self.mock_conn)
+
+        # Assert
+        self.assertEqual(watermarks, {"IBM": date(2023, 3, 10)})
+
+    def test_update_watermarks_uses_latest_date_per_symbol(self):
+        # Arrange
+        records = [
+            {"symbol": "IBM", "date": "2023-03-09"},
+            {"symbol": "IBM", "date": "2023-03-10"},
+            {"symbol": "AAPL", "date": "2023-03-08"},
+        ]
+
+        # Act
+        update_watermarks(self.mock_conn, records)
+
+        # Assert
+        sql, params = self.mock_cursor.execute.call_args[0]
+        self.assertIn("(symbol, last_date, version, rollup_version, updated_at)", sql)
+        self.assertIn("GREATEST(last_date, VALUES(last_date))", sql)
+        # the rollup was rebuilt by the same ingest, it is current at the new version
+        self.assertIn("rollup_version=version + 1, version=version + 1", sql)
+        self.assertEqual(params, ["IBM", "2023-03-10", "AAPL", "2023-03-08"])
+        self.mock_conn.commit.assert_called_once()
+
+    def test_update_watermarks_accepts_date_objects(self):
+        # Arrange
+        records = [
+            {"symbol": "IBM", "date": date(2023, 3, 10)},
+            {"symbol": "IBM", "date": date(2023, 3, 9)},
+        ]
+
+        # Act
+        update_watermarks(self.mock_conn, records)
+
+        # Assert
+        _, params = self.mock_cursor.execute.call_args[0]
+        self.assertEqual(params, ["IBM", date(2023, 3, 10)])
+
+
+class TestUpdateRollup(unittest.TestCase):
+    def test_running_totals_continue_from_previous_row(self):
+        # Arrange
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_cursor.fetchone.return_value = (Decimal("10.00"), Decimal("20.00"), 100, 1)
+        mock_cursor.fetchall.return_value = [
+            (date(2023, 3, 9), Decimal("1.50"), Decimal("2.50"), 10),
+            (date(2023, 3, 10), Decimal("3.00"), Decimal("4.00"), 20),
+        ]
+
+        # Act
+        update_rollup(mock_conn, [{"symbol": "IBM", "date": "2023-03-09"}])
+
+        # Assert
+        sql, params = mock_cursor.execute.call_args[0]
+        self.assertIn("INSERT INTO financial_data_rollup", sql)
+        self.assertEqual(
+            params,
+            ["IBM", date(2023, 3, 9), Decimal("11.50"), Decimal("22.50"), 110, 2]
+            + ["IBM", date(2023, 3, 10), Decimal("14.50"), Decimal("26.50"), 130, 3],
+        )
+        mock_conn.commit.assert_called_once()
+
+    def test_stale_rollup_is_rebuilt_from_first_day(self):
+        # Arrange
+        # the totals are only read while the rollup is current, none are found here
+        mock_conn = MagicMock()
+        mock_cursor = mock_conn.cursor.return_value
+        mock_cursor.fetchone.return_value = None
+        mock_cursor.fetchall.return_value = []
+
+        # Act
+        update_rollup(mock_conn, [{"symbol": "IBM", "date": "2023-03-09"}])
+
+        # Assert
+        calls = mock_cursor.execute.call_args_list
+        self.assertIn("i.rollup_version = i.version", calls[0][0][0])
+        self.assertIn("DELETE FROM financial_data_rollup", calls[1][0][0])
+        self.assertEqual(calls[1][0][1], ("IBM", "0001-01-01"))
+        self.assertEqual(calls[2][0][1], ("IBM", "0001-01-01"))
+
+    def test_accepts_date_objects(self):
+        # Arrange
+        mock_conn = MagicMock()
+        mock_cursor = mock_conn.cursor.return_value
+        mock_cursor.fetchone.return_value = None
+        mock_cursor.fetchall.return_value = []
+        records = [
+            {"symbol": "IBM", "date": date(2023, 3, 10)},
+            {"symbol": "IBM", "date": date(2023, 3, 9)},
+        ]
+
+        # Act
+        update_rollup(mock_conn, records)
+
+        # Assert
+        # the running totals before the earliest new date are read back
+        _, params = mock_cursor.execute.call_args_list[0][0]
+        self.assertEqual(params, ("IBM", date(2023, 3, 9)))
+
+
+class TestTokenBucket(unittest.TestCase):
+    @patch("time.sleep")
+    def test_burst_then_wait(self, mock_sleep):
+        # Arrange
+        limiter = TokenBucket(calls_per_minute=60, capacity=2)
+
+        # Act
+        limiter.acquire()
+        limiter.acquire()
+
+        # Assert
+        # the first two calls fit in the burst capacity
+        mock_sleep.assert_not_called()
+
+        # Act
+        # the third call has to wait for a token to be refilled
+        mock_sleep.side_effect = lambda seconds: setattr(
+            limiter, "tokens", limiter.tokens + 1
+        )
+        limiter.acquire()
+
+        # Assert
+        self.assertEqual(mock_sleep.call_count, 1)
+        self.assertGreater(mock_sleep.call_args[0][0], 0)
+
+
+class TestFetchFinancialData(unittest.TestCase):
+    @patch("get_raw_data.get_financial_data")
+    def test_failure_does_not_abort_other_symbols(self, mock_get_financial_data):
+        # Arrange
+        def get_financial_data(symbol):
+            if symbol == "BAD":
+                raise KeyError("Time Series (Daily)")
+            return [{"symbol": symbol}]
+
+        mock_get_financial_data.side_effect = get_financial_data
+        limiter = MagicMock()
+
+        # Act
+        results = {
+            symbol: (records, error)
+            for symbol, records, error in fetch_financial_data(
+                ["IBM", "BAD", "AAPL"], max_workers=2, limiter=limiter
+            )
+        }
+
+        # Assert
+        self.assertEqual(limiter.acquire.call_count, 3)
+        self.assertEqual(results["IBM"], ([{"symbol": "IBM"}], None))
+        self.assertEqual(results["AAPL"], ([{"symbol": "AAPL"}], None))
+        self.assertIsNone(results["BAD"][0])
+        self.assertIsInstance(results["BAD"][1], KeyError)
+
+
 class TestCreateFinancialDataTable2(unittest.TestCase):
     @patch("mysql.connector")
     def test_create_financial_data_table_positive(self, mock_connector):
@@ -152,13 +393,83 @@ class TestInsertFinancialData(unittest.TestCase):
             },
         ]
 
+        # The symbol has no rollup rows yet and reads back no stored rows
+        mock_cursor.fetchone.return_value = None
+        mock_cursor.fetchall.return_value = []
+
         # Act
         insert_financial_data(mock_conn, records)
 
         # Assert
-        self.assertEqual(mock_cursor.execute.call_count, len(records))
-        self.assertTrue(mock_conn.cursor.called)
-        self.assertEqual(mock_conn.commit.call_count, 1)
+        statements = [call[0][0] for call in mock_cursor.execute.call_args_list]
+        self.assertIn("INSERT INTO financial_data ", statements[0])
+        self.assertIn("FROM financial_data_rollup", statements[1])
+        self.assertIn("INSERT INTO financial_data_ingest", statements[-1])
+        # The records, the rollup and the watermarks are committed together
+        mock_conn.commit.assert_called_once()
+        mock_conn.rollback.assert_not_called()
+
+    def test_failed_watermark_update_rolls_back_the_records(self):
+        # Arrange
+        mock_conn = MagicMock()
+        mock_cursor = mock_conn.cursor.return_value
+        mock_cursor.fetchone.return_value = None
+        mock_cursor.fetchall.return_value = []
+
+        def execute(sql, params=None):
+            if "financial_data_ingest" in sql:
+                raise mysql.connector.Error()
+
+        mock_cursor.execute.side_effect = execute
+        records = [
+            {
+                "symbol": "AAPL",
+                "date": "2022-03-10",
+                "open_price": 200.0,
+                "close_price": 205.0,
+                "volume": 1000000,
+            }
+        ]
+
+        # Act
+        with self.assertRaises(mysql.connector.Error):
+            insert_financial_data(mock_conn, records)
+
+        # Assert
+        # the upserted rows are never visible without the bump of the data version
+        self.assertFalse(mock_conn.commit.called)
+        mock_conn.rollback.assert_called_once()
+
+    def test_insert_into_scratch_table(self):
+        # Arrange
+        mock_conn = MagicMock()
+        mock_cursor = mock_conn.cursor.return_value
+        mock_cursor.fetchone.return_value = None
+        mock_cursor.fetchall.return_value = [
+            ("2022-03-10", Decimal("200.00"), Decimal("205.00"), 1000000)
+        ]
+        records = [
+            {
+                "symbol": "AAPL",
+                "date": "2022-03-10",
+                "open_price": 200.0,
+                "close_price": 205.0,
+                "volume": 1000000,
+            }
+        ]
+
+        # Act
+        insert_financial_data(mock_conn, records, "test_financial_data")
+
+        # Assert
+        statements = [call[0][0] for call in mock_cursor.execute.call_args_list]
+        self.assertIn("INSERT INTO test_financial_data ", statements[0])
+        self.assertIn("FROM test_financial_data_rollup", statements[1])
+        self.assertIn("INSERT INTO test_financial_data_rollup", statements[-2])
+        self.assertIn("INSERT INTO test_financial_data_ingest", statements[-1])
+        # Nothing the API serves is read or written
+        for sql in statements:
+            self.assertNotRegex(sql, r"\bfinancial_data")
 
     @patch("mysql.connector")
     def test_insert_failed(self, mock_connector):
@@ -214,10 +525,76 @@ class TestInsertFinancialData(unittest.TestCase):
         ]
 
         # Act
-        insert_financial_data(mock_conn, records)
+        with self.assertRaises(mysql.connector.Error):
+            insert_financial_data(mock_conn, records)
 
-        # Assert
+        # Assert: the watermark does not move past records that were not stored
         mock_conn.rollback.assert_called_once()
+        self.assertEqual(mock_cursor.execute.call_count, 1)
+
+
+class TestBulkInsertFinancialData(unittest.TestCase):
+    def setUp(self):
+        self.mock_conn = MagicMock()
+        self.mock_cursor = MagicMock()
+        self.mock_conn.cursor.return_value = self.mock_cursor
+        self.records = [
+            {
+                "symbol": "AAPL",
+                "date": f"2022-03-{day:02d}",
+                "open_price": 200.0,
+                "close_price": 205.0,
+                "volume": 1000000,
+            }
+            for day in range(1, 6)
+        ]
+
+    def test_multi_row_batches(self):
+        # Act
+        bulk_insert_financial_data(
+            self.mock_conn, self.records, batch_size=2, load_data=False
+        )
+
+        # Assert
+        # 5 records in batches of 2 need 3 statements and a single commit
+        self.assertEqual(self.mock_cursor.execute.call_count, 3)
+        sql, params = self.mock_cursor.execute.call_args_list[0][0]
+        self.assertEqual(sql.count("(%s, %s, %s, %s, %s)"), 2)
+        self.assertIn("ON DUPLICATE KEY UPDATE", sql)
+        self.assertEqual(
+            params,
+            ["AAPL", "2022-03-01", 200.0, 205.0, 1000000]
+            + ["AAPL", "2022-03-02", 200.0, 205.0, 1000000],
+        )
+        self.assertEqual(self.mock_conn.commit.call_count, 1)
+
+    @patch("os.remove")
+    def test_load_data_infile(self, mock_remove):
+        # Act
+        bulk_insert_financial_data(self.mock_conn, self.records, load_data=True)
+
+        # Assert
+        statements = [c[0][0] for c in self.mock_cursor.execute.call_args_list]
+        load_data = next(s for s in statements if "LOAD DATA LOCAL INFILE" in s)
+        self.assertIn("financial_data_staging", load_data)
+        self.assertTrue(
+            any(
+                "SELECT symbol, date" in s and "ON DUPLICATE KEY" in s
+                for s in statements
+            )
+        )
+        mock_remove.assert_called_once()
+        self.assertEqual(self.mock_conn.commit.call_count, 1)
+
+    def test_sql_error_rolls_back(self):
+        # Arrange
+        self.mock_cursor.execute.side_effect = mysql.connector.Error()
+
+        # Act & Assert
+        with self.assertRaises(mysql.connector.Error):
+            bulk_insert_financial_data(self.mock_conn, self.records, load_data=False)
+        self.mock_conn.rollback.assert_called_once()
+        self.assertFalse(self.mock_conn.commit.called)
 
 
 class TestMain(unittest.TestCase):
@@ -277,6 +654,88 @@ class TestMain(unittest.TestCase):
             ],
         )
 
+    @patch("mysql.connector.connect")
+    @patch("get_raw_data.create_financial_data_table")
+    @patch("get_raw_data.fetch_financial_data")
+    @patch("get_raw_data.insert_financial_data")
+    def test_main_reports_failed_symbols(
+        self,
+        mock_insert_financial_data,
+        mock_fetch_financial_data,
+        mock_create_financial_data_table,
+        mock_mysql_connector_connect,
+    ):
+        # Arrange
+        records = [{"symbol": "IBM", "date": "2023-03-10"}]
+        mock_fetch_financial_data.return_value = iter(
+            [("IBM", records, None), ("BAD", None, KeyError("Time Series (Daily)"))]
+        )
+
+        # Act
+        summary = main()
+
+        # Assert
+        mock_insert_financial_data.assert_called_once_with(
+            mock_mysql_connector_connect.return_value, records
+        )
+        self.assertEqual(summary["succeeded"], ["IBM"])
+        self.assertEqual(list(summary["failed"]), ["BAD"])
+
+
+class TestPublishSnapshot(unittest.TestCase):
+    def test_writes_rows_and_versions(self):
+        # Arrange
+        mock_conn = MagicMock()
+        mock_cursor = mock_conn.cursor.return_value
+        mock_cursor.fetchall.return_value = [("IBM", 3)]
+        # The rows arrive in several batches
+        mock_cursor.fetchmany.side_effect = [
+            [(1, "IBM", date(2023, 3, 9), Decimal("122.34"), Decimal("123.45"), 10)],
+            [(2, "IBM", date(2023, 3, 10), Decimal("123.45"), Decimal("124.56"), 20)],
+            [],
+        ]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "financial_data.snapshot")
+
+            # Act
+            count = publish_snapshot(mock_conn, path)
+
+            # Assert
+            from core.snapshot import Snapshot
+
+            snapshot = Snapshot.open(path)
+            self.assertEqual(count, 2)
+            self.assertEqual(snapshot.get_version(["IBM"]), 3)
+            self.assertEqual(
+                snapshot.get_totals("IBM", end_date=date(2023, 3, 9)),
+                (Decimal("122.34"), Decimal("123.45"), 10, 1),
+            )
+            self.assertEqual(os.listdir(directory), ["financial_data.snapshot"])
+        mock_conn.start_transaction.assert_called_once_with(
+            consistent_snapshot=True, readonly=True
+        )
+
+    @patch("mysql.connector.connect")
+    @patch("get_raw_data.create_financial_data_table")
+    @patch("get_raw_data.fetch_financial_data", return_value=iter([]))
+    @patch("get_raw_data.publish_snapshot")
+    @patch("get_raw_data.SNAPSHOT_PATH", "/tmp/financial_data.snapshot")
+    def test_main_publishes_snapshot(
+        self,
+        mock_publish_snapshot,
+        mock_fetch_financial_data,
+        mock_create_financial_data_table,
+        mock_mysql_connector_connect,
+    ):
+        # Act
+        main()
+
+        # Assert
+        mock_publish_snapshot.assert_called_once_with(
+            mock_mysql_connector_connect.return_value, "/tmp/financial_data.snapshot"
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
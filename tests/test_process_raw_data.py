@@ -30,7 +30,8 @@ class TestGetRawData(unittest.TestCase):
         self.cursor.execute(f"USE {DB_NAME}")
 
     def tearDown(self):
-        self.cursor.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
+        for table in (TABLE_NAME, f"{TABLE_NAME}_rollup", f"{TABLE_NAME}_ingest"):
+            self.cursor.execute(f"DROP TABLE IF EXISTS {table}")
         self.conn.close()
 
     def test_get_financial_data(self):
@@ -102,7 +103,24 @@ class TestGetRawData(unittest.TestCase):
             date DATE NOT NULL,
             open_price DECIMAL(10,2) NOT NULL,
             close_price DECIMAL(10,2) NOT NULL,
-            volume BIGINT NOT NULL
+            volume BIGINT NOT NULL,
+            UNIQUE KEY test_financial_data_symbol_date_uniq (symbol, date)
+            );
+            CREATE TABLE IF NOT EXISTS test_financial_data_ingest (
+            symbol VARCHAR(255) NOT NULL PRIMARY KEY,
+            last_date DATE NOT NULL,
+            version BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            );
+            CREATE TABLE IF NOT EXISTS test_financial_data_rollup (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            symbol VARCHAR(255) NOT NULL,
+            date DATE NOT NULL,
+            cum_open_price DECIMAL(30,2) NOT NULL,
+            cum_close_price DECIMAL(30,2) NOT NULL,
+            cum_volume BIGINT NOT NULL,
+            cum_count INT NOT NULL,
+            UNIQUE KEY test_financial_data_rollup_symbol_date_uniq (symbol, date)
             );
         """
 
@@ -137,3 +155,8 @@ class TestGetRawData(unittest.TestCase):
         )
         self.assertEqual(inserted_records[0], expected_record_1)
         self.assertEqual(inserted_records[1], expected_record_2)
+        # The rollup and the watermark of the scratch table, not of financial_data
+        cursor.execute(f"SELECT cum_count FROM {TABLE_NAME}_rollup ORDER BY date")
+        self.assertEqual(cursor.fetchall(), [(1,), (2,)])
+        cursor.execute(f"SELECT last_date FROM {TABLE_NAME}_ingest")
+        self.assertEqual(cursor.fetchall(), [(datetime.date(2023, 3, 10),)])
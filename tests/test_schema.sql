@@ -4,5 +4,24 @@ CREATE TABLE IF NOT EXISTS test_financial_data (
     date DATE NOT NULL,
     open_price DECIMAL(10,2) NOT NULL,
     close_price DECIMAL(10,2) NOT NULL,
-    volume BIGINT NOT NULL
+    volume BIGINT NOT NULL,
+    UNIQUE KEY test_financial_data_symbol_date_uniq (symbol, date)
+);
+
+CREATE TABLE IF NOT EXISTS test_financial_data_ingest (
+    symbol VARCHAR(255) NOT NULL PRIMARY KEY,
+    last_date DATE NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS test_financial_data_rollup (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    symbol VARCHAR(255) NOT NULL,
+    date DATE NOT NULL,
+    cum_open_price DECIMAL(30,2) NOT NULL,
+    cum_close_price DECIMAL(30,2) NOT NULL,
+    cum_volume BIGINT NOT NULL,
+    cum_count INT NOT NULL,
+    UNIQUE KEY test_financial_data_rollup_symbol_date_uniq (symbol, date)
 );